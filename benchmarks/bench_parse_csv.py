@@ -0,0 +1,147 @@
+"""
+Parse-throughput benchmark: `stylegrid.csv_io.parse_styles_csv` vs the previous row-by-row parser.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_parse_csv.py [--rows 100000] [--repeat 5]
+
+Generates a synthetic styles CSV, checks both parsers return identical rows, and prints
+best-of-N rows/s and MB/s. Forge is not needed: `modules.shared` is stubbed like tests/conftest.py.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import MagicMock
+
+sys.modules.setdefault("modules", MagicMock())
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from stylegrid.csv_io import parse_styles_csv  # noqa: E402
+
+TAGS = [
+    "masterpiece", "best quality", "cinematic lighting", "(detailed eyes:1.2)", "film grain",
+    "soft focus", "bokeh", "studio lighting", "watercolor", "ink sketch", "oil painting",
+    "dramatic shadows", "golden hour", "volumetric fog", "(sharp focus:1.1)", "pastel colors",
+]
+NEGATIVE = ["lowres", "bad anatomy", "blurry", "jpeg artifacts", "watermark", "text", "extra fingers"]
+CATEGORIES = ["", "", "BASE", "BODY", "LIGHTING", "CAMERA", "ART STYLE", "COLOR"]
+
+
+def legacy_parse_styles_csv(filepath):
+    """Parser as shipped before the bulk-read rewrite (kept verbatim for comparison)."""
+    styles = []
+    if not os.path.isfile(filepath):
+        return styles
+    try:
+        with open(filepath, "r", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = None
+            for row in reader:
+                if not row or all(c.strip() == "" for c in row):
+                    continue
+                if header is None and row[0].strip().lower() == "name":
+                    header = row
+                    continue
+                if header is None:
+                    header = ["name", "prompt", "negative_prompt"]
+                name = row[0].strip() if len(row) > 0 else ""
+                prompt = row[1].strip() if len(row) > 1 else ""
+                negative = row[2].strip() if len(row) > 2 else ""
+                description = row[3].strip() if len(row) > 3 else ""
+                category_explicit = row[4].strip() if len(row) > 4 else ""
+                if name:
+                    base = os.path.basename(filepath)
+                    styles.append({
+                        "name": name,
+                        "prompt": prompt,
+                        "negative_prompt": negative,
+                        "description": description,
+                        "category_explicit": category_explicit,
+                        "source": base,
+                        "_source": base,
+                        "source_file": os.path.abspath(filepath),
+                    })
+    except Exception:
+        return styles
+    return styles
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "prompt", "negative_prompt", "description", "category"])
+        for i in range(rows):
+            cat = rnd.choice(CATEGORIES)
+            prefix = rnd.choice(["PORTRAIT", "SCENE", "Mood", "FX"])
+            w.writerow([
+                f"{prefix}_style_{i}",
+                ", ".join(rnd.sample(TAGS, rnd.randint(4, 12))) + (", {prompt}" if i % 7 == 0 else ""),
+                ", ".join(rnd.sample(NEGATIVE, rnd.randint(0, 5))),
+                f"Synthetic style number {i}" if i % 3 == 0 else "",
+                cat,
+            ])
+
+
+def best_of(fn, path, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(path)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def retained_bytes(fn, path):
+    """Bytes still allocated while the parsed list is alive (legacy rows also get categorized fields)."""
+    tracemalloc.start()
+    rows = fn(path)
+    if rows and isinstance(rows[0], dict):
+        for r in rows:
+            r["category"] = r["category_explicit"] or "OTHER"
+            r["display_name"] = r["name"].replace("_", " ")
+            r["has_placeholder"] = "{prompt}" in r["prompt"]
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return size
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_styles.csv")
+        write_synthetic_csv(path, args.rows)
+        mb = os.path.getsize(path) / (1024 * 1024)
+
+        legacy_t, legacy_rows = best_of(legacy_parse_styles_csv, path, args.repeat)
+        fast_t, fast_rows = best_of(parse_styles_csv, path, args.repeat)
+        if legacy_rows != [s.to_dict(computed=False) for s in fast_rows]:
+            print("MISMATCH: parsers returned different rows", file=sys.stderr)
+            return 1
+
+        n = len(fast_rows)
+        print(f"{n} rows, {mb:.1f} MB, best of {args.repeat}")
+        print(f"{'parser':<10} {'seconds':>9} {'rows/s':>12} {'MB/s':>8}")
+        for label, t in (("legacy", legacy_t), ("current", fast_t)):
+            print(f"{label:<10} {t:>9.3f} {n / t:>12,.0f} {mb / t:>8.1f}")
+        print(f"speedup    {legacy_t / fast_t:.2f}x")
+        del legacy_rows, fast_rows
+        for label, fn in (("legacy", legacy_parse_styles_csv), ("current", parse_styles_csv)):
+            print(f"{label:<10} {retained_bytes(fn, path) / n:>9.0f} bytes/style retained")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
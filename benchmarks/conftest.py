@@ -0,0 +1,101 @@
+# pip install pytest pytest-benchmark fastapi starlette httpx
+"""
+Fixtures for the pytest-benchmark suite: synthetic catalogs of 1k / 10k / 100k styles
+spread over many CSV files, with Forge `modules.shared` stubbed as in tests/conftest.py.
+
+    python -m pytest benchmarks/ --benchmark-autosave            # record a baseline
+    python -m pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=median:25%
+
+Baselines are JSON files under benchmarks/baselines/ (see docs/DEVELOPMENT.md).
+`--bench-sizes=1000,10000` limits the catalog sizes for a quick run.
+"""
+import os
+import sys
+from unittest.mock import MagicMock
+
+_mock_shared = MagicMock()
+_mock_shared.cmd_opts = MagicMock()
+_mock_shared.cmd_opts.data_path = None
+_mod = MagicMock()
+_mod.shared = _mock_shared
+sys.modules.setdefault("modules", _mod)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import pytest  # noqa: E402
+from bench_parse_csv import write_synthetic_csv  # noqa: E402
+
+CATALOG_SIZES = (1_000, 10_000, 100_000)
+# Community packs are typically a few hundred to a few thousand rows each.
+ROWS_PER_FILE = 2_500
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-sizes",
+        default=",".join(str(n) for n in CATALOG_SIZES),
+        help="comma-separated synthetic catalog sizes (styles)",
+    )
+
+
+def pytest_configure(config):
+    # Keep saved runs with the suite instead of ./.benchmarks, unless overridden.
+    if getattr(config.option, "benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = "file://" + os.path.join(BENCH_DIR, "baselines")
+
+
+def pytest_generate_tests(metafunc):
+    if "catalog_size" in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption("--bench-sizes").split(",") if s.strip()]
+        metafunc.parametrize("catalog_size", sizes, ids=[f"{n // 1000}k" for n in sizes], scope="session")
+
+
+@pytest.fixture(scope="session")
+def catalog_dir(tmp_path_factory, catalog_size):
+    """Directory holding `catalog_size` styles in ROWS_PER_FILE-row CSVs."""
+    root = tmp_path_factory.mktemp(f"catalog_{catalog_size}")
+    for i, start in enumerate(range(0, catalog_size, ROWS_PER_FILE)):
+        rows = min(ROWS_PER_FILE, catalog_size - start)
+        write_synthetic_csv(str(root / f"pack_{i:03d}.csv"), rows, seed=i)
+    return root
+
+
+@pytest.fixture(scope="session")
+def single_csv(tmp_path_factory, catalog_size):
+    """One CSV with `catalog_size` rows, for the per-file parser."""
+    path = tmp_path_factory.mktemp(f"single_{catalog_size}") / "styles.csv"
+    write_synthetic_csv(str(path), catalog_size)
+    return path
+
+
+@pytest.fixture
+def catalog(catalog_dir, monkeypatch, tmp_path):
+    """Point every module at `catalog_dir`, with a cold in-memory cache and snapshot."""
+    from stylegrid import cache as sg_cache
+    from stylegrid import config as sg_config
+    from stylegrid import csv_io as sg_csv_io
+    from stylegrid import thumbnails as sg_thumbs
+
+    dirs = [str(catalog_dir)]
+    for module in (sg_config, sg_csv_io, sg_cache, sg_thumbs):
+        monkeypatch.setattr(module, "get_styles_dirs", lambda: dirs)
+    monkeypatch.setattr(sg_cache, "CATALOG_SNAPSHOT_FILE", str(tmp_path / "catalog.snapshot"))
+    monkeypatch.setattr(sg_cache, "_catalog", None)
+    monkeypatch.setattr(sg_cache, "_file_stats", {})
+    monkeypatch.setattr(sg_cache, "_file_hashes", {})
+    sg_cache._styles_cache.update({"data": None, "hashes": {}, "categories": None})
+    return catalog_dir
+
+
+@pytest.fixture
+def client(catalog):
+    from fastapi import FastAPI
+    from starlette.testclient import TestClient
+
+    from stylegrid.routes import register_api
+
+    app = FastAPI()
+    register_api(None, app)
+    with TestClient(app) as c:
+        yield c
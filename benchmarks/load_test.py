@@ -0,0 +1,407 @@
+"""
+Load test for the /style_grid API: mixed traffic from many tabs, editors and generations.
+
+Usage (from the repository root):
+
+    python benchmarks/load_test.py [--styles 5000] [--tabs 16] [--duration 20] [--json report.json]
+    python benchmarks/load_test.py --url http://127.0.0.1:7860 --tabs 8 --duration 30
+
+Without --url, `register_api` is mounted on a bare FastAPI app with `modules.shared` stubbed
+(no model, no GPU) over a temporary data dir and a synthetic catalog, and requests go
+through httpx's ASGI transport in this process. The app's event loop and I/O pool are the
+real ones; the client shares that loop, so absolute numbers are a lower bound. With --url
+the same traffic hits a running WebUI; editors then write to --source-file there.
+
+Traffic, per virtual user:
+  tab        polls /check_update and revalidates /styles with If-None-Match; on load and
+             every few polls fetches /thumbnails/list and a page of /thumbnail?size=sm, and
+             reads /usage like the React sidebar
+  editor     bursts of /style/save into one shared CSV, then deletes part of what it saved
+  generator  /usage/increment with 1-3 catalog names, like StyleGridScript.process
+
+Afterwards the run is checked for corruption: the editors' CSV parses and holds exactly the
+names they kept, /styles agrees, usage counts grew by exactly the increments sent, usage
+never went backwards for any reader, and (in-process) no temp files are left behind.
+Prints throughput and p50/p90/p99 per request kind; exits 1 if any check failed.
+
+Dependencies: pip install fastapi starlette httpx
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from unittest.mock import MagicMock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+import httpx  # noqa: E402
+from bench_parse_csv import write_synthetic_csv  # noqa: E402
+
+ROWS_PER_FILE = 2_500
+THUMB_PAGE = 24
+EDITOR_PREFIX = "LoadTest"
+
+
+def _stub_webui():
+    shared = MagicMock()
+    shared.cmd_opts.data_path = None
+    modules = MagicMock()
+    modules.shared = shared
+    sys.modules.setdefault("modules", modules)
+
+
+def build_local_app(root, styles, thumbnail_ratio, source_file):
+    """FastAPI app with Style Grid routes over `root` (styles/ and data/ are created there)."""
+    _stub_webui()
+    from fastapi import FastAPI
+
+    from stylegrid import config
+    from stylegrid.routes import register_api
+    from stylegrid.thumbnails import get_thumbnail_path
+
+    styles_dir = os.path.join(root, "styles")
+    data_dir = os.path.join(root, "data")
+    os.makedirs(styles_dir)
+    # Modules bind config values at import time, so every stylegrid module is rebound.
+    prefix = config.DATA_DIR + os.sep
+    for name, module in list(sys.modules.items()):
+        if name != "stylegrid" and not name.startswith("stylegrid."):
+            continue
+        for attr, value in list(vars(module).items()):
+            if attr.isupper() and isinstance(value, str) and value.startswith(prefix):
+                setattr(module, attr, os.path.join(data_dir, value[len(prefix):]))
+            elif attr == "DATA_DIR":
+                setattr(module, attr, data_dir)
+            elif attr == "get_styles_dirs":
+                setattr(module, attr, lambda: [styles_dir])
+    config.SOURCES_FILE = os.path.join(root, "sources.json")
+    for d in (config.BACKUP_DIR, config.THUMBNAILS_DIR):
+        os.makedirs(d, exist_ok=True)
+
+    rnd = random.Random(0)
+    for i, start in enumerate(range(0, styles, ROWS_PER_FILE)):
+        path = os.path.join(styles_dir, f"pack_{i:03d}.csv")
+        write_synthetic_csv(path, min(ROWS_PER_FILE, styles - start), seed=i)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            names = [row[0] for row in list(csv.reader(f))[1:]]
+        for name in names:
+            if rnd.random() < thumbnail_ratio:
+                # Content is never decoded on the GET path; a few bytes are enough.
+                with open(get_thumbnail_path(name, path), "wb") as out:
+                    out.write(b"RIFF\x00\x00\x00\x00WEBPVP8 ")
+
+    # Editors write to their own CSV; create it here so saves never fall back to EXT_DIR/styles.
+    with open(os.path.join(styles_dir, source_file), "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(["name", "prompt", "negative_prompt", "description", "category"])
+
+    app = FastAPI()
+    register_api(None, app)
+    return app, styles_dir, data_dir
+
+
+class Recorder:
+    """Latencies and failures per request kind."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+
+    async def call(self, kind, send, ok_statuses=(200,)):
+        t0 = time.perf_counter()
+        try:
+            r = await send()
+        except httpx.HTTPError:
+            self.latencies[kind].append(time.perf_counter() - t0)
+            self.errors[kind] += 1
+            self.statuses[kind]["exception"] += 1
+            return None
+        self.latencies[kind].append(time.perf_counter() - t0)
+        self.statuses[kind][r.status_code] += 1
+        if r.status_code not in ok_statuses:
+            self.errors[kind] += 1
+            return None
+        if r.status_code == 200 and r.headers.get("content-type", "").startswith("application/json"):
+            body = r.json()
+            if isinstance(body, dict) and "error" in body:
+                self.errors[kind] += 1
+                return None
+        return r
+
+
+def _usage_total(usage):
+    return sum(v.get("count", 0) for v in usage.values() if isinstance(v, dict))
+
+
+async def tab_user(client, rec, deadline, rnd, args, problems):
+    etag = ""
+    thumbs = []
+    last_usage_total = -1
+    polls = 0
+    while time.perf_counter() < deadline:
+        if polls % args.refresh_every == 0:
+            headers = {"If-None-Match": etag} if etag else {}
+            r = await rec.call(
+                "styles", lambda: client.get("/style_grid/styles", headers=headers), (200, 304)
+            )
+            if r is not None and r.status_code == 200:
+                etag = r.headers.get("etag", "")
+                r = await rec.call("thumbnails_list", lambda: client.get("/style_grid/thumbnails/list"))
+                if r is not None:
+                    thumbs = r.json().get("has_thumbnail", [])
+            for name in rnd.sample(thumbs, min(THUMB_PAGE, len(thumbs))):
+                await rec.call(
+                    "thumbnail",
+                    lambda name=name: client.get("/style_grid/thumbnail", params={"name": name, "size": "sm"}),
+                    (200, 404),
+                )
+            r = await rec.call("usage", lambda: client.get("/style_grid/usage"))
+            if r is not None:
+                total = _usage_total(r.json())
+                if total < last_usage_total:
+                    problems.append(f"usage total went backwards for a reader: {last_usage_total} -> {total}")
+                last_usage_total = total
+        await rec.call("check_update", lambda: client.get("/style_grid/check_update"))
+        polls += 1
+        await asyncio.sleep(args.poll_interval * rnd.uniform(0.5, 1.5))
+
+
+async def editor_user(client, rec, deadline, rnd, args, editor_id, kept):
+    seq = 0
+    live = set()
+    while time.perf_counter() < deadline:
+        for _ in range(args.burst):
+            name = f"{EDITOR_PREFIX}_{editor_id}_{seq}"
+            seq += 1
+            r = await rec.call("style_save", lambda name=name: client.post("/style_grid/style/save", json={
+                "name": name,
+                "prompt": f"load test, editor {editor_id}, {{prompt}}",
+                "negative_prompt": "lowres",
+                "description": "written by benchmarks/load_test.py",
+                "category": "LOADTEST",
+                "source": args.source_file,
+            }))
+            if r is not None:
+                live.add(name)
+        for name in rnd.sample(sorted(live), len(live) // 2):
+            r = await rec.call("style_delete", lambda name=name: client.post(
+                "/style_grid/style/delete", json={"name": name, "source": args.source_file}
+            ))
+            if r is not None:
+                live.discard(name)
+        await asyncio.sleep(args.edit_interval * rnd.uniform(0.5, 1.5))
+    kept[editor_id] = live
+
+
+async def generator_user(client, rec, deadline, rnd, args, names, sent):
+    while time.perf_counter() < deadline:
+        picked = rnd.sample(names, rnd.randint(1, 3))
+        r = await rec.call(
+            "usage_increment", lambda: client.post("/style_grid/usage/increment", json={"styles": picked})
+        )
+        if r is not None:
+            sent.update(picked)
+        await asyncio.sleep(args.generate_interval * rnd.uniform(0.5, 1.5))
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def summarize(rec, elapsed):
+    kinds = {}
+    total = 0
+    for kind, values in sorted(rec.latencies.items()):
+        values = sorted(values)
+        total += len(values)
+        kinds[kind] = {
+            "requests": len(values),
+            "errors": rec.errors[kind],
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(_percentile(values, 0.5) * 1000, 2),
+            "p90_ms": round(_percentile(values, 0.9) * 1000, 2),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "statuses": {str(k): v for k, v in rec.statuses[kind].items()},
+        }
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "errors": sum(rec.errors.values()),
+        "kinds": kinds,
+    }
+
+
+async def verify(client, args, kept, sent, usage_before, styles_dir, data_dir, problems):
+    expected = set().union(*kept.values()) if kept else set()
+    r = await client.get("/style_grid/styles")
+    catalog = set()
+    if r.status_code != 200:
+        problems.append(f"final /styles returned HTTP {r.status_code}")
+    else:
+        for styles in r.json().get("categories", {}).values():
+            catalog.update(s["name"] for s in styles if s.get("name", "").startswith(EDITOR_PREFIX + "_"))
+        if catalog != expected:
+            problems.append(
+                f"/styles editor rows differ: {len(expected - catalog)} missing, {len(catalog - expected)} unexpected"
+            )
+
+    usage_after = (await client.get("/style_grid/usage")).json()
+    for name, count in sent.items():
+        before = usage_before.get(name, {}).get("count", 0)
+        after = usage_after.get(name, {}).get("count", 0)
+        if after - before != count:
+            problems.append(f"usage for {name!r} grew by {after - before}, expected {count}")
+            break
+
+    if styles_dir is None:
+        return
+    path = os.path.join(styles_dir, args.source_file)
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+    except (OSError, csv.Error, UnicodeDecodeError) as e:
+        problems.append(f"{args.source_file} unreadable: {e}")
+        rows = []
+    if rows and rows[0][:2] != ["name", "prompt"]:
+        problems.append(f"{args.source_file} header damaged: {rows[0]}")
+    names = [row[0] for row in rows[1:] if row]
+    if len(names) != len(set(names)):
+        problems.append(f"{args.source_file} has duplicate rows")
+    if rows and set(names) != expected:
+        problems.append(f"{args.source_file} rows differ from what the editors kept")
+    if any(len(row) != len(rows[0]) for row in rows[1:]):
+        problems.append(f"{args.source_file} has rows with a wrong column count")
+    for directory in (styles_dir, data_dir):
+        for dirpath, _dirs, files in os.walk(directory):
+            for name in files:
+                if name.endswith((".tmp", ".partial")) or name.startswith(".tmp"):
+                    problems.append(f"leftover temp file {os.path.join(dirpath, name)}")
+                elif name.endswith(".json"):
+                    try:
+                        with open(os.path.join(dirpath, name), encoding="utf-8") as f:
+                            json.load(f)
+                    except (OSError, ValueError) as e:
+                        problems.append(f"{name} is not valid JSON: {e}")
+
+
+async def run(args):
+    root = styles_dir = data_dir = None
+    try:
+        if args.url:
+            transport = None
+            base_url = args.url.rstrip("/")
+        else:
+            root = tempfile.mkdtemp(prefix="sg-load-")
+            app, styles_dir, data_dir = build_local_app(
+                root, args.styles, args.thumbnail_ratio, args.source_file
+            )
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://stylegrid.test"
+        limits = httpx.Limits(max_connections=args.tabs + args.editors + args.generators + 4)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+            r = await client.get("/style_grid/styles")
+            r.raise_for_status()
+            names = [s["name"] for styles in r.json()["categories"].values() for s in styles]
+            if not names:
+                raise SystemExit("catalog is empty")
+            usage_before = (await client.get("/style_grid/usage")).json()
+
+            rec = Recorder()
+            problems = []
+            kept = {}
+            sent = Counter()
+            rnd = random.Random(args.seed)
+            t0 = time.perf_counter()
+            deadline = t0 + args.duration
+            users = [
+                tab_user(client, rec, deadline, random.Random(rnd.random()), args, problems)
+                for _ in range(args.tabs)
+            ]
+            users += [
+                editor_user(client, rec, deadline, random.Random(rnd.random()), args, i, kept)
+                for i in range(args.editors)
+            ]
+            users += [
+                generator_user(client, rec, deadline, random.Random(rnd.random()), args, names, sent)
+                for _ in range(args.generators)
+            ]
+            await asyncio.gather(*users)
+            elapsed = time.perf_counter() - t0
+            await verify(client, args, kept, sent, usage_before, styles_dir, data_dir, problems)
+    finally:
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = summarize(rec, elapsed)
+    report["config"] = {
+        k: getattr(args, k) for k in (
+            "url", "styles", "tabs", "editors", "generators", "duration", "poll_interval", "seed",
+        )
+    }
+    report["problems"] = problems
+    return report
+
+
+def print_report(report):
+    print(
+        f"{report['requests']} requests in {report['elapsed_seconds']}s "
+        f"({report['rps']} req/s), {report['errors']} errors"
+    )
+    print(f"{'kind':<18}{'reqs':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for kind, k in report["kinds"].items():
+        print(
+            f"{kind:<18}{k['requests']:>8}{k['errors']:>6}{k['rps']:>9}"
+            f"{k['p50_ms']:>9}{k['p90_ms']:>9}{k['p99_ms']:>9}{k['max_ms']:>9}"
+        )
+    if report["problems"]:
+        print("\nCHECKS FAILED:")
+        for p in report["problems"]:
+            print("  - " + p)
+    else:
+        print("\nchecks: CSV, /styles and usage consistent")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--url", default="", help="run against a live WebUI instead of an in-process app")
+    ap.add_argument("--styles", type=int, default=5_000, help="synthetic catalog size (in-process only)")
+    ap.add_argument("--thumbnail-ratio", type=float, default=0.3, help="share of styles with a thumbnail")
+    ap.add_argument("--tabs", type=int, default=16)
+    ap.add_argument("--editors", type=int, default=2)
+    ap.add_argument("--generators", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds")
+    ap.add_argument("--poll-interval", type=float, default=0.5, help="seconds between check_update polls")
+    ap.add_argument("--refresh-every", type=int, default=4, help="polls between /styles revalidations")
+    ap.add_argument("--burst", type=int, default=5, help="saves per editor burst")
+    ap.add_argument("--edit-interval", type=float, default=1.0, help="seconds between editor bursts")
+    ap.add_argument("--generate-interval", type=float, default=0.5, help="seconds between usage increments")
+    ap.add_argument("--source-file", default="loadtest_edits.csv", help="CSV the editors write to")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default="", help="also write the report to this file")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["problems"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Catalog loading: parse, merge, categorize, change detection and the styles cache."""
+import pytest
+
+from stylegrid import cache
+from stylegrid.csv_io import categorize_styles, load_all_styles, parse_styles_csv
+
+
+@pytest.mark.benchmark(group="parse_styles_csv")
+def test_parse_styles_csv(benchmark, single_csv, catalog_size):
+    styles = benchmark(parse_styles_csv, str(single_csv))
+    assert len(styles) == catalog_size
+
+
+@pytest.mark.benchmark(group="load_all_styles")
+def test_load_all_styles(benchmark, catalog, catalog_size):
+    styles = benchmark(load_all_styles)
+    assert len(styles) == catalog_size
+
+
+@pytest.mark.benchmark(group="categorize_styles")
+def test_categorize_styles(benchmark, catalog, catalog_size):
+    styles = load_all_styles()
+    categories = benchmark(categorize_styles, styles)
+    assert sum(len(v) for v in categories.values()) == catalog_size
+
+
+@pytest.mark.benchmark(group="check_files_changed")
+def test_check_files_changed_unchanged(benchmark, catalog):
+    cache.check_files_changed()
+    assert benchmark(cache.check_files_changed) is False
+
+
+@pytest.mark.benchmark(group="get_cached_styles")
+def test_get_cached_styles_hit(benchmark, catalog, catalog_size):
+    cache.get_cached_styles()
+    assert len(benchmark(cache.get_cached_styles)) == catalog_size
+
+
+@pytest.mark.benchmark(group="get_cached_styles")
+def test_get_cached_styles_miss_reparse(benchmark, catalog, catalog_size):
+    def cold():
+        cache.invalidate_styles_cache(reparse=True)
+
+    styles = benchmark.pedantic(cache.get_cached_styles, setup=cold, rounds=5)
+    assert len(styles) == catalog_size
+
+
+@pytest.mark.benchmark(group="get_cached_styles")
+def test_get_cached_styles_miss_snapshot(benchmark, catalog, catalog_size, monkeypatch):
+    """Restart path: the in-memory catalog is gone but the snapshot file is current."""
+    cache.get_cached_styles()
+    cache._write_snapshot(dict(cache._catalog_entries()), cache._catalog_gen + 1)
+
+    def restart():
+        monkeypatch.setattr(cache, "_catalog", None)
+        monkeypatch.setattr(cache, "_file_stats", {})
+        monkeypatch.setattr(cache, "_file_hashes", {})
+        cache.invalidate_styles_cache()
+
+    styles = benchmark.pedantic(cache.get_cached_styles, setup=restart, rounds=5)
+    assert len(styles) == catalog_size
@@ -0,0 +1,54 @@
+"""Prompt-side hot paths: conflicts, wildcards, dedup and full composition."""
+import random
+
+import pytest
+
+from stylegrid.cache import get_cached_styles
+from stylegrid.compose import compose_prompts, dedup_prompt, wildcard_pools
+from stylegrid.routes import detect_conflicts
+from stylegrid.wildcards import resolve_sg_wildcards
+
+SELECTED = 50
+
+
+def _selected_names(styles, n=SELECTED):
+    rnd = random.Random(0)
+    return [s.name for s in rnd.sample(styles, min(n, len(styles)))]
+
+
+@pytest.mark.benchmark(group="detect_conflicts")
+def test_detect_conflicts(benchmark, catalog):
+    names = _selected_names(get_cached_styles())
+    benchmark(detect_conflicts, names)
+
+
+@pytest.mark.benchmark(group="resolve_sg_wildcards")
+def test_resolve_sg_wildcards(benchmark, catalog):
+    pools = wildcard_pools(get_cached_styles())
+    cats = sorted(pools)[:3]
+    prompt = "1girl, " + ", ".join(f"{{sg:{c}}}" for c in cats) + ", {sg:missing}"
+    out = benchmark(resolve_sg_wildcards, prompt, pools, random.Random(0))
+    assert "{sg:missing}" in out
+
+
+@pytest.mark.benchmark(group="dedup_prompt")
+def test_dedup_prompt(benchmark):
+    rnd = random.Random(0)
+    tags = [f"tag{i}" for i in range(60)]
+    prompt = ", ".join(
+        f"({t}:1.2)" if rnd.random() < 0.2 else t for t in rnd.choices(tags, k=200)
+    ) + ", BREAK, " + ", ".join(tags[:20])
+    assert benchmark(dedup_prompt, prompt).count("BREAK") == 1
+
+
+@pytest.mark.benchmark(group="compose_prompts")
+def test_compose_prompts_uncached(benchmark, catalog):
+    styles = get_cached_styles()
+    names = _selected_names(styles, 5)
+    counter = iter(range(10**9))
+
+    def run():
+        # A fresh base prompt each round misses the compose LRU.
+        return compose_prompts([f"scene {next(counter)}, 1girl"], ["lowres"], names, styles)
+
+    benchmark(run)
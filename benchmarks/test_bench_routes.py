@@ -0,0 +1,40 @@
+"""Main HTTP routes through a TestClient (includes request/response and JSON overhead)."""
+import random
+
+import pytest
+
+from stylegrid.cache import get_cached_styles
+
+
+@pytest.mark.benchmark(group="route /styles")
+def test_route_styles(benchmark, client):
+    r = benchmark(client.get, "/style_grid/styles")
+    assert r.status_code == 200
+
+
+@pytest.mark.benchmark(group="route /styles")
+def test_route_styles_not_modified(benchmark, client):
+    etag = client.get("/style_grid/styles").headers["ETag"]
+    r = benchmark(client.get, "/style_grid/styles", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+
+@pytest.mark.benchmark(group="route /check_update")
+def test_route_check_update(benchmark, client):
+    client.get("/style_grid/check_update")
+    assert benchmark(client.get, "/style_grid/check_update").json() == {"changed": False}
+
+
+@pytest.mark.benchmark(group="route /conflicts")
+def test_route_conflicts(benchmark, client):
+    names = [s.name for s in random.Random(0).sample(get_cached_styles(), 20)]
+    r = benchmark(client.post, "/style_grid/conflicts", json={"styles": names})
+    assert "conflicts" in r.json()
+
+
+@pytest.mark.benchmark(group="route /compose")
+def test_route_compose_cached(benchmark, client):
+    names = [s.name for s in random.Random(0).sample(get_cached_styles(), 5)]
+    body = {"prompt": "1girl, solo", "negative_prompt": "lowres", "styles": names, "seed": 1}
+    r = benchmark(client.post, "/style_grid/compose", json=body)
+    assert "prompt" in r.json()
@@ -0,0 +1,52 @@
+"""Thumbnail lookups over the whole catalog: `list_thumbnails` warm, after a write, and cold."""
+import os
+
+import pytest
+
+from stylegrid import cache, thumbnails
+
+
+@pytest.fixture
+def thumbs(catalog, monkeypatch, tmp_path):
+    """A thumbnail for every third style, in a fresh directory with empty memos."""
+    d = tmp_path / "thumbnails"
+    d.mkdir()
+    monkeypatch.setattr(thumbnails, "THUMBNAILS_DIR", str(d))
+    monkeypatch.setattr(thumbnails, "_hash_memo", {"gen": None, "dirs": None, "rel": {}, "owners": None})
+    monkeypatch.setattr(thumbnails, "_listing_memo", {"key": None, "names": frozenset()})
+    names = set()
+    for s in cache.get_cached_styles()[::3]:
+        open(thumbnails.get_thumbnail_path(s.name, s.source_file), "wb").close()
+        names.add(s.name)
+    return d, names
+
+
+@pytest.mark.benchmark(group="list_thumbnails")
+def test_list_thumbnails_unchanged_dir(benchmark, thumbs):
+    d, names = thumbs
+    old = os.stat(d).st_mtime - 60
+    os.utime(d, (old, old))
+    assert benchmark(thumbnails.list_thumbnails) == names
+
+
+@pytest.mark.benchmark(group="list_thumbnails")
+def test_list_thumbnails_after_write(benchmark, thumbs):
+    """The directory just changed: relist, but hash inputs come from the generation memo."""
+    d, names = thumbs
+    thumbnails.list_thumbnails()
+
+    def touch():
+        os.utime(d)
+
+    assert benchmark.pedantic(thumbnails.list_thumbnails, setup=touch, rounds=20) == names
+
+
+@pytest.mark.benchmark(group="list_thumbnails")
+def test_list_thumbnails_new_generation(benchmark, thumbs):
+    _d, names = thumbs
+
+    def rebuild():
+        cache.invalidate_styles_cache()
+        cache.get_cached_styles()
+
+    assert benchmark.pedantic(thumbnails.list_thumbnails, setup=rebuild, rounds=5) == names
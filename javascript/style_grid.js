@@ -873,7 +873,7 @@
        var skipBtn = el("button", {
            className: "sg-btn sg-btn-secondary",
            textContent: "⏭ Skip",
-           onClick: function () { _batchState.skipped = true; }
+           onClick: function () { _batchState.skipped = true; wakeGenStatusWatch(); }
        });
        var cancelBtn = el("button", {
            className: "sg-btn",
@@ -881,6 +881,7 @@
            textContent: "✕ Cancel",
            onClick: function () {
                _batchState.cancelled = true;
+               wakeGenStatusWatch();
                cancelBtn.textContent = "Cancelling...";
                cancelBtn.disabled = true;
            }
@@ -934,7 +935,7 @@
                        processNext(index + 1);
                        return;
                    }
-                   pollBatchStatus(tabName, styleName, index, 0);
+                   pollBatchStatus(tabName, styleName, index, Date.now());
                })
                .catch(function () {
                    failed++;
@@ -942,7 +943,7 @@
                });
        }
 
-       function pollBatchStatus(tabName2, styleName, index, attempts) {
+       function pollBatchStatus(tabName2, styleName, index, startedAt) {
            if (_batchState.cancelled) {
                _batchState.running = false;
                overlay.remove();
@@ -955,44 +956,43 @@
                processNext(index + 1);
                return;
            }
-           if (attempts > 60) {
+           if (Date.now() - startedAt > GEN_TIMEOUT_MS) {
                failed++;
                processNext(index + 1);
                return;
            }
 
-           apiGet("/style_grid/thumbnail/gen_status?name=" +
-               encodeURIComponent(styleName))
-               .then(function (r) {
-                   if (!r || r.detail === "Not Found" || r.status === undefined) {
-                       failed++;
-                       processNext(index + 1);
-                       return;
-                   }
-                   if (r.status === "done") {
-                       done++;
-                       state[tabName2].hasThumbnail.add(styleName);
-                       _thumbVersions[styleName] = Date.now();
-                       localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
-                       _saveThumbVersions();
-                       qsa('.sg-card[data-style-name="' +
-                           CSS.escape(styleName) + '"]', state[tabName2].panel)
-                           .forEach(function (c) { c.classList.add("sg-has-thumb"); });
-                       updateProgress(index + 1, styleName, "✓");
-                       setTimeout(function () { processNext(index + 1); }, 300);
-                   } else if (r.status === "error") {
-                       failed++;
-                       processNext(index + 1);
-                   } else {
-                       setTimeout(function () {
-                           pollBatchStatus(tabName2, styleName, index, attempts + 1);
-                       }, 2000);
-                   }
-               })
-               .catch(function () {
+           watchGenStatus(styleName, function (r) {
+               if (_batchState.cancelled || _batchState.skipped) {
+                   pollBatchStatus(tabName2, styleName, index, startedAt);
+                   return;
+               }
+               if (!r || r.status === undefined) {
                    failed++;
                    processNext(index + 1);
-               });
+                   return;
+               }
+               if (r.status === "done") {
+                   done++;
+                   state[tabName2].hasThumbnail.add(styleName);
+                   _thumbVersions[styleName] = Date.now();
+                   localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
+                   _saveThumbVersions();
+                   qsa('.sg-card[data-style-name="' +
+                       CSS.escape(styleName) + '"]', state[tabName2].panel)
+                       .forEach(function (c) { c.classList.add("sg-has-thumb"); });
+                   updateProgress(index + 1, styleName, "✓");
+                   setTimeout(function () { processNext(index + 1); }, 300);
+               } else if (r.status === "error" || r.status === "idle") {
+                   failed++;
+                   processNext(index + 1);
+               } else {
+                   if (r.steps) {
+                       updateProgress(index + 1, styleName, "step " + r.step + "/" + r.steps);
+                   }
+                   pollBatchStatus(tabName2, styleName, index, startedAt);
+               }
+           });
        }
 
        processNext(0);
@@ -1014,7 +1014,7 @@
                     }
                     return;
                 }
-                pollGenerationStatus(tabName, styleName, 0, onDone, onProgress);
+                pollGenerationStatus(tabName, styleName, Date.now(), onDone, onProgress);
             })
             .catch(function () {
                 showStatusMessage(tabName, "Generation failed", true);
@@ -1024,66 +1024,149 @@
             });
     }
 
-    function pollGenerationStatus(tabName, styleName, attempts, onDone, onProgress) {
-        if (attempts > 60) {
+    // Shared long-poll over POST /style_grid/thumbnail/gen_status: one request covers every
+    // style being watched and returns as soon as any of them changes (status or sampler step).
+    var GEN_TIMEOUT_MS = 5 * 60 * 1000;
+    var _genWatch = { callbacks: {}, since: {}, last: {}, names: [], controller: null, restart: false, pending: false };
+
+    // Call `cb` once with the style's next status (null when the request failed, or
+    // { status: "waiting" } when a long-poll ended without news, so callers can time out).
+    function watchGenStatus(styleName, cb) {
+        (_genWatch.callbacks[styleName] = _genWatch.callbacks[styleName] || []).push(cb);
+        if (_genWatch.controller && _genWatch.names.indexOf(styleName) === -1) {
+            // The request in flight does not cover this style: reissue it with the new name.
+            _genWatch.restart = true;
+            _genWatch.controller.abort();
+            return;
+        }
+        runGenStatusWatch();
+    }
+
+    // Hand every waiting callback its last known status now (skip / cancel buttons).
+    function wakeGenStatusWatch() {
+        if (_genWatch.controller) _genWatch.controller.abort();
+    }
+
+    function deliverGenStatus(name, status) {
+        var cbs = _genWatch.callbacks[name];
+        if (!cbs) return;
+        delete _genWatch.callbacks[name];
+        cbs.forEach(function (cb) { cb(status); });
+    }
+
+    function runGenStatusWatch() {
+        if (_genWatch.pending) return;
+        var names = Object.keys(_genWatch.callbacks);
+        if (!names.length) return;
+        var since = {};
+        names.forEach(function (n) {
+            if (n in _genWatch.since) since[n] = _genWatch.since[n];
+        });
+        var controller = typeof AbortController !== "undefined" ? new AbortController() : null;
+        _genWatch.pending = true;
+        _genWatch.names = names;
+        _genWatch.controller = controller;
+        fetch("/style_grid/thumbnail/gen_status", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ names: names, since: since, timeout: 25 }),
+            signal: controller ? controller.signal : undefined,
+        }).then(function (r) { return r.json(); })
+            .then(function (r) {
+                // Callbacks re-register while results are handed out; one request follows.
+                _genWatch.controller = null;
+                if (!r || r.error || !r.statuses) {
+                    names.forEach(function (n) { deliverGenStatus(n, null); });
+                } else {
+                    names.forEach(function (n) {
+                        var st = r.statuses[n];
+                        if (!st) {
+                            deliverGenStatus(n, { status: "waiting" });
+                            return;
+                        }
+                        if (st.version === undefined) {
+                            // No entry on the server any more (restart / expiry): nothing to resume.
+                            delete _genWatch.since[n];
+                            delete _genWatch.last[n];
+                        } else {
+                            _genWatch.since[n] = st.version;
+                            _genWatch.last[n] = st;
+                        }
+                        deliverGenStatus(n, st);
+                    });
+                }
+                _genWatch.pending = false;
+                runGenStatusWatch();
+            })
+            .catch(function (err) {
+                _genWatch.controller = null;
+                var aborted = err && err.name === "AbortError";
+                if (!(aborted && _genWatch.restart)) {
+                    names.forEach(function (n) {
+                        deliverGenStatus(n, aborted ? (_genWatch.last[n] || { status: "running" }) : null);
+                    });
+                }
+                _genWatch.restart = false;
+                _genWatch.pending = false;
+                runGenStatusWatch();
+            });
+    }
+
+    function pollGenerationStatus(tabName, styleName, startedAt, onDone, onProgress) {
+        if (Date.now() - startedAt > GEN_TIMEOUT_MS) {
             showStatusMessage(tabName, "Generation timed out", true);
             if (typeof onProgress === "function") {
                 onProgress("error");
             }
             return;
         }
-        apiGet("/style_grid/thumbnail/gen_status?name=" +
-            encodeURIComponent(styleName))
-            .then(function (r) {
-                if (!r || r.detail === "Not Found" || r.status === undefined) {
-                    showStatusMessage(tabName, "Generation endpoint not found", true);
-                    if (typeof onProgress === "function") {
-                        onProgress("error");
-                    }
-                    return;
+        watchGenStatus(styleName, function (r) {
+            if (!r || r.status === undefined) {
+                showStatusMessage(tabName, "Generation status unavailable", true);
+                if (typeof onProgress === "function") {
+                    onProgress("error");
                 }
-                if (r.status === "done") {
-                    state[tabName].hasThumbnail.add(styleName);
-                    _thumbVersions[styleName] = Date.now();
-                    localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
-                    _saveThumbVersions();
-                    qsa('.sg-card[data-style-name="' +
-                        CSS.escape(styleName) + '"]',
-                        state[tabName].panel)
-                        .forEach(function (c) {
-                            c.classList.add("sg-has-thumb");
-                        });
-                    showStatusMessage(tabName, "✓ Preview ready!");
-                    if (typeof onProgress === "function") {
-                        onProgress("done", 100);
-                    }
-                    if (typeof onDone === "function") onDone(_thumbVersions[styleName]);
-                } else if (r.status === "error") {
-                    showStatusMessage(tabName,
-                        "Generation failed: " + (r.message || "unknown"), true);
-                    if (typeof onProgress === "function") {
-                        onProgress("error");
-                    }
-                } else if (r.status === "running" || r.status === "idle") {
-                    if (typeof onProgress === "function") {
-                        onProgress("generating", Math.min(90, Math.round((attempts / 60) * 100)));
-                    }
-                    setTimeout(function () {
-                        pollGenerationStatus(tabName, styleName, attempts + 1, onDone, onProgress);
-                    }, 2000);
-                } else {
-                    showStatusMessage(tabName, "Unknown generation status: " + r.status, true);
-                    if (typeof onProgress === "function") {
-                        onProgress("error");
-                    }
+                return;
+            }
+            if (r.status === "done") {
+                state[tabName].hasThumbnail.add(styleName);
+                _thumbVersions[styleName] = Date.now();
+                localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
+                _saveThumbVersions();
+                qsa('.sg-card[data-style-name="' +
+                    CSS.escape(styleName) + '"]',
+                    state[tabName].panel)
+                    .forEach(function (c) {
+                        c.classList.add("sg-has-thumb");
+                    });
+                showStatusMessage(tabName, "✓ Preview ready!");
+                if (typeof onProgress === "function") {
+                    onProgress("done", 100);
                 }
-            })
-            .catch(function () {
-                showStatusMessage(tabName, "Generation status unavailable", true);
+                if (typeof onDone === "function") onDone(_thumbVersions[styleName]);
+            } else if (r.status === "error") {
+                showStatusMessage(tabName,
+                    "Generation failed: " + (r.message || "unknown"), true);
                 if (typeof onProgress === "function") {
                     onProgress("error");
                 }
-            });
+            } else if (r.status === "idle") {
+                showStatusMessage(tabName, "Generation was interrupted (WebUI restarted?)", true);
+                if (typeof onProgress === "function") {
+                    onProgress("error");
+                }
+            } else if (r.status === "running" || r.status === "waiting") {
+                if (r.status === "running" && typeof onProgress === "function") {
+                    onProgress("generating", r.steps ? Math.min(95, Math.round((r.step / r.steps) * 100)) : 0);
+                }
+                pollGenerationStatus(tabName, styleName, startedAt, onDone, onProgress);
+            } else {
+                showStatusMessage(tabName, "Unknown generation status: " + r.status, true);
+                if (typeof onProgress === "function") {
+                    onProgress("error");
+                }
+            }
+        });
     }
 
     function uploadThumbnail(tabName, styleName) {
@@ -1093,35 +1176,34 @@
         input.addEventListener("change", function () {
             var file = input.files[0];
             if (!file) return;
-            var reader = new FileReader();
-            reader.onload = function () {
-                apiPost("/style_grid/thumbnail/upload", {
-                    name: styleName,
-                    image: reader.result
+            // Raw body upload: streamed and size-capped server-side, re-encoded to WEBP.
+            fetch("/style_grid/thumbnail/upload_file?name=" + encodeURIComponent(styleName), {
+                method: "POST",
+                headers: { "Content-Type": file.type || "application/octet-stream" },
+                body: file,
+            })
+                .then(function (res) { return res.json(); })
+                .then(function (r) {
+                    if (r.ok) {
+                        state[tabName].hasThumbnail.add(styleName);
+                        qsa('.sg-card[data-style-name="' +
+                            CSS.escape(styleName) + '"]',
+                            state[tabName].panel)
+                            .forEach(function (c) {
+                                c.classList.add("sg-has-thumb");
+                            });
+                        _thumbVersions[styleName] = Date.now();
+                        localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
+                        _saveThumbVersions();
+                        showStatusMessage(tabName, "Preview saved ✓");
+                    } else {
+                        showStatusMessage(tabName,
+                            "Upload failed: " + (r.error || "?"), true);
+                    }
                 })
-                    .then(function (r) {
-                        if (r.ok) {
-                            state[tabName].hasThumbnail.add(styleName);
-                            qsa('.sg-card[data-style-name="' +
-                                CSS.escape(styleName) + '"]',
-                                state[tabName].panel)
-                                .forEach(function (c) {
-                                    c.classList.add("sg-has-thumb");
-                                });
-                            _thumbVersions[styleName] = Date.now();
-                            localStorage.setItem("sg_thumb_v_" + styleName, _thumbVersions[styleName].toString());
-                            _saveThumbVersions();
-                            showStatusMessage(tabName, "Preview saved ✓");
-                        } else {
-                            showStatusMessage(tabName,
-                                "Upload failed: " + (r.error || "?"), true);
-                        }
-                    })
-                    .catch(function () {
-                        showStatusMessage(tabName, "Upload failed", true);
-                    });
-            };
-            reader.readAsDataURL(file);
+                .catch(function () {
+                    showStatusMessage(tabName, "Upload failed", true);
+                });
         });
         input.click();
     }
@@ -1830,13 +1912,20 @@ CSV table editor — full implementation kept for restoration; currently inactiv
                 const oldName = style.name;
                 const rest = oldName.includes("_") ? oldName.split("_").slice(1).join("_") : oldName;
                 const newName = newCat.toUpperCase() + "_" + rest;
-                apiPost("/style_grid/style/delete", { name: oldName, source: style.source }).then(assertNoApiError).then(function () {
-                    return apiPost("/style_grid/style/save", {
-                        name: newName,
+                // One batch rename = one CSV rewrite (was delete + save = two rewrites and reloads).
+                apiPost("/style_grid/styles/batch", {
+                    operations: [{
+                        op: "rename",
+                        name: oldName,
+                        new_name: newName,
                         prompt: style.prompt,
                         negative_prompt: style.negative_prompt,
+                        category: "",
                         source: style.source
-                    }).then(assertNoApiError);
+                    }]
+                }).then(function (r) {
+                    var res = (r && r.results && r.results[0]) || r;
+                    return assertNoApiError(res);
                 }).then(function () {
                     overlay.remove();
                     refreshPanel(tabName);
@@ -2007,24 +2096,36 @@ CSV table editor — full implementation kept for restoration; currently inactiv
         });
         modal.appendChild(btnExport);
 
-        const importLabel = el("label", { className: "sg-editor-label", textContent: "Import JSON file:" });
-        const importInput = el("input", { type: "file", accept: ".json" });
+        const importLabel = el("label", { className: "sg-editor-label", textContent: "Import file (JSON, CSV or ZIP):" });
+        const importInput = el("input", { type: "file", accept: ".json,.csv,.zip" });
         importInput.addEventListener("change", function () {
             const file = importInput.files[0];
             if (!file) return;
-            const reader = new FileReader();
-            reader.onload = function () {
-                try {
-                    const data = JSON.parse(reader.result);
-                    apiPost("/style_grid/import", data).then(function () {
-                        overlay.remove();
-                        refreshPanel(tabName);
-                        var notify = state[tabName] && state[tabName].refreshAndNotifyFrame;
-                        if (typeof notify === "function") notify();
-                    }).catch(function () {});
-                } catch (_e) { alert("Invalid JSON file"); }
-            };
-            reader.readAsText(file);
+            // Raw body upload: the server detects the format, streams it and reports per row.
+            fetch("/style_grid/import?filename=" + encodeURIComponent(file.name), {
+                method: "POST",
+                headers: { "Content-Type": "application/octet-stream" },
+                body: file,
+            })
+                .then(function (res) { return res.json(); })
+                .then(function (r) {
+                    if (!r || r.error || r.detail) {
+                        alert("Import failed: " + ((r && (r.error || r.detail)) || "?"));
+                        return;
+                    }
+                    overlay.remove();
+                    refreshPanel(tabName);
+                    var notify = state[tabName] && state[tabName].refreshAndNotifyFrame;
+                    if (typeof notify === "function") notify();
+                    if (r.imported !== undefined) {
+                        var parts = [r.imported + " imported"];
+                        if (r.duplicates) parts.push(r.duplicates + " duplicates skipped");
+                        if (r.conflicts_total) parts.push(r.conflicts_total + " name conflicts");
+                        if (r.errors && r.errors.length) parts.push(r.errors.length + " invalid rows");
+                        showStatusMessage(tabName, "Import: " + parts.join(", "), !!(r.errors && r.errors.length));
+                    }
+                })
+                .catch(function () { alert("Import failed"); });
         });
         modal.appendChild(importLabel);
         modal.appendChild(importInput);
@@ -2133,47 +2234,115 @@ CSV table editor — full implementation kept for restoration; currently inactiv
     }
 
     // -----------------------------------------------------------------------
-    // Dynamic polling for file changes
+    // Change notifications: server push (/style_grid/events), polling fallback
     // -----------------------------------------------------------------------
     let _pollInterval = null;
+    let _eventSource = null;
+    let _eventErrors = 0;
+    let _refreshTimer = null;
+
+    function refreshAllStyles() {
+        ["txt2img", "img2img"].forEach(function (t) {
+            if (state[t].panel) refreshPanel(t);
+            apiGet("/style_grid/styles").then(function (data) {
+                var styles = [];
+                if (Array.isArray(data)) {
+                    styles = data;
+                } else if (data.categories) {
+                    styles = Object.values(data.categories).flat();
+                } else if (data.styles) {
+                    styles = data.styles;
+                }
+                state[t].categories = {};
+                styles.forEach(function (s) {
+                    var cat = s.category || "OTHER";
+                    if (!state[t].categories[cat]) state[t].categories[cat] = [];
+                    state[t].categories[cat].push(s);
+                });
+                var frame = state[t] && state[t].sgFrame;
+                if (frame && frame.contentWindow) {
+                    // Full list for v2: dedupe by name only in iframe when "All sources" (selectFilteredStyles).
+                    var v2styles = Object.values(state[t].categories).flat();
+                    frame.contentWindow.postMessage({
+                        type: "SG_STYLES_UPDATE",
+                        styles: v2styles
+                    }, "*");
+                }
+            });
+        });
+    }
+
+    function scheduleStylesRefresh() {
+        // Batch saves and the catalog watcher can fire in quick succession.
+        clearTimeout(_refreshTimer);
+        _refreshTimer = setTimeout(refreshAllStyles, 300);
+    }
+
+    function notifyPresetsUpdated() {
+        ["txt2img", "img2img"].forEach(function (t) {
+            var frame = document.getElementById("sg-frame-" + t);
+            if (frame && frame.contentWindow) {
+                frame.contentWindow.postMessage({ type: "SG_PRESETS_UPDATED" }, "*");
+            }
+        });
+    }
+
+    function onThumbnailEvent(data) {
+        if (data.status === "updated" || data.status === "removed" || data.status === "done") {
+            ["txt2img", "img2img"].forEach(function (t) {
+                if (state[t].panel) loadThumbnailList(t);
+            });
+        }
+    }
+
     function startPolling() {
         if (_pollInterval) return;
         _pollInterval = setInterval(function () {
             apiGet("/style_grid/check_update").then(function (r) {
-                if (r && r.changed) {
-                    ["txt2img", "img2img"].forEach(function (t) {
-                        if (state[t].panel) refreshPanel(t);
-                        apiGet("/style_grid/styles").then(function (data) {
-                            var styles = [];
-                            if (Array.isArray(data)) {
-                                styles = data;
-                            } else if (data.categories) {
-                                styles = Object.values(data.categories).flat();
-                            } else if (data.styles) {
-                                styles = data.styles;
-                            }
-                            state[t].categories = {};
-                            styles.forEach(function (s) {
-                                var cat = s.category || "OTHER";
-                                if (!state[t].categories[cat]) state[t].categories[cat] = [];
-                                state[t].categories[cat].push(s);
-                            });
-                            var frame = state[t] && state[t].sgFrame;
-                            if (frame && frame.contentWindow) {
-                                // Full list for v2: dedupe by name only in iframe when "All sources" (selectFilteredStyles).
-                                var v2styles = Object.values(state[t].categories).flat();
-                                frame.contentWindow.postMessage({
-                                    type: "SG_STYLES_UPDATE",
-                                    styles: v2styles
-                                }, "*");
-                            }
-                        });
-                    });
-                }
+                if (r && r.changed) refreshAllStyles();
             }).catch(function () {});
         }, 5000);
     }
 
+    function stopPolling() {
+        if (!_pollInterval) return;
+        clearInterval(_pollInterval);
+        _pollInterval = null;
+    }
+
+    function startChangeFeed() {
+        if (_eventSource) return;
+        if (typeof EventSource === "undefined") {
+            startPolling();
+            return;
+        }
+        var es = new EventSource("/style_grid/events");
+        _eventSource = es;
+        es.addEventListener("hello", function () {
+            _eventErrors = 0;
+            stopPolling();
+        });
+        es.addEventListener("catalog", scheduleStylesRefresh);
+        es.addEventListener("presets", notifyPresetsUpdated);
+        es.addEventListener("thumbnail", function (e) {
+            try { onThumbnailEvent(JSON.parse(e.data)); } catch (err) { /* ignore malformed event */ }
+        });
+        es.addEventListener("resync", function () {
+            scheduleStylesRefresh();
+            notifyPresetsUpdated();
+        });
+        es.onerror = function () {
+            // EventSource reconnects by itself (resuming from Last-Event-ID); poll meanwhile,
+            // and stay on polling if the endpoint keeps failing (old backend, proxy).
+            startPolling();
+            _eventErrors++;
+            if (es.readyState === 2 || _eventErrors >= 5) {
+                es.close();
+                if (_eventSource === es) _eventSource = null;
+            }
+        };
+    }
+
     // ════════════════════════════════════════════════════
     // UI: PANEL
     // ════════════════════════════════════════════════════
@@ -2487,7 +2656,8 @@ CSV table editor — full implementation kept for restoration; currently inactiv
                 if (!confirm("Remove preview images for styles that no longer exist in any CSV?")) return;
                 apiPost("/style_grid/thumbnails/cleanup").then(function (r) {
                     if (r && r.removed !== undefined) {
-                        alert("Cleaned up " + r.removed + " orphaned thumbnail(s).");
+                        alert("Cleaned up " + r.removed + " orphaned thumbnail(s)." +
+                            (r.stale ? "\n" + r.stale + " preview(s) are older than their style's current prompt." : ""));
                     } else {
                         alert("Cleanup failed.");
                     }
@@ -3953,8 +4123,8 @@ CSV table editor — full implementation kept for restoration; currently inactiv
         }
         const frame = document.createElement("iframe");
         frame.id = "sg-frame-" + tab;
-        // Query string busts stale index.html / iframe document cache after ui/dist updates (bump when shipping UI changes).
-        frame.src = `/style_grid/ui?t=${Date.now()}`;
+        // The shell is revalidated by ETag and its assets are content-hashed, so rebuilds show up without a cache buster.
+        frame.src = "/style_grid/ui";
         var wrapper = document.createElement("div");
         wrapper.id = "sg-panel-wrapper-" + tab;
         wrapper.style.cssText = [
@@ -4195,7 +4365,9 @@ CSV table editor — full implementation kept for restoration; currently inactiv
                                     ? ("Backup failed: " + data.error)
                                     : data.ok === false
                                         ? "Nothing to backup (no CSV files found)"
-                                        : "💾 Backup created",
+                                        : data.unchanged
+                                            ? "💾 No changes since the last backup"
+                                            : "💾 Backup created",
                                 variant: failed ? "error" : "success"
                             }, "*");
                         }
@@ -4466,7 +4638,7 @@ CSV table editor — full implementation kept for restoration; currently inactiv
             const t2 = !!qs("#sg_trigger_img2img") || injectButton("img2img");
             if (t1 && t2) {
                 stopObserver(); // ← kill observer once both buttons are alive
-                startPolling();
+                startChangeFeed();
                 return true;
             }
             return false;
@@ -5,48 +5,22 @@ Replaces the clunky dropdown with a visual grid organized by categories.
 Implementation lives in the `stylegrid` package; this file is the Forge script entry point.
 """
 
-import os
-
-
 import json
 
 import gradio as gr  # type: ignore[reportMissingImports]
 from modules import script_callbacks, scripts  # type: ignore[reportMissingImports]
 from modules.processing import StableDiffusionProcessing  # type: ignore[reportMissingImports]
-from stylegrid.cache import get_cached_styles
-from stylegrid.config import DATA_DIR
-from stylegrid.csv_io import categorize_styles, load_all_styles
-from stylegrid.data_files import increment_usage, load_presets, load_usage
+from stylegrid import metrics, profiling
+from stylegrid.cache import get_cached_categories, get_cached_styles
+from stylegrid.compose import compose_prompts
+from stylegrid.csv_io import flush_prompt_styles_reload
+from stylegrid.data_files import increment_usage, load_category_order, load_presets, load_usage
+from stylegrid.records import categories_to_dicts
 from stylegrid.routes import register_api
-from stylegrid.wildcards import resolve_sg_wildcards
 
 script_callbacks.on_app_started(register_api)
 
 
-def _dedup_prompt(prompt_str):
-    """Remove duplicate tags from a comma-separated prompt.
-    First occurrence wins. Weighted (tag:1.3) and plain tag are
-    treated as the same identity via normalized key. BREAK is kept
-    as-is and never deduplicated.
-    """
-    import re as _re
-    out = []
-    seen = {}
-    for seg in prompt_str.split(","):
-        s = seg.strip()
-        if not s:
-            continue
-        if s.upper() == "BREAK":
-            out.append(s)
-            continue
-        m = _re.match(r'^\((.+?):\d+\.?\d*\)$', s)
-        key = m.group(1).strip().lower() if m else s.lower()
-        if key not in seen:
-            seen[key] = True
-            out.append(s)
-    return ", ".join(out)
-
-
 class StyleGridScript(scripts.Script):
     def title(self):
         return "Style Grid"
@@ -56,21 +30,15 @@ class StyleGridScript(scripts.Script):
 
     def ui(self, is_img2img):
         tab_prefix = "img2img" if is_img2img else "txt2img"
-        styles = load_all_styles()
-        categories = categorize_styles(styles)
+        # Shared by both tabs; cold start is served from the catalog snapshot when CSVs are unchanged.
+        categories = get_cached_categories()
         styles_json = json.dumps({
-            "categories": categories,
+            "categories": categories_to_dicts(categories),
             "usage": load_usage(),
             "presets": load_presets(),
         }, ensure_ascii=False)
-        order_file = os.path.join(DATA_DIR, "category_order.json")
-        if os.path.isfile(order_file):
-            try:
-                with open(order_file, "r", encoding="utf-8") as f:
-                    category_order = json.load(f)
-            except Exception:
-                category_order = sorted(categories.keys())
-        else:
+        category_order = load_category_order()
+        if category_order is None:
             category_order = sorted(categories.keys())
         with gr.Group(elem_id=f"style_grid_wrapper_{tab_prefix}", visible=False):
             styles_data = gr.Textbox(value=styles_json, visible=False, elem_id=f"style_grid_data_{tab_prefix}")
@@ -82,81 +50,39 @@ class StyleGridScript(scripts.Script):
             gr.Textbox(value=json.dumps(category_order), visible=False, elem_id=f"style_grid_cat_order_{tab_prefix}")
         return [silent_styles, source_filter]
 
+    def before_process(self, p: StableDiffusionProcessing, *args):
+        """Apply pending style edits to shared.prompt_styles before the WebUI expands p.styles."""
+        flush_prompt_styles_reload()
+
     def process(self, p: StableDiffusionProcessing, *args):
         """Silent mode: inject styles into prompt at generation time."""
-        all_styles = list(get_cached_styles())
-        categorize_styles(all_styles)
+        with metrics.timed("process_seconds"):
+            profiling.run_process(self._process, p, *args)
+
+    def _process(self, p, *args):
+        # Forks without before_process still get a reload before prompts are finalized.
+        flush_prompt_styles_reload()
+        all_styles = get_cached_styles()
 
         # args[1] = active source filter passed from UI ("" means All Sources)
         active_source = (args[1] if len(args) >= 2 else "") or ""
-        if active_source:
-            wildcard_pool = [s for s in all_styles if (s.get("source_file") or "") == active_source]
-            if not wildcard_pool:           # unknown source — fall back to all
-                wildcard_pool = all_styles
-        else:
-            wildcard_pool = all_styles      # All Sources selected
-
-        styles_by_cat = {}
-        for s in wildcard_pool:
-            key = (s.get("category") or "").lower()
-            styles_by_cat.setdefault(key, []).append(s)
-
-        for i in range(len(p.all_prompts)):
-            p.all_prompts[i] = _dedup_prompt(resolve_sg_wildcards(p.all_prompts[i], styles_by_cat))
-        for i in range(len(p.all_negative_prompts)):
-            p.all_negative_prompts[i] = _dedup_prompt(resolve_sg_wildcards(p.all_negative_prompts[i], styles_by_cat))
-
-        if len(args) < 1:
-            return
-        silent_json = args[0]
-        if not silent_json or silent_json == "[]":
-            return
-        try:
-            style_names = json.loads(silent_json)
-        except Exception:
-            return
-        if not style_names or not isinstance(style_names, list):
+        style_names = []
+        if len(args) >= 1 and args[0] and args[0] != "[]":
+            try:
+                style_names = json.loads(args[0])
+            except Exception:
+                style_names = []
+            if not isinstance(style_names, list):
+                style_names = []
+            style_names = [n for n in style_names if isinstance(n, str)]
+
+        # Seeding each prompt's wildcard picks from its image seed makes them reproducible
+        # and lets POST /style_grid/compose preview exactly what generation produces.
+        seeds = getattr(p, "all_seeds", None) or None
+        p.all_prompts, p.all_negative_prompts = compose_prompts(
+            p.all_prompts, p.all_negative_prompts, style_names, all_styles, active_source, seeds
+        )
+        if not style_names:
             return
-        style_map = {s["name"]: s for s in all_styles}
-        prompts_add = []
-        neg_add = []
-        for name in style_names:
-            s = style_map.get(name)
-            if not s:
-                continue
-            if s["prompt"]:
-                if "{prompt}" in s["prompt"]:
-                    for i in range(len(p.all_prompts)):
-                        p.all_prompts[i] = s["prompt"].replace("{prompt}", p.all_prompts[i])
-                else:
-                    prompts_add.append(s["prompt"])
-            if s["negative_prompt"]:
-                if "{prompt}" in s["negative_prompt"]:
-                    for i in range(len(p.all_negative_prompts)):
-                        p.all_negative_prompts[i] = s["negative_prompt"].replace("{prompt}", p.all_negative_prompts[i])
-                else:
-                    neg_add.append(s["negative_prompt"])
-        if prompts_add:
-            style_tags = [t.strip() for s in prompts_add for t in s.split(",") if t.strip()]
-            for i in range(len(p.all_prompts)):
-                current_tags = [t.strip() for t in p.all_prompts[i].split(",") if t.strip()]
-                seen = {t.lower() for t in current_tags}
-                result = list(current_tags)
-                for t in style_tags:
-                    if t.lower() not in seen:
-                        result.append(t)
-                        seen.add(t.lower())
-                p.all_prompts[i] = ", ".join(result)
-        if neg_add:
-            style_neg_tags = [t.strip() for s in neg_add for t in s.split(",") if t.strip()]
-            for i in range(len(p.all_negative_prompts)):
-                current_tags = [t.strip() for t in p.all_negative_prompts[i].split(",") if t.strip()]
-                seen = {t.lower() for t in current_tags}
-                result = list(current_tags)
-                for t in style_neg_tags:
-                    if t.lower() not in seen:
-                        result.append(t)
-                        seen.add(t.lower())
-                p.all_negative_prompts[i] = ", ".join(result)
         p.extra_generation_params["Style Grid"] = ", ".join(style_names)
         increment_usage(style_names)
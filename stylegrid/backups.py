@@ -0,0 +1,514 @@
+"""
+Content-addressed backup store for style CSVs (and presets.json).
+
+Every distinct file version is stored once under ``backups/objects/<sha[:2]>/<sha256>``;
+a snapshot is a small JSON manifest in ``backups/manifests/`` listing path -> hash. An
+unchanged library costs one manifest comparison and no copies. Older timestamped
+folders / ZIPs written by previous versions are left untouched.
+
+Full snapshots come from ``POST /style_grid/backup``. Partial ones (``partial: true``)
+cover only the files they list: ``pre-edit`` (the version a CSV write replaced, compacted
+from `PRE_EDIT_DIR`) and ``pre-restore``; they back ``POST /style_grid/undo``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from stylegrid.cache import invalidate_styles_cache
+from stylegrid.config import (
+    BACKUP_DIR,
+    PRE_EDIT_DIR,
+    PRESETS_FILE,
+    get_all_styles_file_paths,
+    stat_key,
+)
+from stylegrid.csv_io import (
+    csv_write_lock,
+    open_edit_groups,
+    request_prompt_styles_reload,
+    write_file_bytes,
+)
+from stylegrid.loader import parse_styles_bytes
+from stylegrid.workers import resource_lock
+
+OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+MANIFESTS_DIR = os.path.join(BACKUP_DIR, "manifests")
+
+# prune_snapshots() keeps the newest `last` snapshots plus the newest one in each of the
+# most recent `hourly` hours, `daily` days and `weekly` ISO weeks (borg/restic style).
+RETENTION = {"last": 10, "hourly": 24, "daily": 14, "weekly": 8}
+# Partial (pre-edit / pre-restore) snapshots: undo depth and maximum age.
+UNDO_RETENTION = {"last": 50, "days": 7}
+
+_SNAPSHOT_ID_RE = re.compile(r"^\d{8}_\d{6}_\d{6}$")
+_BUCKET_FORMATS = {"hourly": "%Y%m%d%H", "daily": "%Y%m%d", "weekly": "%G%V"}
+
+# path -> ((size, mtime_ns, inode), sha256) so unchanged files are neither re-read nor re-hashed.
+_digest_memo = {}
+
+
+def _object_path(sha):
+    return os.path.join(OBJECTS_DIR, sha[:2], sha)
+
+
+def _write_object(sha, data):
+    path = _object_path(sha)
+    if os.path.isfile(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_object(sha):
+    with open(_object_path(sha), "rb") as f:
+        return f.read()
+
+
+def _store_file(path):
+    """Hash `path` and make sure its content is in the object store; (sha, size) or None."""
+    key = stat_key(path)
+    if key is None:
+        return None
+    memo = _digest_memo.get(path)
+    if memo is not None and memo[0] == key and os.path.isfile(_object_path(memo[1])):
+        return memo[1], key[0]
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    sha = hashlib.sha256(data).hexdigest()
+    _write_object(sha, data)
+    _digest_memo[path] = (key, sha)
+    return sha, len(data)
+
+
+def _backup_sources():
+    """(absolute path, display name) of every file a snapshot covers."""
+    sources = [(os.path.abspath(fp), os.path.basename(fp)) for fp in get_all_styles_file_paths()]
+    sources.append((os.path.abspath(PRESETS_FILE), "presets.json"))
+    return [(p, n) for p, n in sources if os.path.isfile(p)]
+
+
+def _new_snapshot_id(now):
+    base = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+    micro = int((now % 1) * 1_000_000)
+    while os.path.exists(os.path.join(MANIFESTS_DIR, f"{base}_{micro:06d}.json")):
+        micro = (micro + 1) % 1_000_000
+    return f"{base}_{micro:06d}"
+
+
+def load_manifest(snapshot_id):
+    """Parsed manifest for `snapshot_id`, or None for unknown / malformed ids."""
+    if not isinstance(snapshot_id, str) or not _SNAPSHOT_ID_RE.match(snapshot_id):
+        return None
+    try:
+        with open(os.path.join(MANIFESTS_DIR, snapshot_id + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _manifest_ids():
+    try:
+        names = os.listdir(MANIFESTS_DIR)
+    except OSError:
+        return []
+    return sorted(n[:-5] for n in names if n.endswith(".json") and _SNAPSHOT_ID_RE.match(n[:-5]))
+
+
+def _summary(manifest, unchanged=None):
+    out = {
+        "id": manifest["id"],
+        "created": manifest.get("created"),
+        "kind": manifest.get("kind", "manual"),
+        "partial": bool(manifest.get("partial")),
+        "files": len(manifest.get("files", [])),
+        "size": sum(f.get("size", 0) for f in manifest.get("files", [])),
+    }
+    if unchanged is not None:
+        out["unchanged"] = unchanged
+    return out
+
+
+def list_snapshots():
+    """Summaries of all snapshots, newest first."""
+    out = []
+    for sid in reversed(_manifest_ids()):
+        manifest = load_manifest(sid)
+        if manifest is not None:
+            out.append(_summary(manifest))
+    return out
+
+
+def _write_manifest(files, kind, created_ts, partial=False):
+    manifest = {
+        "id": _new_snapshot_id(created_ts),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created_ts)),
+        "created_ts": created_ts,
+        "kind": kind,
+        "files": files,
+    }
+    if partial:
+        manifest["partial"] = True
+    os.makedirs(MANIFESTS_DIR, exist_ok=True)
+    write_file_bytes(
+        os.path.join(MANIFESTS_DIR, manifest["id"] + ".json"),
+        json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8"),
+    )
+    return manifest
+
+
+def _latest_manifest(match=None):
+    for sid in reversed(_manifest_ids()):
+        manifest = load_manifest(sid)
+        if manifest is not None and (match is None or match(manifest)):
+            return manifest
+    return None
+
+
+def create_snapshot(kind="manual"):
+    """
+    Record the current library as a snapshot; returns its summary, or None if there is
+    nothing to back up.
+
+    Only file versions not yet in the object store are copied. When nothing changed since
+    the newest full snapshot, no manifest is written and that snapshot is returned with
+    ``unchanged: true``.
+    """
+    with resource_lock("backup"):
+        files = []
+        for path, name in _backup_sources():
+            stored = _store_file(path)
+            if stored is not None:
+                files.append({"path": path, "name": name, "sha256": stored[0], "size": stored[1]})
+        if not files:
+            return None
+        latest = _latest_manifest(lambda m: not m.get("partial"))
+        if latest is not None and latest.get("files") == files:
+            return _summary(latest, unchanged=True)
+        now = time.time()
+        manifest = _write_manifest(files, kind, now)
+        prune_snapshots(now)
+        return _summary(manifest, unchanged=False)
+
+
+def _pending_notes():
+    """(stem, note) of every complete pre-edit copy in `PRE_EDIT_DIR`, oldest first."""
+    try:
+        names = sorted(os.listdir(PRE_EDIT_DIR))
+    except OSError:
+        return []
+    out = []
+    for n in names:
+        if not n.endswith(".json"):
+            continue
+        stem = n[:-5]
+        try:
+            with open(os.path.join(PRE_EDIT_DIR, n), "r", encoding="utf-8") as f:
+                note = json.load(f)
+        except Exception:
+            continue
+        if isinstance(note, dict) and (
+            note.get("absent") or os.path.isfile(os.path.join(PRE_EDIT_DIR, stem + ".csv"))
+        ):
+            out.append((stem, note))
+    return out
+
+
+def compact_pre_edit_snapshots():
+    """
+    Move pre-edit copies from `PRE_EDIT_DIR` into the object store, one partial
+    ``pre-edit`` manifest per edit group; returns the number of manifests written.
+
+    Runs on the I/O pool after each CSV write, so edits only pay for a hard link.
+    """
+    with resource_lock("backup"):
+        groups = {}
+        still_writing = open_edit_groups()
+        for stem, note in _pending_notes():
+            group = note.get("group") or stem
+            if group not in still_writing:
+                groups.setdefault(group, []).append((stem, note))
+        written = 0
+        for items in groups.values():
+            files, seen = [], set()
+            for stem, note in items:
+                path = note.get("path")
+                # Several writes of one file in a group: the first copy is the pre-group state.
+                if not isinstance(path, str) or path in seen:
+                    continue
+                seen.add(path)
+                if note.get("absent"):
+                    # The group created this file: undo deletes it.
+                    files.append({"path": path, "name": os.path.basename(path), "absent": True, "size": 0})
+                    continue
+                with open(os.path.join(PRE_EDIT_DIR, stem + ".csv"), "rb") as f:
+                    data = f.read()
+                sha = hashlib.sha256(data).hexdigest()
+                _write_object(sha, data)
+                files.append({"path": path, "name": os.path.basename(path), "sha256": sha, "size": len(data)})
+            if files:
+                _write_manifest(files, "pre-edit", items[0][1].get("ts") or time.time(), partial=True)
+                written += 1
+            for stem, _ in items:
+                for ext in (".csv", ".json"):
+                    try:
+                        os.remove(os.path.join(PRE_EDIT_DIR, stem + ext))
+                    except OSError:
+                        pass
+        _remove_stale_pending()
+        if written:
+            prune_snapshots()
+        return written
+
+
+def _remove_stale_pending(max_age=3600):
+    """Drop copies whose note was never written (crash between link and note)."""
+    try:
+        names = os.listdir(PRE_EDIT_DIR)
+    except OSError:
+        return
+    cutoff = time.time() - max_age
+    for n in names:
+        path = os.path.join(PRE_EDIT_DIR, n)
+        if n.endswith(".csv") and n[:-4] + ".json" not in names:
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def _kept_ids(manifests, now):
+    """Snapshot ids retained by `RETENTION`; `manifests` is newest first."""
+    keep = {m["id"] for m in manifests[:max(RETENTION.get("last", 0), 1)]}
+    for rule, fmt in _BUCKET_FORMATS.items():
+        limit = RETENTION.get(rule, 0)
+        buckets = set()
+        for m in manifests:
+            if len(buckets) >= limit:
+                break
+            bucket = time.strftime(fmt, time.localtime(m.get("created_ts", now)))
+            if bucket not in buckets:
+                buckets.add(bucket)
+                keep.add(m["id"])
+    return keep
+
+
+def prune_snapshots(now=None):
+    """Apply `RETENTION` to the manifests, then delete objects no manifest references."""
+    if now is None:
+        now = time.time()
+    with resource_lock("backup"):
+        manifests = [m for m in (load_manifest(s) for s in _manifest_ids()) if m]
+        manifests.sort(key=lambda m: m.get("created_ts", 0), reverse=True)
+        keep = _kept_ids([m for m in manifests if not m.get("partial")], now)
+        partial = [m for m in manifests if m.get("partial")]
+        min_ts = now - UNDO_RETENTION["days"] * 86400
+        keep.update(m["id"] for m in partial[:UNDO_RETENTION["last"]] if m.get("created_ts", now) >= min_ts)
+        referenced = set()
+        for m in manifests:
+            if m["id"] in keep:
+                referenced.update(f["sha256"] for f in m.get("files", []) if "sha256" in f)
+            else:
+                try:
+                    os.remove(os.path.join(MANIFESTS_DIR, m["id"] + ".json"))
+                except OSError:
+                    pass
+        if not os.path.isdir(OBJECTS_DIR):
+            return
+        for sub in os.listdir(OBJECTS_DIR):
+            sub_dir = os.path.join(OBJECTS_DIR, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for sha in os.listdir(sub_dir):
+                if sha not in referenced:
+                    try:
+                        os.remove(os.path.join(sub_dir, sha))
+                    except OSError:
+                        pass
+            if not os.listdir(sub_dir):
+                shutil.rmtree(sub_dir, ignore_errors=True)
+
+
+def _live_files():
+    files = []
+    for path, name in _backup_sources():
+        key = stat_key(path)
+        memo = _digest_memo.get(path)
+        if memo is not None and memo[0] == key:
+            sha = memo[1]
+        else:
+            stored = _store_file(path)
+            if stored is None:
+                continue
+            sha = stored[0]
+        files.append({"path": path, "name": name, "sha256": sha})
+    return files
+
+
+def _read_version(entry):
+    if entry is None:
+        return b""
+    try:
+        return read_object(entry["sha256"])
+    except OSError:
+        return b""
+
+
+def _style_changes(path, old_entry, new_entry):
+    """Style-level diff of two versions of one CSV: added / removed / changed names."""
+    old = {s.name: s for s in parse_styles_bytes(_read_version(old_entry), path)}
+    new = {s.name: s for s in parse_styles_bytes(_read_version(new_entry), path)}
+    return {
+        "added": sorted(n for n in new if n not in old),
+        "removed": sorted(n for n in old if n not in new),
+        "changed": sorted(n for n in new if n in old and new[n].astuple()[:5] != old[n].astuple()[:5]),
+    }
+
+
+def diff_snapshots(from_id, to_id=None):
+    """
+    Compare two snapshots (`to_id` None = the live files); returns an ``error`` dict for
+    unknown ids. Modified CSVs include a style-level ``styles`` breakdown.
+    """
+    old = load_manifest(from_id)
+    if old is None:
+        return {"error": "Snapshot not found"}
+    if to_id:
+        new = load_manifest(to_id)
+        if new is None:
+            return {"error": "Snapshot not found"}
+        new_files = new.get("files", [])
+    else:
+        with resource_lock("backup"):
+            new_files = _live_files()
+    listed = {f["path"] for f in old.get("files", [])}
+    # ``absent`` entries (pre-edit of a created file) say the file did not exist yet.
+    old_by_path = {f["path"]: f for f in old.get("files", []) if not f.get("absent")}
+    new_by_path = {f["path"]: f for f in new_files}
+    if old.get("partial"):
+        # A partial snapshot says nothing about files it does not list.
+        new_by_path = {p: f for p, f in new_by_path.items() if p in listed}
+    files = []
+    for path in list(old_by_path) + [p for p in new_by_path if p not in old_by_path]:
+        a, b = old_by_path.get(path), new_by_path.get(path)
+        if a is None:
+            status = "added"
+        elif b is None:
+            status = "removed"
+        elif a["sha256"] == b["sha256"]:
+            status = "unchanged"
+        else:
+            status = "modified"
+        item = {"path": path, "name": (a or b)["name"], "status": status}
+        if status != "unchanged" and path.lower().endswith(".csv"):
+            item["styles"] = _style_changes(path, a, b)
+        files.append(item)
+    return {"from": from_id, "to": to_id or "current", "files": files}
+
+
+def restore_snapshot(snapshot_id, files=None):
+    """
+    Write files from a snapshot back to their original paths.
+
+    `files` optionally limits the restore to entries whose path or basename is listed.
+    The current versions of those files are snapshotted first (partial, kind
+    ``pre-restore``) so a restore can itself be undone. Files created after the snapshot
+    are left in place, except those a ``pre-edit`` snapshot lists as ``absent``: that edit
+    created them, so they are deleted.
+    """
+    manifest = load_manifest(snapshot_id)
+    if manifest is None:
+        return {"error": "Snapshot not found"}
+    wanted = set(files or ())
+    entries = [
+        f for f in manifest.get("files", [])
+        if not wanted or f["path"] in wanted or f["name"] in wanted
+    ]
+    if not entries:
+        return {"error": "No matching files in snapshot"}
+    with resource_lock("backup"):
+        before = _snapshot_paths([f["path"] for f in entries], "pre-restore")
+        restored, unchanged = [], []
+        touched_csv = False
+        for f in entries:
+            if f.get("absent"):
+                with csv_write_lock(f["path"]):
+                    try:
+                        os.remove(f["path"])
+                    except FileNotFoundError:
+                        unchanged.append(f["path"])
+                        continue
+                restored.append(f["path"])
+                touched_csv = True
+                continue
+            data = read_object(f["sha256"])
+            is_presets = os.path.abspath(f["path"]) == os.path.abspath(PRESETS_FILE)
+            lock = resource_lock(PRESETS_FILE) if is_presets else csv_write_lock(f["path"])
+            with lock:
+                current = _store_file(f["path"]) if os.path.isfile(f["path"]) else None
+                if current is not None and current[0] == f["sha256"]:
+                    unchanged.append(f["path"])
+                    continue
+                os.makedirs(os.path.dirname(f["path"]), exist_ok=True)
+                write_file_bytes(f["path"], data)
+            restored.append(f["path"])
+            touched_csv = touched_csv or not is_presets
+    if touched_csv:
+        invalidate_styles_cache()
+        request_prompt_styles_reload()
+    return {
+        "ok": True,
+        "restored": restored,
+        "unchanged": unchanged,
+        "backup": before["id"] if before else None,
+    }
+
+
+def _snapshot_paths(paths, kind):
+    """Partial snapshot of the current versions of `paths` (missing files skipped)."""
+    files = []
+    for path in paths:
+        stored = _store_file(path)
+        if stored is not None:
+            files.append({"path": path, "name": os.path.basename(path), "sha256": stored[0], "size": stored[1]})
+    if not files:
+        return None
+    return _write_manifest(files, kind, time.time(), partial=True)
+
+
+def undo_last_edit(source=None):
+    """
+    Roll back the newest not-yet-undone CSV edit (optionally the newest touching `source`,
+    a path or basename). Repeated calls step further back; each undo is itself recorded
+    as a ``pre-restore`` snapshot.
+    """
+    with resource_lock("backup"):
+        compact_pre_edit_snapshots()
+
+        def match(m):
+            if m.get("kind") != "pre-edit":
+                return False
+            return not source or any(source in (f["path"], f["name"]) for f in m.get("files", []))
+
+        manifest = _latest_manifest(match)
+        if manifest is None:
+            return {"error": "Nothing to undo"}
+        result = restore_snapshot(manifest["id"])
+        if "error" not in result:
+            # Consumed: the next undo goes one step further back.
+            try:
+                os.remove(os.path.join(MANIFESTS_DIR, manifest["id"] + ".json"))
+            except OSError:
+                pass
+            result["snapshot"] = manifest["id"]
+        return result
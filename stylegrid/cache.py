@@ -1,11 +1,45 @@
-"""CSV file hash tracking and styles list cache."""
+"""CSV file hash tracking, styles list cache and the on-disk catalog snapshot."""
 
 import hashlib
-
-from stylegrid.config import get_all_styles_file_paths
+import marshal
+import os
+import tempfile
+
+from stylegrid import events, metrics
+from stylegrid.config import (
+    CATALOG_SNAPSHOT_FILE,
+    LOAD_THREADS,
+    get_all_styles_file_paths,
+    get_styles_dirs,
+    stat_key,
+)
+from stylegrid.loader import load_styles_files, merge_styles
+from stylegrid.records import style_from_fields
+from stylegrid.workers import resource_lock, submit_background
+
+# Bump SNAPSHOT_VERSION whenever Style fields or parse rules change; old snapshots are ignored.
+# The payload is marshal (about 6x faster to load than pickling Style objects), so the
+# marshal format version is part of the header too.
+SNAPSHOT_MAGIC = b"SGCAT"
+SNAPSHOT_VERSION = 1
 
 _file_hashes = {}
-_styles_cache = {"data": None, "hashes": {}}
+# (size, mtime_ns, inode) per file at the last scan; unchanged files are not re-hashed.
+_file_stats = {}
+# path -> (stat fingerprint, md5, tuple of Style). Loaded from CATALOG_SNAPSHOT_FILE on
+# first use, so a restart only reparses files that changed while the WebUI was down.
+_catalog = None
+_catalog_gen = 0
+_snapshot_written_gen = 0
+# Bumped whenever the merged styles list is rebuilt; derived caches key on it.
+_styles_gen = 0
+_styles_cache = {"data": None, "hashes": {}, "categories": None}
+# Set when invalidate_styles_cache already published "catalog" for a write the next scan will
+# see; that scan then rebuilds without announcing the same change twice.
+_change_announced = False
+# Serializes hash scans and rebuilds so concurrent requests share one reload.
+_cache_lock = resource_lock("styles_cache")
+_snapshot_lock = resource_lock("catalog_snapshot")
 
 
 def _hash_file(path):
@@ -19,43 +53,187 @@ def _hash_file(path):
         return None
 
 
+def _snapshot_header():
+    return SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION, marshal.version])
+
+
+def _read_snapshot():
+    """Catalog entries from CATALOG_SNAPSHOT_FILE; {} when missing, stale or unreadable."""
+    header = _snapshot_header()
+    try:
+        with open(CATALOG_SNAPSHOT_FILE, "rb") as f:
+            data = f.read()
+        if not data.startswith(header):
+            return {}
+        payload = marshal.loads(memoryview(data)[len(header):])
+        del data
+        return {
+            fp: (key, h, tuple(map(style_from_fields, rows)))
+            for fp, (key, h, rows) in payload.items()
+        }
+    except Exception:
+        return {}
+
+
+def _write_snapshot(entries, gen):
+    """Persist catalog entries (temp file + rename); older generations never overwrite newer."""
+    global _snapshot_written_gen
+    with _snapshot_lock:
+        if gen <= _snapshot_written_gen:
+            return
+        d = os.path.dirname(CATALOG_SNAPSHOT_FILE)
+        try:
+            os.makedirs(d, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=d, prefix=".catalog.", suffix=".tmp")
+            try:
+                payload = {
+                    fp: (key, h, [s.astuple() for s in styles])
+                    for fp, (key, h, styles) in entries.items()
+                }
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_snapshot_header())
+                    marshal.dump(payload, f)
+                os.replace(tmp_path, CATALOG_SNAPSHOT_FILE)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception:
+            # Best effort: a missing snapshot only costs a full parse on the next start.
+            return
+        _snapshot_written_gen = gen
+
+
+def _catalog_entries():
+    global _catalog
+    if _catalog is None:
+        _catalog = _read_snapshot()
+    return _catalog
+
+
 def check_files_changed():
     """Re-scan style CSV files and invalidate cached style list on any hash/set change."""
-    global _file_hashes
-    changed = False
-    current = {}
-    for fp in get_all_styles_file_paths():
-        h = _hash_file(fp)
-        current[fp] = h
-        if fp not in _file_hashes or _file_hashes[fp] != h:
+    global _file_hashes, _file_stats, _change_announced
+    with _cache_lock, metrics.timed("cache_scan_seconds"):
+        entries = _catalog_entries()
+        changed = False
+        current = {}
+        stats = {}
+        for fp in get_all_styles_file_paths(get_styles_dirs()):
+            key = stat_key(fp)
+            stats[fp] = key
+            if key is not None and _file_stats.get(fp) == key and fp in _file_hashes:
+                h = _file_hashes[fp]
+            elif key is not None and fp in entries and entries[fp][0] == key:
+                h = entries[fp][1]
+            else:
+                h = _hash_file(fp)
+            current[fp] = h
+            if fp not in _file_hashes or _file_hashes[fp] != h:
+                changed = True
+
+        if set(_file_hashes.keys()) != set(current.keys()):
             changed = True
-
-    if set(_file_hashes.keys()) != set(current.keys()):
-        changed = True
-    _file_hashes = current
-    # Hashes are updated here; without clearing, the next get_cached_styles() would call
-    # check_files_changed() again, see no diff, and keep serving stale _styles_cache["data"].
-    if changed:
-        invalidate_styles_cache()
-    return changed
+        _file_hashes = current
+        _file_stats = stats
+        announced = _change_announced
+        _change_announced = False
+        # Hashes are updated here; without clearing, the next get_cached_styles() would call
+        # check_files_changed() again, see no diff, and keep serving stale _styles_cache["data"].
+        if changed:
+            _styles_cache["data"] = None
+            if not announced:
+                events.publish("catalog")
+        return changed
+
+
+def _build_catalog():
+    """Merge per-file entries in discovery order, reparsing only files whose fingerprint moved."""
+    global _catalog_gen
+    entries = _catalog_entries()
+    paths = list(_file_hashes)
+    stale = [
+        fp for fp in paths
+        if fp not in entries or entries[fp][0] is None or entries[fp][0] != _file_stats.get(fp)
+    ]
+    removed = [fp for fp in entries if fp not in _file_hashes]
+    for fp in removed:
+        del entries[fp]
+    if stale:
+        parsed = load_styles_files(stale, threads=LOAD_THREADS)
+        for fp, styles in zip(stale, parsed):
+            entries[fp] = (_file_stats.get(fp), _file_hashes.get(fp), tuple(styles))
+    if stale or removed:
+        _catalog_gen += 1
+        submit_background(_write_snapshot, dict(entries), _catalog_gen)
+    return merge_styles(entries[fp][2] for fp in paths)
 
 
 def get_cached_styles():
     """Return cached parsed styles; reload when check_files_changed detects file updates."""
-    global _styles_cache
-
-    if check_files_changed() or _styles_cache["data"] is None:
-        from stylegrid.csv_io import load_all_styles
-
-        _styles_cache["data"] = load_all_styles()
-        _styles_cache["hashes"] = dict(_file_hashes)
-    return _styles_cache["data"]
-
-
-def invalidate_styles_cache():
-    """Drop the in-memory parsed styles so the next read forces a reload from CSV files."""
-    global _styles_cache
-    _styles_cache["data"] = None
+    global _styles_cache, _styles_gen
+
+    with _cache_lock:
+        if check_files_changed() or _styles_cache["data"] is None:
+            metrics.inc("cache_requests", result="miss")
+            with metrics.timed("cache_rebuild_seconds"):
+                _styles_cache["data"] = _build_catalog()
+            _styles_gen += 1
+            _styles_cache["hashes"] = dict(_file_hashes)
+            _styles_cache["categories"] = None
+        else:
+            metrics.inc("cache_requests", result="hit")
+        return _styles_cache["data"]
+
+
+def styles_generation():
+    """Counter of styles-list rebuilds; memoize per-catalog work against it."""
+    return _styles_gen
+
+
+def get_styles_by_file():
+    """
+    ``{csv path: (md5, styles parsed from it)}`` for the current catalog, keyed like
+    ``Style.source_file`` (absolute).
+
+    Rows are per file, before the cross-file merge, so a caller interested in a few CSVs
+    never walks the whole catalog.
+    """
+    with _cache_lock:
+        get_cached_styles()
+        entries = _catalog_entries()
+        return {os.path.abspath(fp): (entries[fp][1], entries[fp][2]) for fp in _file_hashes if fp in entries}
+
+
+def get_cached_categories():
+    """`categorize_styles(get_cached_styles())`, computed once per catalog rebuild."""
+    with _cache_lock:
+        styles = get_cached_styles()
+        if _styles_cache["categories"] is None:
+            from stylegrid.csv_io import categorize_styles
+
+            _styles_cache["categories"] = categorize_styles(styles)
+        return _styles_cache["categories"]
+
+
+def invalidate_styles_cache(reparse=False):
+    """
+    Drop the in-memory parsed styles so the next read rebuilds the list.
+
+    Files with unchanged fingerprints are reused from the catalog; `reparse=True` also
+    forgets them (and their hashes) so every CSV is read and parsed again. Publishes one
+    ``catalog`` event; the rescan that then finds the written file stays quiet.
+    """
+    global _styles_cache, _catalog, _file_stats, _change_announced
+    with _cache_lock:
+        _styles_cache["data"] = None
+        _change_announced = True
+        if reparse:
+            _catalog = {}
+            _file_stats = {}
+    events.publish("catalog")
 
 
 def styles_cache_hashes():
@@ -0,0 +1,180 @@
+"""
+Prompt composition shared by `StyleGridScript.process` and ``POST /style_grid/compose``.
+
+Order matches generation: ``{sg:…}`` wildcards are resolved and the prompt deduplicated,
+then silent styles are applied (``{prompt}`` placeholders wrap the prompt, other style
+tags are merged in, case-insensitively deduplicated). Lookups derived from the catalog
+(name map, wildcard pools) are built once per catalog list, and recent compositions are
+kept in a small LRU so the UI can preview on every selection change.
+"""
+
+import random
+import re
+import threading
+from collections import OrderedDict
+
+from stylegrid.wildcards import SG_TOKEN_RE, resolve_sg_wildcards
+
+COMPOSE_CACHE_SIZE = 256
+
+_WEIGHTED_TAG_RE = re.compile(r"^\((.+?):\d+\.?\d*\)$")
+
+# Catalog-derived lookups and cached compositions; reset when the catalog list changes.
+_state = {"styles": None, "style_map": None, "pools": {}, "results": OrderedDict()}
+_state_lock = threading.Lock()
+
+
+def dedup_prompt(prompt_str):
+    """Remove duplicate tags from a comma-separated prompt.
+    First occurrence wins. Weighted (tag:1.3) and plain tag are
+    treated as the same identity via normalized key. BREAK is kept
+    as-is and never deduplicated.
+    """
+    out = []
+    seen = set()
+    for seg in prompt_str.split(","):
+        s = seg.strip()
+        if not s:
+            continue
+        if s.upper() == "BREAK":
+            out.append(s)
+            continue
+        m = _WEIGHTED_TAG_RE.match(s)
+        key = m.group(1).strip().lower() if m else s.lower()
+        if key not in seen:
+            seen.add(key)
+            out.append(s)
+    return ", ".join(out)
+
+
+def _merge_tags(prompt, style_tags):
+    current = [t.strip() for t in prompt.split(",") if t.strip()]
+    seen = {t.lower() for t in current}
+    result = list(current)
+    for t in style_tags:
+        if t.lower() not in seen:
+            result.append(t)
+            seen.add(t.lower())
+    return ", ".join(result)
+
+
+def _catalog_state(all_styles):
+    """Per-catalog lookups; caller holds `_state_lock`."""
+    if _state["styles"] is not all_styles:
+        _state.update(styles=all_styles, style_map=None, pools={}, results=OrderedDict())
+    return _state
+
+
+def _style_map(all_styles):
+    with _state_lock:
+        state = _catalog_state(all_styles)
+        if state["style_map"] is None:
+            # Last row wins for names present in several files, as before.
+            state["style_map"] = {s.name: s for s in all_styles}
+        return state["style_map"]
+
+
+def wildcard_pools(all_styles, active_source=""):
+    """``{category (lowercase): [styles]}`` for `{sg:…}` resolution, scoped to `active_source`."""
+    with _state_lock:
+        state = _catalog_state(all_styles)
+        pools = state["pools"].get(active_source)
+        if pools is not None:
+            return pools
+    pool = all_styles
+    if active_source:
+        pool = [s for s in all_styles if (s.source_file or "") == active_source]
+        if not pool:  # unknown source — fall back to all
+            pool = all_styles
+    pools = {}
+    for s in pool:
+        pools.setdefault(s.category.lower(), []).append(s)
+    with _state_lock:
+        _catalog_state(all_styles)["pools"][active_source] = pools
+    return pools
+
+
+def _rngs(seeds, count):
+    """One RNG per prompt seeded from `seeds` (cycled), or the shared `random` module."""
+    if seeds:
+        return [random.Random(seeds[i % len(seeds)]) for i in range(count)]
+    return [random] * count
+
+
+def resolve_prompts(prompts, pools, seeds=None):
+    """Resolve wildcards and dedup each prompt; `seeds[i]` makes prompt `i` reproducible."""
+    return [
+        dedup_prompt(resolve_sg_wildcards(prompt, pools, rng))
+        for prompt, rng in zip(prompts, _rngs(seeds, len(prompts)))
+    ]
+
+
+def apply_styles(prompts, negative_prompts, style_names, all_styles):
+    """Apply silent styles to resolved prompt lists; returns new (prompts, negative_prompts)."""
+    style_map = _style_map(all_styles)
+    prompts = list(prompts)
+    negative_prompts = list(negative_prompts)
+    prompts_add = []
+    neg_add = []
+    for name in style_names:
+        s = style_map.get(name)
+        if not s:
+            continue
+        if s.prompt:
+            if "{prompt}" in s.prompt:
+                prompts = [s.prompt.replace("{prompt}", p) for p in prompts]
+            else:
+                prompts_add.append(s.prompt)
+        if s.negative_prompt:
+            if "{prompt}" in s.negative_prompt:
+                negative_prompts = [s.negative_prompt.replace("{prompt}", p) for p in negative_prompts]
+            else:
+                neg_add.append(s.negative_prompt)
+    if prompts_add:
+        style_tags = [t.strip() for s in prompts_add for t in s.split(",") if t.strip()]
+        prompts = [_merge_tags(p, style_tags) for p in prompts]
+    if neg_add:
+        style_neg_tags = [t.strip() for s in neg_add for t in s.split(",") if t.strip()]
+        negative_prompts = [_merge_tags(p, style_neg_tags) for p in negative_prompts]
+    return prompts, negative_prompts
+
+
+def compose_prompts(prompts, negative_prompts, style_names, all_styles, active_source="", seeds=None):
+    """
+    Final (prompts, negative_prompts) as generation would produce them.
+
+    Seeded and wildcard-free compositions are deterministic and served from the LRU;
+    unseeded ones with ``{sg:…}`` tokens are recomputed (the pick is random each time).
+    """
+    prompts = list(prompts)
+    negative_prompts = list(negative_prompts)
+    seeds = list(seeds) if seeds else None
+    deterministic = seeds is not None or not any(
+        SG_TOKEN_RE.search(p) for p in prompts + negative_prompts
+    )
+    key = None
+    if deterministic:
+        key = (
+            tuple(prompts), tuple(negative_prompts), tuple(style_names), active_source,
+            tuple(seeds) if seeds else None,
+        )
+        with _state_lock:
+            results = _catalog_state(all_styles)["results"]
+            hit = results.get(key)
+            if hit is not None:
+                results.move_to_end(key)
+                return list(hit[0]), list(hit[1])
+    pools = wildcard_pools(all_styles, active_source)
+    composed = apply_styles(
+        resolve_prompts(prompts, pools, seeds),
+        resolve_prompts(negative_prompts, pools, seeds),
+        style_names,
+        all_styles,
+    )
+    if key is not None:
+        with _state_lock:
+            results = _catalog_state(all_styles)["results"]
+            results[key] = (tuple(composed[0]), tuple(composed[1]))
+            if len(results) > COMPOSE_CACHE_SIZE:
+                results.popitem(last=False)
+    return composed
@@ -1,6 +1,10 @@
 """Paths and static config for Style Grid."""
 
+import fnmatch
+import json
 import os
+import threading
+import time
 
 from modules import shared  # type: ignore[reportMissingImports]
 
@@ -9,15 +13,111 @@ EXT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(EXT_DIR, "data")
 PRESETS_FILE = os.path.join(DATA_DIR, "presets.json")
 USAGE_FILE = os.path.join(DATA_DIR, "usage.json")
+CATEGORY_ORDER_FILE = os.path.join(DATA_DIR, "category_order.json")
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+# Pre-edit copies of CSVs waiting to be compacted into the backup store (see csv_io).
+PRE_EDIT_DIR = os.path.join(BACKUP_DIR, "pending")
 THUMBNAILS_DIR = os.path.join(DATA_DIR, "thumbnails")
+CATALOG_SNAPSHOT_FILE = os.path.join(DATA_DIR, "catalog.snapshot")
+# cProfile dumps / collapsed stacks captured on request (see stylegrid.profiling).
+PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
+# Built V2 React app (`npm run build` in ui/), served by stylegrid.ui_shell.
+UI_DIST_DIR = os.path.join(EXT_DIR, "ui", "dist")
+# Optional extra style locations; see docs/CSV_FORMAT.md ("sources.json config").
+SOURCES_FILE = os.path.join(EXT_DIR, "config", "sources.json")
+# Optional thumbnail generation profiles; see docs/API.md ("POST /thumbnail/generate").
+THUMBNAIL_PROFILES_FILE = os.path.join(EXT_DIR, "config", "thumbnail_profiles.json")
+
+
+def _env_int(name, default=0):
+    try:
+        return max(int(os.environ.get(name, default)), 0)
+    except ValueError:
+        return default
+
+
+# Opt-in parallel catalog load (stylegrid.loader.load_styles_files); 0 keeps the serial loop.
+# Threads help with many packs on slow/network storage. There is deliberately no process
+# setting: spawn workers re-import the WebUI's launch.py / webui.py as their main module.
+LOAD_THREADS = _env_int("STYLE_GRID_LOAD_THREADS")
+# Seconds between background sweeps of the thumbnail index (stylegrid.thumbnails); 0 disables.
+THUMBNAIL_SWEEP_INTERVAL = _env_int("STYLE_GRID_THUMBNAIL_SWEEP", 600)
 
 for _d in [DATA_DIR, BACKUP_DIR]:
     os.makedirs(_d, exist_ok=True)
 os.makedirs(THUMBNAILS_DIR, exist_ok=True)
 
 
+# A directory modified this recently may still change within the same mtime tick, so its
+# listing is not trusted from cache (same idea as git's "racily clean" index entries).
+RACY_NS = 2_000_000_000
+
+
+def stat_key(path):
+    """``(size, mtime_ns, inode)`` of `path`, or None when it cannot be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # The inode changes on every atomic write_styles_csv, even within one mtime tick.
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+_discovery_lock = threading.Lock()
+_sources_cache = {"sig": None, "dirs": [], "files": [], "options": {}}
+# dir -> (mtime_ns, csv paths, subdirs), scanned when the stored mtime was safely in the past.
+_dir_listing_cache = {}
+_discovery_cache = {"paths": [], "index": {}}
+
+
+def _load_sources():
+    """
+    Extra style locations from `SOURCES_FILE`, re-read only when that file changes.
+
+    Entries are CSV paths, directory paths, or objects
+    ``{"path": ..., "recursive": bool, "ignore": [glob, ...]}``; relative paths resolve
+    against the WebUI root. Returns (dirs, files, {dir: (recursive, ignore)}).
+    """
+    try:
+        st = os.stat(SOURCES_FILE)
+        sig = (SOURCES_FILE, st.st_mtime_ns, st.st_size, os.getcwd())
+    except OSError:
+        sig = None
+    with _discovery_lock:
+        if _sources_cache["sig"] == sig:
+            return _sources_cache["dirs"], _sources_cache["files"], _sources_cache["options"]
+    dirs, files, options = [], [], {}
+    entries = []
+    if sig is not None:
+        try:
+            with open(SOURCES_FILE, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception:
+            entries = []
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+            continue
+        path = os.path.abspath(os.path.expanduser(entry["path"]))
+        ignore = tuple(p for p in entry.get("ignore") or () if isinstance(p, str))
+        if os.path.isdir(path) or not path.lower().endswith(".csv"):
+            dirs.append(path)
+            options[path] = (bool(entry.get("recursive")), ignore)
+        else:
+            files.append(path)
+    with _discovery_lock:
+        _sources_cache.update(sig=sig, dirs=dirs, files=files, options=options)
+    return dirs, files, options
+
+
 def get_styles_dirs():
+    """
+    Directories scanned for style CSVs, in priority order.
+
+    The extension ``styles/`` dir comes first, then parents of the WebUI style files;
+    ``samples/``, the WebUI root and directories from ``config/sources.json`` are appended
+    last so thumbnail hashes computed against earlier entries stay stable.
+    """
     ext_styles_dir = os.path.join(EXT_DIR, "styles")
     all_styles_parent_dirs_paths = [ext_styles_dir]
     seen = {ext_styles_dir}
@@ -26,34 +126,116 @@ def get_styles_dirs():
         if p_abs_str not in seen:
             all_styles_parent_dirs_paths.append(p_abs_str)
             seen.add(p_abs_str)
+    for extra in (os.path.join(EXT_DIR, "samples"), os.getcwd(), *_load_sources()[0]):
+        if extra not in seen:
+            all_styles_parent_dirs_paths.append(extra)
+            seen.add(extra)
     return all_styles_parent_dirs_paths
 
 
-def get_all_styles_file_paths():
-    ext_styles_dir = os.path.join(EXT_DIR, "styles")
-    all_styles_file_paths = []
-    if not os.path.isdir(ext_styles_dir):
-        for fname in sorted(os.listdir(ext_styles_dir)):
-            if fname.lower().endswith(".csv"):
-                filepath = os.path.join(ext_styles_dir, fname)
-                all_styles_file_paths.append(filepath)
-
-    samples_dir = os.path.join(EXT_DIR, "samples")
-    if os.path.isdir(samples_dir):
-        for fname in sorted(os.listdir(samples_dir)):
-            if fname.lower().endswith(".csv"):
-                filepath = os.path.join(samples_dir, fname)
-                all_styles_file_paths.append(filepath)
+def _is_ignored(name, rel, ignore):
+    return any(fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(rel, pat) for pat in ignore)
 
+
+def _list_dir(d, now_ns):
+    """(csv paths, subdirs) of `d`, sorted by name; cached while the dir mtime is unchanged."""
+    try:
+        mtime_ns = os.stat(d).st_mtime_ns
+    except OSError:
+        return [], []
+    cached = _dir_listing_cache.get(d)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1], cached[2]
+    csvs, subdirs = [], []
+    try:
+        with os.scandir(d) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return [], []
+    for e in entries:
+        try:
+            if e.name.lower().endswith(".csv") and e.is_file():
+                csvs.append(e.path)
+            elif e.is_dir() and not e.name.startswith("."):
+                subdirs.append(e.path)
+        except OSError:
+            continue
+    if mtime_ns < now_ns - RACY_NS:
+        _dir_listing_cache[d] = (mtime_ns, csvs, subdirs)
+    else:
+        _dir_listing_cache.pop(d, None)
+    return csvs, subdirs
+
+
+def _scan_dir(root, recursive, ignore, now_ns, out):
+    """Append CSVs under `root` to `out`: files of a dir first, then its subdirs, by name."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        csvs, subdirs = _list_dir(d, now_ns)
+        rel_dir = os.path.relpath(d, root).replace(os.sep, "/")
+        for fp in csvs:
+            name = os.path.basename(fp)
+            rel = name if rel_dir == "." else rel_dir + "/" + name
+            if not ignore or not _is_ignored(name, rel, ignore):
+                out.append(fp)
+        if recursive:
+            keep = []
+            for sd in subdirs:
+                name = os.path.basename(sd)
+                rel = name if rel_dir == "." else rel_dir + "/" + name
+                if not ignore or not _is_ignored(name, rel, ignore):
+                    keep.append(sd)
+            stack.extend(reversed(keep))
+
+
+def _discover(styles_dirs):
+    """(paths, basename index) for `styles_dirs`; the index is rebuilt only when paths change."""
+    _, source_files, options = _load_sources()
     try:
         shared_paths = [str(p.absolute()) for p in shared.prompt_styles.all_styles_files]
-        all_styles_file_paths.extend(shared_paths)
     except Exception:
         shared_paths = []
-    webui_root = os.getcwd()
-    for fname in sorted(os.listdir(webui_root)):
-        if fname.lower().endswith(".csv"):
-            fp = os.path.join(webui_root, fname)
-            if fp not in all_styles_file_paths:
+    now_ns = time.time_ns()
+    with _discovery_lock:
+        found = []
+        for d in styles_dirs:
+            recursive, ignore = options.get(d, (False, ()))
+            _scan_dir(d, recursive, ignore, now_ns, found)
+        all_styles_file_paths = []
+        seen = set()
+        for fp in found:
+            if fp not in seen:
+                seen.add(fp)
+                all_styles_file_paths.append(fp)
+        for fp in shared_paths + source_files:
+            if fp not in seen and os.path.isfile(fp):
+                seen.add(fp)
                 all_styles_file_paths.append(fp)
-    return all_styles_file_paths
+        if _discovery_cache["paths"] != all_styles_file_paths:
+            index = {}
+            for fp in all_styles_file_paths:
+                index.setdefault(os.path.basename(fp), fp)
+            _discovery_cache.update(paths=all_styles_file_paths, index=index)
+        return _discovery_cache["paths"], _discovery_cache["index"]
+
+
+def get_all_styles_file_paths(styles_dirs=None):
+    """
+    Return every style CSV path: ``*.csv`` in each of `styles_dirs` (default
+    `get_styles_dirs()`; recursive for ``sources.json`` dirs that ask for it), plus WebUI
+    style files and ``sources.json`` CSVs that live elsewhere or lack a .csv suffix.
+
+    Directory listings are cached and revalidated by directory mtime, so repeated calls
+    cost one ``stat`` per directory instead of a listdir of the whole WebUI root.
+    """
+    if styles_dirs is None:
+        styles_dirs = get_styles_dirs()
+    return list(_discover(styles_dirs)[0])
+
+
+def find_styles_file(basename, styles_dirs=None):
+    """First discovered CSV (in `get_all_styles_file_paths` order) named `basename`, or None."""
+    if styles_dirs is None:
+        styles_dirs = get_styles_dirs()
+    return _discover(styles_dirs)[1].get(basename)
@@ -1,14 +1,312 @@
 """CSV parsing, style CRUD, categorization."""
 
+import contextlib
 import csv
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locks only
+    fcntl = None
 
 from stylegrid.cache import invalidate_styles_cache
-from stylegrid.config import EXT_DIR, get_all_styles_file_paths
+from stylegrid.config import (
+    DATA_DIR,
+    EXT_DIR,
+    LOAD_THREADS,
+    PRE_EDIT_DIR,
+    find_styles_file,
+    get_all_styles_file_paths,
+    get_styles_dirs,
+)
+from stylegrid.loader import load_styles_files, merge_styles, parse_styles_file
+from stylegrid.workers import resource_lock, submit_background
 from modules import shared
 
 # Canonical CSV column order used when writing style rows back to disk.
 FIELDNAMES = ["name", "prompt", "negative_prompt", "description", "category"]
+# Advisory lock files live here, not next to user CSVs, so style dirs stay clean.
+LOCKS_DIR = os.path.join(DATA_DIR, "locks")
+
+# write_styles_csv keeps the replaced version for undo (see _snapshot_before_write).
+PRE_EDIT_SNAPSHOTS = True
+
+# shared.prompt_styles.reload() reparses every WebUI style file; edits only schedule it.
+RELOAD_DEBOUNCE_SECONDS = 2.0
+RELOAD_MAX_DELAY_SECONDS = 10.0
+
+_reload_lock = threading.Lock()
+_edit_state = threading.local()
+# Groups still writing; compaction leaves their copies pending so a batch stays one step.
+_open_edit_groups = set()
+_open_edit_groups_lock = threading.Lock()
+_reload_timer = None
+_reload_first_request = None
+
+
+def request_prompt_styles_reload():
+    """
+    Schedule a coalesced ``shared.prompt_styles.reload()``.
+
+    Each call pushes the reload back by `RELOAD_DEBOUNCE_SECONDS`, but never more than
+    `RELOAD_MAX_DELAY_SECONDS` after the first pending request.
+    """
+    global _reload_timer, _reload_first_request
+    with _reload_lock:
+        now = time.monotonic()
+        if _reload_first_request is None:
+            _reload_first_request = now
+        delay = min(RELOAD_DEBOUNCE_SECONDS, _reload_first_request + RELOAD_MAX_DELAY_SECONDS - now)
+        if _reload_timer is not None:
+            _reload_timer.cancel()
+        _reload_timer = threading.Timer(max(delay, 0.0), flush_prompt_styles_reload)
+        _reload_timer.daemon = True
+        _reload_timer.start()
+
+
+def flush_prompt_styles_reload():
+    """Run a pending WebUI styles reload now; returns False when nothing was pending."""
+    global _reload_timer, _reload_first_request
+    with _reload_lock:
+        if _reload_first_request is None:
+            return False
+        _reload_first_request = None
+        if _reload_timer is not None:
+            _reload_timer.cancel()
+            _reload_timer = None
+        # Reload under the lock so a generation flushing concurrently waits for fresh styles.
+        shared.prompt_styles.reload()
+    return True
+
+
+@contextlib.contextmanager
+def csv_write_lock(path):
+    """
+    Hold the per-file write lock for a styles CSV read-modify-write.
+
+    Combines the in-process `resource_lock` with an advisory ``fcntl`` lock on a
+    sidecar file, so a second WebUI process sharing the extension also waits.
+    """
+    path = os.path.abspath(path)
+    with resource_lock(path):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(LOCKS_DIR, exist_ok=True)
+        lock_name = hashlib.md5(path.encode("utf-8")).hexdigest() + ".lock"
+        with open(os.path.join(LOCKS_DIR, lock_name), "a") as lf:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+
+def _replace(src, dst):
+    """os.replace with a short retry: on Windows a reader holding `dst` open makes it fail."""
+    for attempt in range(10):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == 9:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _default_file_mode():
+    # The umask can only be read by setting it; done once at import, before worker threads.
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+# Mode for files `_atomic_write` creates (mkstemp would leave them 0600).
+NEW_FILE_MODE = _default_file_mode()
+
+
+def _atomic_write(path, mode, fill, **open_kwargs):
+    """Temp file in the target dir, `fill(f)`, fsync, atomic rename, fsync the directory."""
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=d, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            fill(f)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            target_mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            target_mode = NEW_FILE_MODE
+        try:
+            os.chmod(tmp_path, target_mode)
+        except OSError:
+            pass
+        _replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        try:
+            dir_fd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+@contextlib.contextmanager
+def pre_edit_group():
+    """Make every CSV written in this block (one batch or import) a single undo step."""
+    if getattr(_edit_state, "group", None):
+        yield
+        return
+    group = _edit_state.group = f"{time.time_ns()}_{threading.get_ident()}"
+    with _open_edit_groups_lock:
+        _open_edit_groups.add(group)
+    try:
+        yield
+    finally:
+        _edit_state.group = None
+        with _open_edit_groups_lock:
+            _open_edit_groups.discard(group)
+        submit_background(_compact_pre_edit_snapshots)
+
+
+def open_edit_groups():
+    """Pre-edit groups whose batch has not finished writing yet."""
+    with _open_edit_groups_lock:
+        return frozenset(_open_edit_groups)
+
+
+def _snapshot_before_write(path):
+    """
+    Keep the version of `path` that a write is about to replace, for undo.
+
+    The atomic rename gives the new content a new inode, so a hard link to the old one
+    preserves it without copying (a copy is the fallback across filesystems). The link and
+    a small JSON note go to `PRE_EDIT_DIR`; `backups.compact_pre_edit_snapshots` later
+    moves them into the deduplicated store off the request path. A write that creates
+    `path` leaves only a note marked ``absent``, so undo removes the new file.
+    """
+    if not PRE_EDIT_SNAPSHOTS:
+        return None
+    path = os.path.abspath(path)
+    absent = not os.path.isfile(path)
+    stem = f"{time.time_ns()}_{hashlib.md5(path.encode('utf-8')).hexdigest()[:12]}"
+    try:
+        os.makedirs(PRE_EDIT_DIR, exist_ok=True)
+        if not absent:
+            kept = os.path.join(PRE_EDIT_DIR, stem + ".csv")
+            try:
+                os.link(path, kept)
+            except OSError:
+                shutil.copy2(path, kept)
+        note = {"path": path, "group": getattr(_edit_state, "group", None) or stem, "ts": time.time()}
+        if absent:
+            note["absent"] = True
+        with open(os.path.join(PRE_EDIT_DIR, stem + ".json"), "w", encoding="utf-8") as f:
+            json.dump(note, f)
+    except OSError:
+        _discard_pre_edit(stem)
+        return None
+    return stem
+
+
+def _discard_pre_edit(stem):
+    for ext in (".json", ".csv"):
+        try:
+            os.remove(os.path.join(PRE_EDIT_DIR, stem + ext))
+        except OSError:
+            pass
+
+
+def _compact_pre_edit_snapshots():
+    from stylegrid.backups import compact_pre_edit_snapshots
+
+    compact_pre_edit_snapshots()
+
+
+def write_styles_csv(path, header, rows):
+    """
+    Crash-safe write of a styles CSV: temp file in the same dir, fsync, atomic rename.
+
+    Readers see either the old or the new file, never a truncated one. Callers doing
+    read-modify-write must hold `csv_write_lock(path)`. The replaced version is kept as a
+    pre-edit snapshot so the edit can be undone (``POST /style_grid/undo``).
+    """
+    def fill(f):
+        writer = csv.writer(f)
+        writer.writerow(header or FIELDNAMES)
+        for row in rows:
+            writer.writerow(row)
+
+    stem = _snapshot_before_write(path)
+    try:
+        _atomic_write(path, "w", fill, encoding="utf-8-sig", newline="")
+    except BaseException:
+        if stem:
+            _discard_pre_edit(stem)
+        raise
+    if stem:
+        submit_background(_compact_pre_edit_snapshots)
+
+
+class StagedStylesCsv:
+    """
+    A styles CSV written row by row to a temp file beside `path`; `commit()` swaps it in
+    atomically, `discard()` drops it. Lets a long import stream rows to several outputs
+    and publish them only once every input was read.
+    """
+
+    def __init__(self, path, header=None):
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=d, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+        self._f = os.fdopen(fd, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(header or FIELDNAMES)
+        self.rows = 0
+
+    def writerow(self, row):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def commit(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        with csv_write_lock(self.path):
+            stem = _snapshot_before_write(self.path)
+            _replace(self.tmp_path, self.path)
+        if stem:
+            submit_background(_compact_pre_edit_snapshots)
+
+    def discard(self):
+        try:
+            self._f.close()
+        finally:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+
+
+def write_file_bytes(path, data):
+    """Crash-safe replace of `path` with raw bytes (backup restore); same rules as `write_styles_csv`."""
+    _atomic_write(path, "wb", lambda f: f.write(data))
 
 
 def _sanitize_csv_cell(value):
@@ -20,202 +318,244 @@ def _sanitize_csv_cell(value):
 
 def parse_styles_csv(filepath):
     """
-    Parse one styles CSV file as UTF-8/UTF-8-BOM and return normalized style dicts.
+    Parse one styles CSV file as UTF-8/UTF-8-BOM and return `Style` records.
 
-    Returns list items with keys: name, prompt, negative_prompt, description,
-    category_explicit, source (basename), and source_file (absolute path).
+    Each record exposes name, prompt, negative_prompt, description, category_explicit,
+    source (basename; ``_source`` alias) and source_file (absolute path).
+
+    The file is read in one call and parsed from memory; per-file values (basename,
+    absolute path) are computed once and interned, and repeated category strings share
+    one object, which matters for packs with 100k+ rows.
     """
-    styles = []
-    if not os.path.isfile(filepath):
-        return styles
-    try:
-        with open(filepath, "r", encoding="utf-8-sig") as f:
-            reader = csv.reader(f)
-            header = None
-            for row in reader:
-                if not row or all(c.strip() == "" for c in row):
-                    continue
-                if header is None and row[0].strip().lower() == "name":
-                    header = row
-                    continue
-                if header is None:
-                    header = ["name", "prompt", "negative_prompt"]
-                name = row[0].strip() if len(row) > 0 else ""
-                prompt = row[1].strip() if len(row) > 1 else ""
-                negative = row[2].strip() if len(row) > 2 else ""
-                description = row[3].strip() if len(row) > 3 else ""
-                category_explicit = row[4].strip() if len(row) > 4 else ""
-                if name:
-                    base = os.path.basename(filepath)
-                    styles.append({
-                        "name": name,
-                        "prompt": prompt,
-                        "negative_prompt": negative,
-                        "description": description,
-                        "category_explicit": category_explicit,
-                        "source": base,
-                        "_source": base,
-                        "source_file": os.path.abspath(filepath),
-                    })
-    except Exception:
-        return styles
-    return styles
-
-
-def load_all_styles():
-    """Merge CSVs from all style dirs; uniqueness is (source_file abspath, name), not basename."""
-    all_styles = []
-    seen_keys = set()
-    for filepath in get_all_styles_file_paths():
-        for s in parse_styles_csv(filepath):
-            key = (s.get("source_file", ""), s["name"])
-            if key not in seen_keys:
-                seen_keys.add(key)
-                all_styles.append(s)
-    return all_styles
-
-
-def _category_from_filename(source):
-    if not source or not isinstance(source, str):
-        return ""
-    base = os.path.splitext(source.strip())[0].strip()
-    if not base:
-        return ""
-    return base[0].upper() + base[1:]
+    return parse_styles_file(filepath)
+
+
+def load_all_styles(threads=None, processes=0):
+    """
+    Merge CSVs from all style dirs; uniqueness is (source_file abspath, name), not basename.
+
+    `threads` defaults to `LOAD_THREADS`; `processes` is for standalone tools only (see
+    `stylegrid.loader.load_styles_files`). Files are merged in discovery order whatever
+    order they finish parsing in.
+    """
+    if threads is None:
+        threads = LOAD_THREADS
+    paths = get_all_styles_file_paths(get_styles_dirs())
+    return merge_styles(load_styles_files(paths, threads=threads, processes=processes))
 
 
 def categorize_styles(styles):
+    """Group Style records by their precomputed category, each group sorted by display name."""
     categories = {}
     for s in styles:
-        name = s["name"]
-        source = s.get("source") or ""
-        explicit_cat = s.get("category_explicit", "").strip()
-        if explicit_cat:
-            cat = explicit_cat
-            display = name.split("_", 1)[1].replace("_", " ") if "_" in name else name
-        elif "_" in name:
-            before, rest = name.split("_", 1)
-            cat = before.upper()
-            display = rest.replace("_", " ")
-        elif "-" in name:
-            before, rest = name.split("-", 1)
-            cat = before
-            display = rest.replace("-", " ")
-        else:
-            cat = _category_from_filename(source)
-            if not cat:
-                cat = "OTHER"
-            display = name.replace("_", " ")
-        s["category"] = cat
-        s["display_name"] = display
-        s["has_placeholder"] = "{prompt}" in (s.get("prompt") or "") or "{prompt}" in (s.get("negative_prompt") or "")
+        cat = s.category
         if cat not in categories:
             categories[cat] = []
         categories[cat].append(s)
     for cat in categories:
-        categories[cat].sort(key=lambda x: (x.get("display_name") or x["name"] or "").lower())
+        categories[cat].sort(key=lambda x: (x.display_name or x.name or "").lower())
     return categories
 
 
-def save_style_to_csv(name, prompt, negative_prompt, description="", source_file=None, category=None):
-    """
-    Upsert a style row in target CSV: replace the first matching name row, or append new row.
-    """
-    if source_file:
-        source_file = os.path.basename(source_file)
-        if not source_file.lower().endswith('.csv'):
-            source_file = source_file + '.csv'
-    if not source_file:
-        source_file = "styles.csv"
-    target_path = None
-    for fp in get_all_styles_file_paths():
-        if os.path.basename(fp) == source_file:
-            target_path = fp
-            break
-    if not target_path:
-        ext_styles = os.path.join(EXT_DIR, "styles")
-        os.makedirs(ext_styles, exist_ok=True)
-        target_path = os.path.join(ext_styles, source_file)
+def _normalize_source_name(source_file):
+    source_file = os.path.basename(source_file)
+    if not source_file.lower().endswith('.csv'):
+        source_file = source_file + '.csv'
+    return source_file
+
+
+def _find_target_path(source_file):
+    """Scanned CSV path whose basename equals `source_file`, or None."""
+    return find_styles_file(source_file, get_styles_dirs())
+
+
+def _new_target_path(source_file):
+    ext_styles = os.path.join(EXT_DIR, "styles")
+    os.makedirs(ext_styles, exist_ok=True)
+    return os.path.join(ext_styles, source_file)
+
+
+def _read_csv_rows(path):
+    """Return (header or None, data rows) for a styles CSV; missing file reads as empty."""
     rows = []
     header = None
-    if os.path.isfile(target_path):
-        with open(target_path, "r", encoding="utf-8-sig") as f:
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8-sig") as f:
             reader = csv.reader(f)
             for row in reader:
                 if header is None and row and row[0].strip().lower() == "name":
                     header = row
                     continue
                 rows.append(row)
-    if not header:
-        header = ["name", "prompt", "negative_prompt", "description", "category"]
-
-    def make_row(existing_row=None):
-        existing_cat = existing_row[4].strip() if (
-            existing_row and len(existing_row) > 4) else ""
-        if category is None:
-            cat_cell = existing_cat
-        else:
-            cat_cell = str(category).strip()
-            cat_cell = _sanitize_csv_cell(cat_cell) if cat_cell else ""
-        return [name, prompt, negative_prompt, _sanitize_csv_cell(description), cat_cell]
-
-    found = False
+    return header, rows
+
+
+def make_row(name, prompt, negative_prompt, description, category, existing_row=None):
+    """
+    One ``FIELDNAMES`` row with description and category sanitized for spreadsheets.
+
+    ``category=None`` keeps the category of `existing_row` (the row being replaced).
+    """
+    existing_cat = existing_row[4].strip() if (
+        existing_row and len(existing_row) > 4) else ""
+    if category is None:
+        cat_cell = existing_cat
+    else:
+        cat_cell = str(category).strip()
+        cat_cell = _sanitize_csv_cell(cat_cell) if cat_cell else ""
+    return [name, prompt, negative_prompt, _sanitize_csv_cell(description), cat_cell]
+
+
+def _upsert_row(rows, name, prompt, negative_prompt, description, category):
+    """Replace the first row named `name` (or append); mutates `rows` in place."""
     for i, row in enumerate(rows):
         if row and row[0].strip() == name:
-            rows[i] = make_row(rows[i])
-            found = True
-            break
-    if not found:
-        rows.append(make_row())
-    with open(target_path, "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        for row in rows:
-            writer.writerow(row)
+            rows[i] = make_row(name, prompt, negative_prompt, description, category, rows[i])
+            return
+    rows.append(make_row(name, prompt, negative_prompt, description, category))
+
+
+def save_style_to_csv(name, prompt, negative_prompt, description="", source_file=None, category=None):
+    """
+    Upsert a style row in target CSV: replace the first matching name row, or append new row.
+    """
+    source_file = _normalize_source_name(source_file) if source_file else "styles.csv"
+    target_path = _find_target_path(source_file) or _new_target_path(source_file)
+    with csv_write_lock(target_path):
+        header, rows = _read_csv_rows(target_path)
+        _upsert_row(rows, name, prompt, negative_prompt, description, category)
+        write_styles_csv(target_path, header, rows)
     invalidate_styles_cache()
-    shared.prompt_styles.reload()
+    request_prompt_styles_reload()
     return True
 
 
 def delete_style_from_csv(name, source_file=None):
     """Delete style row by name from selected/inferred source; returns False when not found."""
     if not source_file:
-        for s in load_all_styles():
-            if s["name"] == name:
-                source_file = s.get("source", "styles.csv")
-                break
+        source_file = _infer_source(name)
     if not source_file:
         return False
-    if source_file:
-        source_file = os.path.basename(source_file)
-        if not source_file.lower().endswith('.csv'):
-            source_file = source_file + '.csv'
-    target_path = None
-    for fp in get_all_styles_file_paths():
-        if os.path.basename(fp) == source_file:
-            target_path = fp
-            break
+    target_path = _find_target_path(_normalize_source_name(source_file))
     if not target_path:
         return False
-    rows = []
-    header = None
-    with open(target_path, "r", encoding="utf-8-sig") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if header is None and row and row[0].strip().lower() == "name":
-                header = row
-                continue
-            if row and row[0].strip() != name:
-                rows.append(row)
-    with open(target_path, "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
-        writer.writeheader()
-        for row in rows:
-            row_dict = {
-                fn: (row[i].strip() if i < len(row) and row[i] is not None else "")
-                for i, fn in enumerate(FIELDNAMES)
-            }
-            writer.writerow(row_dict)
+    with csv_write_lock(target_path):
+        _header, rows = _read_csv_rows(target_path)
+        rows = [
+            [(row[i].strip() if i < len(row) and row[i] is not None else "") for i in range(len(FIELDNAMES))]
+            for row in rows
+            if row and row[0].strip() != name
+        ]
+        write_styles_csv(target_path, FIELDNAMES, rows)
     invalidate_styles_cache()
-    shared.prompt_styles.reload()
+    request_prompt_styles_reload()
     return True
+
+
+def _infer_source(name, styles=None):
+    for s in styles if styles is not None else load_all_styles():
+        if s["name"] == name:
+            return s.get("source", "styles.csv")
+    return None
+
+
+BATCH_OPS = ("upsert", "delete", "rename")
+
+
+def apply_style_operations(operations, on_rename=None):
+    """
+    Apply many upsert/delete/rename operations with one read-modify-write per CSV.
+
+    Each operation is a dict with ``op`` plus the fields of the single-style routes
+    (``name``, ``source``, ``prompt``, ...); ``rename`` also takes ``new_name`` and keeps
+    unspecified fields of the existing row. Operations on the same file apply in order.
+    A file whose operations all failed is not rewritten. After each file is written,
+    ``on_rename(csv_path, old_name, new_name)`` runs for its successful renames.
+    Returns one result dict per operation (``{"ok": True}`` or ``{"error": ...}``).
+    """
+    results = [None] * len(operations)
+    by_path = {}
+    inferred = None
+    for i, op in enumerate(operations):
+        kind = op.get("op") if isinstance(op, dict) else None
+        name = (op.get("name") or "").strip() if kind else ""
+        if kind not in BATCH_OPS:
+            results[i] = {"error": "Unknown op"}
+            continue
+        if not name:
+            results[i] = {"error": "Name required"}
+            continue
+        source_file = op.get("source")
+        if not source_file and kind != "upsert":
+            if inferred is None:
+                inferred = load_all_styles()
+            source_file = _infer_source(name, inferred)
+            if not source_file:
+                results[i] = {"error": "Style not found"}
+                continue
+        source_file = _normalize_source_name(source_file) if source_file else "styles.csv"
+        target_path = _find_target_path(source_file)
+        if not target_path:
+            if kind != "upsert":
+                results[i] = {"error": "Source not found"}
+                continue
+            target_path = _new_target_path(source_file)
+        by_path.setdefault(target_path, []).append((i, kind, name, op))
+
+    written = False
+    with pre_edit_group():
+        for target_path, file_ops in by_path.items():
+            renamed = []
+            with csv_write_lock(target_path):
+                header, rows = _read_csv_rows(target_path)
+                for i, kind, name, op in file_ops:
+                    results[i] = _apply_row_op(rows, kind, name, op)
+                    if kind == "rename" and "error" not in results[i]:
+                        renamed.append((name, op["new_name"].strip()))
+                if all("error" in results[i] for i, _kind, _name, _op in file_ops):
+                    continue
+                write_styles_csv(target_path, header, rows)
+                written = True
+            if on_rename is not None:
+                for old_name, new_name in renamed:
+                    if old_name != new_name:
+                        on_rename(target_path, old_name, new_name)
+
+    if written:
+        invalidate_styles_cache()
+        request_prompt_styles_reload()
+    return results
+
+
+def _apply_row_op(rows, kind, name, op):
+    if kind == "upsert":
+        _upsert_row(
+            rows,
+            name,
+            op.get("prompt", ""),
+            op.get("negative_prompt", ""),
+            op.get("description", ""),
+            op.get("category"),
+        )
+        return {"ok": True}
+    if kind == "delete":
+        rows[:] = [row for row in rows if not (row and row[0].strip() == name)]
+        return {"ok": True}
+    new_name = (op.get("new_name") or "").strip()
+    if not new_name:
+        return {"error": "new_name required"}
+    idx = next((j for j, row in enumerate(rows) if row and row[0].strip() == name), None)
+    if idx is None:
+        return {"error": "Style not found"}
+    if new_name != name and any(row and row[0].strip() == new_name for row in rows):
+        return {"error": "Name already exists"}
+    row = list(rows[idx]) + [""] * (len(FIELDNAMES) - len(rows[idx]))
+    rows[idx] = make_row(
+        new_name,
+        op.get("prompt", row[1]),
+        op.get("negative_prompt", row[2]),
+        op.get("description", row[3]),
+        op.get("category"),
+        row,
+    )
+    return {"ok": True}
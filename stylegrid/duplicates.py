@@ -0,0 +1,260 @@
+"""
+Exact and near-duplicate detection over the cached catalog (``GET /style_grid/duplicates``).
+
+Exact duplicates share `records.content_hash` (same normalized prompt and negative prompt).
+Near-duplicates are found with MinHash over each style's tag set and LSH banding, so only
+styles that collide in some band are compared: roughly linear in catalog size instead of
+the all-pairs set intersections `detect_conflicts` does for a handful of selected styles.
+Candidates are confirmed with the exact Jaccard similarity of the tag sets.
+
+numpy vectorizes the signatures when it is importable (always the case inside the WebUI);
+the pure-Python path computes the same signatures, just slower.
+"""
+
+import itertools
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with every WebUI install
+    np = None
+
+from stylegrid.records import normalize_prompt, normalized_content_hash
+
+NUM_PERM = 64
+# BANDS x ROWS == NUM_PERM. With 16 bands of 4 rows a pair at Jaccard 0.8 becomes a
+# candidate with probability > 0.999 and one at 0.3 with about 0.12.
+BANDS = 16
+ROWS = 4
+DEFAULT_THRESHOLD = 0.8
+# Buckets larger than this (very generic tag sets) are only compared to their first
+# member, which keeps candidate generation linear.
+MAX_BUCKET_PAIRS = 64
+MAX_GROUPS = 500
+
+_MASK64 = (1 << 64) - 1
+# Fixed multiply-shift hash family: results are stable across runs and processes.
+_rng_state = 0x9E3779B97F4A7C15
+_PERM_A = []
+_PERM_B = []
+for _ in range(NUM_PERM):
+    _rng_state = (_rng_state * 6364136223846793005 + 1442695040888963407) & _MASK64
+    _PERM_A.append(_rng_state | 1)
+    _rng_state = (_rng_state * 6364136223846793005 + 1442695040888963407) & _MASK64
+    _PERM_B.append(_rng_state)
+
+# Per-catalog analysis; the catalog is rebuilt (new list) whenever a CSV changes.
+_memo = {"styles": None, "analysis": None}
+_memo_lock = threading.Lock()
+
+
+def _tag_set(prompt_norm, negative_norm):
+    tokens = {t for t in prompt_norm.split(",") if t and t != "{prompt}"}
+    tokens.update("-" + t for t in negative_norm.split(",") if t and t != "{prompt}")
+    return frozenset(tokens)
+
+
+def style_tokens(style):
+    """Tag set used for similarity: normalized positive tags plus ``-``-prefixed negative tags."""
+    return _tag_set(normalize_prompt(style.prompt), normalize_prompt(style.negative_prompt))
+
+
+def _token_hash(token):
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _signatures_python(token_ids, token_hashes):
+    per_token = [
+        [(((a * h + b) & _MASK64) >> 32) for a, b in zip(_PERM_A, _PERM_B)]
+        for h in token_hashes
+    ]
+    return [
+        tuple(map(min, zip(*(per_token[t] for t in ids)))) if ids else None
+        for ids in token_ids
+    ]
+
+
+def _signatures_numpy(token_ids, token_hashes):
+    a = np.array(_PERM_A, dtype=np.uint64)
+    b = np.array(_PERM_B, dtype=np.uint64)
+    h = np.array(token_hashes, dtype=np.uint64)[:, None]
+    # uint64 arithmetic wraps mod 2**64, which is exactly the multiply-shift family.
+    per_token = ((h * a + b) >> np.uint64(32)).astype(np.uint32)
+    n = len(token_ids)
+    sigs = np.zeros((n, NUM_PERM), dtype=np.uint32)
+    lengths = np.fromiter(map(len, token_ids), dtype=np.int64, count=n)
+    ends = np.cumsum(lengths)
+    flat = np.fromiter(itertools.chain.from_iterable(token_ids), dtype=np.int64, count=int(ends[-1]) if n else 0)
+    # Chunk on style boundaries so the gathered (slots x NUM_PERM) block stays around 16 MB.
+    chunk_slots = 1 << 16
+    start = 0
+    while start < n:
+        base = ends[start - 1] if start else 0
+        end = max(int(np.searchsorted(ends, base + chunk_slots, side="right")), start + 1)
+        rows = np.arange(start, end)[lengths[start:end] > 0]
+        if len(rows):
+            offsets = (ends[rows] - lengths[rows]) - base
+            block = per_token[flat[base:ends[end - 1]]]
+            sigs[rows] = np.minimum.reduceat(block, offsets, axis=0)
+        start = end
+    return sigs
+
+
+def _analyze(styles):
+    """(content hashes, tag sets, MinHash signatures) for `styles`, memoized per catalog list."""
+    with _memo_lock:
+        if _memo["styles"] is styles:
+            return _memo["analysis"]
+    # Packs repeat the same negative prompt (and often prompts) across many rows.
+    normalized = {}
+
+    def norm(text):
+        n = normalized.get(text)
+        if n is None:
+            n = normalized[text] = normalize_prompt(text)
+        return n
+
+    hashes = []
+    token_sets = []
+    for s in styles:
+        p, n = norm(s.prompt), norm(s.negative_prompt)
+        hashes.append(normalized_content_hash(p, n))
+        token_sets.append(_tag_set(p, n))
+    vocab = {}
+    token_ids = [[vocab.setdefault(t, len(vocab)) for t in ts] for ts in token_sets]
+    token_hashes = [_token_hash(t) for t in vocab]
+    if np is not None and token_hashes:
+        sigs = _signatures_numpy(token_ids, token_hashes)
+    else:
+        sigs = _signatures_python(token_ids, token_hashes)
+    analysis = (hashes, token_sets, sigs)
+    with _memo_lock:
+        _memo.update(styles=styles, analysis=analysis)
+    return analysis
+
+
+def _band_buckets(sigs, indices):
+    """Yield lists of style indices that share all ROWS values of some band."""
+    if np is not None and isinstance(sigs, np.ndarray):
+        sub = sigs[indices]
+        idx = np.asarray(indices)
+        for band in range(BANDS):
+            block = np.ascontiguousarray(sub[:, band * ROWS:(band + 1) * ROWS])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * ROWS))).ravel()
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+            ends = np.append(starts[1:], len(order))
+            multi = ends - starts > 1
+            members = idx[order]
+            for lo, hi in zip(starts[multi].tolist(), ends[multi].tolist()):
+                yield members[lo:hi].tolist()
+        return
+    for band in range(BANDS):
+        buckets = {}
+        lo, hi = band * ROWS, (band + 1) * ROWS
+        for i in indices:
+            buckets.setdefault(sigs[i][lo:hi], []).append(i)
+        for group in buckets.values():
+            if len(group) > 1:
+                yield group
+
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _ref(style):
+    return {"name": style.name, "source": style.source}
+
+
+def exact_duplicate_groups(styles):
+    """Groups of catalog styles whose normalized prompt pair is identical (content hash)."""
+    hashes = _analyze(styles)[0]
+    by_hash = {}
+    for s, h in zip(styles, hashes):
+        by_hash.setdefault(h, []).append(s)
+    return [
+        {"hash": h, "styles": [_ref(s) for s in members]}
+        for h, members in by_hash.items()
+        if len(members) > 1
+    ]
+
+
+def near_duplicate_groups(styles, threshold=DEFAULT_THRESHOLD):
+    """
+    Clusters of styles whose tag sets have Jaccard similarity >= `threshold` (0..1).
+
+    Each group lists its styles with their similarity to the group's first style. Exact
+    duplicates (identical tag sets) are folded into one representative before LSH and
+    reported as part of the same cluster, so they never flood a bucket.
+    """
+    _, token_sets, sigs = _analyze(styles)
+    reps = {}
+    members = {}
+    for i, ts in enumerate(token_sets):
+        if not ts:
+            continue
+        rep = reps.setdefault(ts, i)
+        members.setdefault(rep, []).append(i)
+    rep_indices = list(members)
+
+    parent = {i: i for i in rep_indices}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for bucket in _band_buckets(sigs, rep_indices):
+        if len(bucket) <= MAX_BUCKET_PAIRS:
+            pairs = ((bucket[x], bucket[y]) for x in range(len(bucket)) for y in range(x + 1, len(bucket)))
+        else:
+            pairs = ((bucket[0], other) for other in bucket[1:])
+        for i, j in pairs:
+            ri, rj = find(i), find(j)
+            key = (i, j) if i < j else (j, i)
+            if ri == rj or key in checked:
+                continue
+            checked.add(key)
+            if _jaccard(token_sets[i], token_sets[j]) >= threshold:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    clusters = {}
+    for rep in rep_indices:
+        clusters.setdefault(find(rep), []).extend(members[rep])
+    groups = []
+    for idxs in clusters.values():
+        if len(idxs) < 2:
+            continue
+        idxs.sort()
+        base = token_sets[idxs[0]]
+        groups.append({
+            "styles": [
+                dict(_ref(styles[i]), similarity=round(_jaccard(base, token_sets[i]), 3))
+                for i in idxs
+            ],
+        })
+    groups.sort(key=lambda g: -len(g["styles"]))
+    return groups
+
+
+def find_duplicates(styles, threshold=DEFAULT_THRESHOLD, near=True, limit=MAX_GROUPS):
+    """Report for the duplicates endpoint; group lists are truncated to `limit`."""
+    exact = exact_duplicate_groups(styles)
+    exact.sort(key=lambda g: -len(g["styles"]))
+    report = {
+        "styles": len(styles),
+        "exact": exact[:limit],
+        "exact_total": len(exact),
+    }
+    if near:
+        near_groups = near_duplicate_groups(styles, threshold)
+        report["near"] = near_groups[:limit]
+        report["near_total"] = len(near_groups)
+    return report
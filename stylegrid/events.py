@@ -0,0 +1,192 @@
+"""
+Server-push change notifications for ``GET /style_grid/events`` (Server-Sent Events).
+
+Writers call `publish` from any thread: the catalog cache on every invalidation, the
+preset / usage stores on save, the thumbnail generator on each status transition. Each
+connected tab gets its own bounded queue on the event loop. A small replay buffer lets
+a reconnecting EventSource resume from ``Last-Event-ID``; a client that fell too far
+behind gets one ``resync`` event and refetches everything.
+
+External edits to the CSVs are only visible to a hash scan. Instead of every tab polling
+``/check_update``, one watcher thread runs the scan every `WATCH_INTERVAL` seconds while
+at least one client is connected, and not at all otherwise.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+TOPICS = ("catalog", "thumbnail", "presets", "usage")
+# Seconds between catalog scans while someone is listening.
+WATCH_INTERVAL = 5.0
+# Comment line sent on idle connections so proxies keep them open and disconnects surface.
+HEARTBEAT_INTERVAL = 15.0
+# EventSource reconnect delay (ms) advertised to clients.
+RETRY_MS = 3000
+REPLAY_SIZE = 256
+QUEUE_SIZE = 256
+
+
+class EventHub:
+    """Fan-out of published events to subscriber queues; thread-safe on the publish side."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._revisions = dict.fromkeys(TOPICS, 0)
+        self._replay = deque(maxlen=REPLAY_SIZE)
+        self._subscribers = set()
+        self._watch_fn = None
+        self._watch_interval = WATCH_INTERVAL
+        self._watcher = None
+        self._wake = threading.Event()
+
+    def revisions(self):
+        with self._lock:
+            return dict(self._revisions)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, topic, **data):
+        """Record one change of `topic` and hand it to every subscriber; returns the event."""
+        with self._lock:
+            self._seq += 1
+            self._revisions[topic] = self._revisions.get(topic, 0) + 1
+            event = (self._seq, topic, dict(data, revision=self._revisions[topic]))
+            self._replay.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(event)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """
+        New `Subscription` bound to the running event loop.
+
+        With `last_event_id`, events published after it are queued first; if they already
+        left the replay buffer the subscription starts with a ``resync`` event.
+        """
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._seq:
+                oldest = self._replay[0][0] if self._replay else None
+                # Ids ahead of ours come from before a restart; gaps left the replay buffer.
+                if last_event_id > self._seq or oldest is None or oldest > last_event_id + 1:
+                    sub.resync(self._seq)
+                else:
+                    for event in self._replay:
+                        if event[0] > last_event_id:
+                            sub.queue.put_nowait(event)
+            self._subscribers.add(sub)
+            start_watcher = self._watch_fn is not None and (
+                self._watcher is None or not self._watcher.is_alive()
+            )
+            if start_watcher:
+                self._watcher = threading.Thread(target=self._watch_loop, name="sg-events-watch", daemon=True)
+        if start_watcher:
+            self._watcher.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+            idle = not self._subscribers
+        if idle:
+            self._wake.set()
+
+    def set_watcher(self, fn, interval=WATCH_INTERVAL):
+        """Run `fn` (the catalog scan) every `interval` seconds while anyone is subscribed."""
+        with self._lock:
+            self._watch_fn = fn
+            self._watch_interval = interval
+
+    def _watch_loop(self):
+        while True:
+            self._wake.wait(self._watch_interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    return
+                fn = self._watch_fn
+            try:
+                fn()
+            except Exception as e:  # keep watching; a bad CSV must not stop notifications
+                print(f"[Style Grid] Catalog watch failed: {e}")
+
+
+class Subscription:
+    """One connected client: a bounded queue filled from any thread via its loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # loop closed: the client is gone
+            pass
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.resync(event[0])
+
+    def resync(self, seq):
+        """Replace the backlog with a single ``resync`` event (client refetches everything)."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((seq, "resync", {}))
+        self.overflowed = True
+
+    async def get(self, timeout):
+        event = await asyncio.wait_for(self.queue.get(), timeout)
+        self.overflowed = False
+        return event
+
+
+def format_event(event):
+    seq, topic, data = event
+    return f"id: {seq}\nevent: {topic}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def event_stream(hub, last_event_id=None, is_disconnected=None, heartbeat=HEARTBEAT_INTERVAL):
+    """SSE body: ``retry`` + ``hello`` (current revisions), then events and heartbeats."""
+    sub = hub.subscribe(last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        yield f"event: hello\ndata: {json.dumps({'revisions': hub.revisions()})}\n\n"
+        while True:
+            try:
+                event = await sub.get(heartbeat)
+            except asyncio.TimeoutError:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(sub)
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+hub = EventHub()
+
+
+def publish(topic, **data):
+    """Publish on the process-wide hub (a lock and a deque append when nobody listens)."""
+    return hub.publish(topic, **data)
@@ -0,0 +1,288 @@
+"""
+Streaming, validated bulk import (ZIP / JSON / CSV) behind ``POST /style_grid/import``.
+
+Input is read from a file object (the spooled request body). CSV bodies and CSV entries
+of a ZIP are read row by row and streamed into staged output CSVs, so memory stays flat
+for large libraries; JSON has no streaming parser in the stdlib and is capped at
+`MAX_IMPORT_JSON_BYTES`. Rows are validated and deduplicated against the cached catalog
+by (name, content hash). Outputs are published only after every input was read, so a
+failed import leaves no files behind.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import time
+import zipfile
+
+from stylegrid.cache import get_cached_styles, invalidate_styles_cache
+from stylegrid.config import EXT_DIR
+from stylegrid.csv_io import FIELDNAMES, StagedStylesCsv, make_row, pre_edit_group
+from stylegrid.data_files import merge_presets
+from stylegrid.records import content_hash
+
+MAX_IMPORT_BYTES = 256 * 1024 * 1024
+MAX_IMPORT_JSON_BYTES = 64 * 1024 * 1024
+# ZIP entries are streamed, but a bomb could still fill the disk with output rows.
+MAX_IMPORT_UNPACKED_BYTES = 1024 * 1024 * 1024
+# Per-row report lists are truncated; the counters stay exact.
+MAX_REPORTED_ROWS = 500
+
+CONFLICT_MODES = ("keep", "skip", "rename")
+
+_SAFE_STEM_RE = re.compile(r"[^\w\- .]+")
+
+
+class ImportFailed(Exception):
+    """Import aborted before anything was written; `status` set for bad-request input."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _existing_index():
+    """name -> {content hash: [source basenames]} over the cached catalog."""
+    index = {}
+    for s in get_cached_styles():
+        index.setdefault(s.name, {}).setdefault(
+            content_hash(s.prompt, s.negative_prompt), []
+        ).append(s.source)
+    return index
+
+
+class _ImportRun:
+    def __init__(self, on_conflict):
+        self.on_conflict = on_conflict
+        self.index = _existing_index()
+        self.stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.out_dir = os.path.join(EXT_DIR, "styles")
+        self.outputs = {}
+        self.output_names = {}
+        self.imported_names = {}
+        self.imported = 0
+        self.duplicates = 0
+        self.conflicts = []
+        self.conflicts_total = 0
+        self.errors = []
+        self.presets = {}
+        self.unpacked = 0
+
+    def _output(self, label):
+        staged = self.outputs.get(label)
+        if staged is None:
+            stem = _SAFE_STEM_RE.sub("_", label).strip(" .") if label else ""
+            base = f"imported_{self.stamp}_{stem}" if stem else f"imported_{self.stamp}"
+            path = os.path.join(self.out_dir, base + ".csv")
+            n = 2
+            while os.path.exists(path) or any(o.path == path for o in self.outputs.values()):
+                path = os.path.join(self.out_dir, f"{base}_{n}.csv")
+                n += 1
+            staged = self.outputs[label] = StagedStylesCsv(path, FIELDNAMES)
+            self.output_names[label] = set()
+        return staged
+
+    def _error(self, entry, row, name, reason):
+        if len(self.errors) < MAX_REPORTED_ROWS:
+            self.errors.append({"entry": entry, "row": row, "name": name, "error": reason})
+
+    def _unique_name(self, name, taken):
+        n = 1
+        while True:
+            candidate = f"{name} (imported{'' if n == 1 else ' ' + str(n)})"
+            if candidate not in self.index and candidate not in self.imported_names and candidate not in taken:
+                return candidate
+            n += 1
+
+    def add(self, entry, row, label, fields):
+        name = str(fields.get("name") or "").strip()
+        if not name:
+            self._error(entry, row, "", "Name required")
+            return
+        prompt = str(fields.get("prompt") or "").strip()
+        negative = str(fields.get("negative_prompt") or "").strip()
+        h = content_hash(prompt, negative)
+        existing = self.index.get(name, {})
+        earlier = self.imported_names.get(name, set())
+        if h in existing or h in earlier:
+            self.duplicates += 1
+            return
+        taken = self.output_names.get(label, set())
+        action = "keep"
+        if existing or earlier:
+            action = self.on_conflict
+            self.conflicts_total += 1
+            if len(self.conflicts) < MAX_REPORTED_ROWS:
+                self.conflicts.append({
+                    "entry": entry,
+                    "row": row,
+                    "name": name,
+                    "existing_sources": sorted({src for srcs in existing.values() for src in srcs}),
+                    "action": action,
+                })
+            if action == "skip":
+                return
+        if action == "rename" or name in taken:
+            # One CSV cannot hold two rows with the same name.
+            name = self._unique_name(name, taken)
+        self._output(label).writerow(make_row(
+            name,
+            prompt,
+            negative,
+            str(fields.get("description") or "").strip(),
+            str(fields.get("category") or fields.get("category_explicit") or "").strip(),
+        ))
+        self.output_names[label].add(name)
+        self.imported_names.setdefault(name, set()).add(h)
+        self.imported += 1
+
+    def read_csv(self, binary, entry, label):
+        text = io.TextIOWrapper(binary, encoding="utf-8-sig", errors="replace", newline="")
+        columns = None
+        try:
+            for row_no, row in enumerate(csv.reader(text), start=1):
+                if not row or not any(c.strip() for c in row):
+                    continue
+                if columns is None:
+                    lowered = [c.strip().lower() for c in row]
+                    if lowered[0] == "name":
+                        columns = lowered
+                        continue
+                    columns = FIELDNAMES
+                self.add(entry, row_no, label, dict(zip(columns, row)))
+        except csv.Error as e:
+            raise ImportFailed(f"{entry}: malformed CSV ({e})") from None
+        finally:
+            text.detach()
+
+    def read_json_data(self, data, entry, label):
+        if isinstance(data, list):
+            data = {"styles": data}
+        if not isinstance(data, dict):
+            raise ImportFailed(f"{entry}: expected an object or a list of styles")
+        presets = data.get("presets")
+        if isinstance(presets, dict):
+            self.presets.update(presets)
+        styles = data.get("styles") or []
+        if not isinstance(styles, list):
+            raise ImportFailed(f"{entry}: styles must be a list")
+        for i, s in enumerate(styles, start=1):
+            if isinstance(s, dict):
+                self.add(entry, i, label, s)
+            else:
+                self._error(entry, i, "", "Style must be an object")
+
+    def read_zip(self, fileobj):
+        try:
+            zf = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile:
+            raise ImportFailed("Invalid ZIP file") from None
+        with zf:
+            for info in sorted(zf.infolist(), key=lambda i: i.filename):
+                if info.is_dir():
+                    continue
+                parts = info.filename.replace("\\", "/").split("/")
+                base = parts[-1]
+                if parts[0] == "__MACOSX" or base.startswith("."):
+                    continue
+                lower = base.lower()
+                if not lower.endswith((".csv", ".json")):
+                    continue
+                self.unpacked += info.file_size
+                if self.unpacked > MAX_IMPORT_UNPACKED_BYTES:
+                    raise ImportFailed("ZIP contents too large")
+                if lower.endswith(".csv"):
+                    with zf.open(info) as f:
+                        self.read_csv(f, info.filename, os.path.splitext(base)[0])
+                elif info.file_size > MAX_IMPORT_JSON_BYTES:
+                    raise ImportFailed(f"{info.filename}: JSON entry too large")
+                else:
+                    try:
+                        data = json.loads(zf.read(info).decode("utf-8-sig"))
+                    except ValueError:
+                        raise ImportFailed(f"{info.filename}: invalid JSON") from None
+                    if lower == "presets.json":
+                        if isinstance(data, dict):
+                            self.presets.update(data)
+                    else:
+                        self.read_json_data(data, info.filename, os.path.splitext(base)[0])
+
+    def finish(self):
+        written = []
+        with pre_edit_group():  # one undo step removes every file of the import
+            for staged in self.outputs.values():
+                if staged.rows:
+                    staged.commit()
+                    written.append(os.path.basename(staged.path))
+                else:
+                    staged.discard()
+        self.outputs = {}
+        if self.presets:
+            merge_presets(self.presets)
+        if written:
+            invalidate_styles_cache()
+        return {
+            "ok": True,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "conflicts": self.conflicts,
+            "conflicts_total": self.conflicts_total,
+            "errors": self.errors,
+            "files": written,
+            "presets": len(self.presets),
+        }
+
+    def abort(self):
+        for staged in self.outputs.values():
+            staged.discard()
+        self.outputs = {}
+
+
+def _sniff(fileobj):
+    head = fileobj.read(64)
+    fileobj.seek(0)
+    if head.startswith(b"PK"):
+        return "zip"
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if stripped[:1] in (b"{", b"["):
+        return "json"
+    return "csv"
+
+
+def import_styles(fileobj, filename="", on_conflict="keep"):
+    """
+    Import styles/presets from a seekable binary file object (ZIP, JSON export or CSV).
+
+    `on_conflict` decides what happens to a row whose name already exists with different
+    content: ``keep`` (import it into the new file; the source picker tells them apart),
+    ``skip`` or ``rename`` (suffix `` (imported)``). Rows identical to an existing style
+    (same name and content hash) are always skipped. Raises `ImportFailed`.
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ImportFailed(f"on_conflict must be one of {', '.join(CONFLICT_MODES)}")
+    kind = _sniff(fileobj)
+    label = os.path.splitext(os.path.basename(filename or ""))[0]
+    if filename.lower().endswith(".csv"):
+        kind = "csv"
+    run = _ImportRun(on_conflict)
+    try:
+        if kind == "zip":
+            run.read_zip(fileobj)
+        elif kind == "json":
+            raw = fileobj.read(MAX_IMPORT_JSON_BYTES + 1)
+            if len(raw) > MAX_IMPORT_JSON_BYTES:
+                raise ImportFailed("JSON import too large; use CSV or ZIP")
+            try:
+                data = json.loads(raw.decode("utf-8-sig"))
+            except ValueError:
+                raise ImportFailed("Invalid JSON", status=422) from None
+            del raw
+            run.read_json_data(data, filename or "import.json", label)
+        else:
+            run.read_csv(fileobj, filename or "import.csv", label)
+        return run.finish()
+    except BaseException:
+        run.abort()
+        raise
@@ -0,0 +1,190 @@
+"""
+Style CSV parsing and the opt-in parallel multi-file loader.
+
+Imports nothing from the WebUI, so process-pool workers can load it under the
+``spawn`` start method (Windows, macOS) without pulling in ``modules.shared``.
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from stylegrid.metrics import record_file_parse
+from stylegrid.records import Style
+
+
+def read_styles_bytes(filepath):
+    """Raw bytes of one styles CSV, or None when it is missing or unreadable."""
+    try:
+        with open(filepath, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def parse_styles_bytes(raw, filepath):
+    """
+    Parse the contents of one styles CSV (UTF-8/UTF-8-BOM) into `Style` records.
+
+    `filepath` only supplies ``source``/``source_file``; nothing is read from disk.
+    """
+    styles = []
+    if raw is None:
+        return styles
+    base = sys.intern(os.path.basename(filepath))
+    source_file = sys.intern(os.path.abspath(filepath))
+    categories = {}
+    append = styles.append
+    try:
+        try:
+            text = raw.decode("utf-8-sig")
+        except UnicodeDecodeError as e:
+            # Keep the rows before the bad byte, as the old line-by-line reader did.
+            text = raw[:e.start].decode("utf-8-sig", errors="ignore")
+        del raw
+        header_pending = True
+        # newline=None: universal newlines, same as text-mode open().
+        for row in csv.reader(io.StringIO(text, newline=None)):
+            if not row:
+                continue
+            name = row[0].strip()
+            if not name:
+                # Nameless rows never yield a style; a non-blank one still ends header detection.
+                if header_pending and any(c.strip() for c in row):
+                    header_pending = False
+                continue
+            if header_pending:
+                header_pending = False
+                if name.lower() == "name":
+                    continue
+            n = len(row)
+            category_explicit = row[4].strip() if n > 4 else ""
+            if category_explicit:
+                category_explicit = categories.setdefault(category_explicit, category_explicit)
+            append(Style(
+                name,
+                row[1].strip() if n > 1 else "",
+                row[2].strip() if n > 2 else "",
+                row[3].strip() if n > 3 else "",
+                category_explicit,
+                base,
+                source_file,
+            ))
+    except Exception:
+        return styles
+    return styles
+
+
+def parse_styles_file(filepath):
+    if not os.path.isfile(filepath):
+        return []
+    t0 = time.perf_counter()
+    styles = parse_styles_bytes(read_styles_bytes(filepath), filepath)
+    record_file_parse(filepath, time.perf_counter() - t0, len(styles))
+    return styles
+
+
+# One parse pool for the life of the process. Workers use the spawn start method: forking
+# the multi-threaded, CUDA-initialised WebUI process is unsafe.
+_process_pool = None
+_process_pool_size = 0
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(size):
+    """The shared parse pool with `size` workers, created on first use; None if it cannot start."""
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is not None and _process_pool_size == size:
+            return _process_pool
+        old = _process_pool
+        try:
+            _process_pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+            _process_pool_size = size
+        except Exception:
+            _process_pool, _process_pool_size = None, 0
+    if old is not None:
+        old.shutdown(wait=False)
+    return _process_pool
+
+
+def _discard_process_pool(pool):
+    """Drop a broken pool so the next load starts a fresh one."""
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool, _process_pool_size = None, 0
+    pool.shutdown(wait=False)
+
+
+def _load_one(filepath, process_pool):
+    if not os.path.isfile(filepath):
+        return []
+    t0 = time.perf_counter()
+    raw = read_styles_bytes(filepath)
+    if raw is None:
+        return []
+    styles = None
+    if process_pool is not None:
+        try:
+            styles = process_pool.submit(parse_styles_bytes, raw, filepath).result()
+        except Exception:
+            # Broken pool (worker killed, spawn failure): parse here instead.
+            _discard_process_pool(process_pool)
+    if styles is None:
+        styles = parse_styles_bytes(raw, filepath)
+    record_file_parse(filepath, time.perf_counter() - t0, len(styles))
+    return styles
+
+
+def merge_styles(parsed_lists):
+    """
+    Concatenate per-file results in order, keeping the first row per (source_file, name).
+
+    Each list holds the rows of one file, so names are tracked per source_file rather
+    than as (source_file, name) tuples, which keeps 100k-row merges cheap.
+    """
+    all_styles = []
+    append = all_styles.append
+    seen_by_file = {}
+    for parsed in parsed_lists:
+        if not parsed:
+            continue
+        seen = seen_by_file.setdefault(parsed[0].source_file, set())
+        add = seen.add
+        for s in parsed:
+            name = s.name
+            if name not in seen:
+                add(name)
+                append(s)
+    return all_styles
+
+
+def load_styles_files(paths, threads=0, processes=0):
+    """
+    Parse every CSV in `paths`; returns one list of `Style` records per path, in `paths` order.
+
+    With `threads` > 1 files are read concurrently on a short-lived thread pool; with
+    `processes` > 0 the parsing itself also moves to the shared spawn process pool, which
+    stays up between loads. Both default to off: for a handful of local files the serial
+    loop is faster than handing work to pools.
+
+    `processes` is for standalone tools (benchmarks, scripts) whose ``__main__`` is safe to
+    re-import: a spawn worker runs the parent's main module first, which inside the WebUI
+    is launch.py / webui.py. The extension itself only ever uses threads.
+    """
+    paths = list(paths)
+    if len(paths) < 2 or (threads <= 1 and processes <= 0):
+        return [parse_styles_file(p) for p in paths]
+
+    process_pool = _get_process_pool(processes) if processes > 0 else None
+    workers = min(max(threads, processes, 2), len(paths))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sg-load") as pool:
+        # map() yields in submission order, whatever order the files finish in.
+        return list(pool.map(lambda p: _load_one(p, process_pool), paths))
@@ -0,0 +1,276 @@
+"""
+In-process timing and counters behind ``GET /style_grid/metrics`` (JSON or Prometheus text).
+
+Recording is a dict lookup and a few integer adds under one lock. With
+``STYLE_GRID_METRICS=0`` every entry point returns immediately (`timed` hands back a shared
+no-op context manager) and routes are registered unwrapped. Imports nothing from the WebUI,
+so `stylegrid.loader` can use it.
+"""
+
+import bisect
+import contextlib
+import functools
+import inspect
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("STYLE_GRID_METRICS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+PREFIX = "stylegrid_"
+# Seconds; upper bounds of the histogram buckets (an implicit +Inf bucket follows).
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# The per-file parse table is bounded: parse results for files that vanished age out.
+MAX_TRACKED_FILES = 1000
+
+HELP = {
+    "http_request_duration_seconds": "Style Grid route handler latency.",
+    "http_request_errors": "Route calls that raised or returned an {error} payload.",
+    "cache_requests": "get_cached_styles calls by result (hit / miss).",
+    "cache_rebuild_seconds": "Catalog rebuilds (merge + reparse of stale files).",
+    "cache_scan_seconds": "check_files_changed scans of the style CSVs.",
+    "csv_parse_seconds": "Parse time of one styles CSV.",
+    "csv_parse_last_seconds": "Last parse time per styles CSV.",
+    "usage_flush_seconds": "usage.json read-modify-write in increment_usage.",
+    "thumbnail_encode_seconds": "Upload decode + WEBP encode of one thumbnail.",
+    "thumbnail_render_seconds": "SD render + save of one generated thumbnail.",
+    "thumbnail_queue_depth": "Thumbnail work queued or running, by kind.",
+    "process_seconds": "StyleGridScript.process per batch.",
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_file_parse = {}
+_started = time.time()
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+def _quantile(counts, count, q):
+    """Estimate from bucket bounds (linear within the bucket), like Prometheus."""
+    if not count:
+        return None
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(counts):
+        if n and seen + n >= rank:
+            lo = BUCKETS[i - 1] if i else 0.0
+            if i == len(BUCKETS):
+                return lo
+            return round(lo + (BUCKETS[i] - lo) * (rank - seen) / n, 6)
+        seen += n
+    return BUCKETS[-1]
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def observe(name, seconds, **labels):
+    """Add one duration (seconds) to histogram `name`."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = _Histogram()
+        h.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        h.total += seconds
+        h.count += 1
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def add_gauge(name, amount, **labels):
+    """Move gauge `name` up or down (in-flight work)."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+def record_file_parse(path, seconds, rows):
+    """Parse time of one CSV: histogram plus a last-value table keyed by file."""
+    if not ENABLED:
+        return
+    observe("csv_parse_seconds", seconds)
+    with _lock:
+        _file_parse.pop(path, None)
+        _file_parse[path] = (seconds, rows, time.time())
+        while len(_file_parse) > MAX_TRACKED_FILES:
+            _file_parse.pop(next(iter(_file_parse)))
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "t0")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def timed(name, **labels):
+    """``with timed("cache_rebuild_seconds"):`` records the block's duration."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def instrument_route(endpoint, method, path):
+    """Wrap a FastAPI endpoint so each call lands in the route latency histogram."""
+    labels = {"method": method, "route": path}
+
+    def _done(t0, result):
+        observe("http_request_duration_seconds", time.perf_counter() - t0, **labels)
+        if isinstance(result, dict) and "error" in result:
+            inc("http_request_errors", kind="error_payload", **labels)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = await endpoint(*args, **kwargs)
+            except BaseException:
+                inc("http_request_errors", kind="exception", **labels)
+                observe("http_request_duration_seconds", time.perf_counter() - t0, **labels)
+                raise
+            _done(t0, result)
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = endpoint(*args, **kwargs)
+            except BaseException:
+                inc("http_request_errors", kind="exception", **labels)
+                observe("http_request_duration_seconds", time.perf_counter() - t0, **labels)
+                raise
+            _done(t0, result)
+            return result
+    return wrapper
+
+
+def reset():
+    """Drop every recorded value (tests, or after reading a baseline)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+        _file_parse.clear()
+
+
+def snapshot():
+    """JSON view: histograms with count/sum/mean/p50/p90/p99, counters, gauges, per-file parses."""
+    with _lock:
+        hist = [(k, list(h.counts), h.total, h.count) for k, h in _histograms.items()]
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        files = dict(_file_parse)
+    out = {
+        "enabled": ENABLED,
+        "uptime_seconds": round(time.time() - _started, 3),
+        "histograms": [],
+        "counters": [],
+        "gauges": [],
+        "csv_parse": [
+            {"file": path, "seconds": round(s, 6), "rows": rows, "at": round(at, 3)}
+            for path, (s, rows, at) in files.items()
+        ],
+    }
+    for (name, labels), counts, total, count in sorted(hist, key=lambda x: x[0]):
+        out["histograms"].append({
+            "name": name,
+            "labels": dict(labels),
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else None,
+            "p50": _quantile(counts, count, 0.5),
+            "p90": _quantile(counts, count, 0.9),
+            "p99": _quantile(counts, count, 0.99),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], counts)),
+        })
+    for (name, labels), v in sorted(counters.items()):
+        out["counters"].append({"name": name, "labels": dict(labels), "value": v})
+    for (name, labels), v in sorted(gauges.items()):
+        out["gauges"].append({"name": name, "labels": dict(labels), "value": v})
+    return out
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus():
+    """Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        hist = sorted(((k, list(h.counts), h.total, h.count) for k, h in _histograms.items()), key=lambda x: x[0])
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        files = dict(_file_parse)
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            full = PREFIX + name + ("_total" if kind == "counter" else "")
+            if name in HELP:
+                lines.append(f"# HELP {full} {HELP[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+
+    for (name, labels), counts, total, count in hist:
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, n in zip([repr(b) for b in BUCKETS] + ["+Inf"], counts):
+            cumulative += n
+            lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total!r}")
+        lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+    for (name, labels), v in counters:
+        declare(name, "counter")
+        lines.append(f"{PREFIX}{name}_total{_labels(labels)} {v}")
+    for (name, labels), v in gauges:
+        declare(name, "gauge")
+        lines.append(f"{PREFIX}{name}{_labels(labels)} {v}")
+    if files:
+        declare("csv_parse_last_seconds", "gauge")
+        for path, (s, _rows, _at) in sorted(files.items()):
+            lines.append(f"{PREFIX}csv_parse_last_seconds{_labels([('file', path)])} {s!r}")
+    return "\n".join(lines) + "\n"
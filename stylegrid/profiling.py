@@ -0,0 +1,414 @@
+"""
+Opt-in profiling of Style Grid routes and `StyleGridScript.process` (``/style_grid/profiles``).
+
+Off unless the WebUI is started with ``STYLE_GRID_PROFILING=1``: a capture profiles the
+whole process and writes to disk, so it is a debug mode, not something any client of a
+default install may trigger. When enabled, nothing is recorded until a capture is
+requested, either per request (``X-StyleGrid-Profile``
+header or ``sg_profile`` query parameter, value ``1`` / ``cprofile`` / ``sample``) or by
+arming the next N route calls or generations. Each capture is written to `PROFILES_DIR`:
+
+- ``cprofile``: a pstats dump (``.prof``; open with ``python -m pstats`` or snakeviz).
+  cProfile is per thread, so work handed to `workers.run_blocking` gets its own profiler
+  that is merged into the dump. Everything else the event loop runs while an async
+  route is in flight is recorded too; use ``sample`` under concurrent traffic.
+- ``sample``: a wall-clock stack sampler (``.collapsed``, one ``frame;frame;… count`` line
+  per stack, the input of flamegraph.pl / speedscope). Only stacks below the profiled
+  call are counted, on the request's thread and its I/O pool jobs.
+
+When no capture is active the hooks cost a context-variable lookup and an integer check;
+when profiling is off the route hook is not installed at all.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from stylegrid.config import PROFILES_DIR
+
+ENABLED = os.environ.get("STYLE_GRID_PROFILING", "0").strip().lower() in ("1", "true", "yes", "on")
+
+HEADER = "x-stylegrid-profile"
+QUERY_PARAM = "sg_profile"
+MODES = ("cprofile", "sample")
+TARGETS = ("routes", "process")
+SAMPLE_INTERVAL = 0.005
+MAX_ARMED = 100
+# Oldest captures are deleted past this count.
+MAX_PROFILES = 100
+
+_FILE_RE = re.compile(r"^(\d{8}T\d{6})-(\d{4})-([A-Za-z0-9_.-]+)-(\d+)ms\.(prof|collapsed)$")
+_KIND_BY_EXT = {"prof": "cprofile", "collapsed": "sample"}
+_EXT_BY_MODE = {"cprofile": "prof", "sample": "collapsed"}
+
+_current = contextvars.ContextVar("stylegrid_profile", default=None)
+_armed = {target: [0, "cprofile"] for target in TARGETS}
+_armed_lock = threading.Lock()
+# cProfile sessions run one at a time: on Python 3.12+ a profiler sees every thread and
+# a second one cannot be enabled while it runs. Sampling sessions may overlap.
+_cprofile_lock = threading.Lock()
+# Code objects of the wrappers below; the sampler cuts each stack at the first of these.
+_root_codes = set()
+_seq = itertools.count()
+# Capture writes queued on the I/O pool and not finished yet (see `flush`).
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _parse_mode(value):
+    value = (value or "").strip().lower()
+    if value in MODES:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return "cprofile"
+    return None
+
+
+def arm(target, count, mode="cprofile"):
+    """Profile the next `count` calls of `target` ("routes" or "process"); 0 disarms."""
+    if not ENABLED:
+        raise ValueError("profiling is disabled; start the WebUI with STYLE_GRID_PROFILING=1")
+    if target not in TARGETS:
+        raise ValueError(f"target must be one of {', '.join(TARGETS)}")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    with _armed_lock:
+        _armed[target] = [max(0, min(int(count), MAX_ARMED)), mode]
+    return armed()
+
+
+def armed():
+    with _armed_lock:
+        return {target: {"remaining": n, "mode": mode} for target, (n, mode) in _armed.items()}
+
+
+def _take_armed(target):
+    # Unlocked read first: the common case is "nothing armed".
+    if not _armed[target][0]:
+        return None
+    with _armed_lock:
+        slot = _armed[target]
+        if not slot[0]:
+            return None
+        slot[0] -= 1
+        return slot[1]
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Session:
+    """One capture: per-thread profilers or sampled stacks; `stop` ends it, `write` saves it."""
+
+    def __init__(self, mode, label):
+        self.mode = mode
+        self.label = label
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._threads = {}
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+        if mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="sg-profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def enter_thread(self):
+        """Start recording the calling thread; returns a token for `exit_thread`."""
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # 3.12+: the session's profiler already covers this thread
+                return None
+            return profile
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+        return tid
+
+    def exit_thread(self, token):
+        if token is None:
+            return
+        if self.mode == "cprofile":
+            token.disable()
+            with self._lock:
+                self._profiles.append(token)
+            return
+        with self._lock:
+            if self._threads.get(token, 0) <= 1:
+                self._threads.pop(token, None)
+            else:
+                self._threads[token] -= 1
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            with self._lock:
+                tids = list(self._threads)
+            if not tids:
+                continue
+            frames = sys._current_frames()
+            for tid in tids:
+                stack = []
+                frame = frames.get(tid)
+                while frame is not None and frame.f_code not in _root_codes:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                # No root frame: an async route is suspended and the loop is running other work.
+                if frame is not None and stack:
+                    with self._lock:
+                        self._stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stop recording and fix the capture's file name; cheap enough for the event loop."""
+        duration_ms = int((time.perf_counter() - self.t0) * 1000)
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.label).strip("_") or "call"
+        self.name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{next(_seq) % 10000:04d}-{slug}-{duration_ms}ms"
+            f".{_EXT_BY_MODE[self.mode]}"
+        )
+
+    def write(self):
+        """Write the stopped capture to `PROFILES_DIR`; returns its file name (None if empty)."""
+        name = self.name
+        path = os.path.join(PROFILES_DIR, name)
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        if self.mode == "cprofile":
+            if not self._profiles:
+                return None
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        _prune()
+        return name
+
+
+def _run_in_session(session, fn, *args, **kwargs):
+    token = session.enter_thread()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        session.exit_thread(token)
+
+
+_root_codes.add(_run_in_session.__code__)
+
+
+def bind(fn):
+    """Wrap `fn` so it is recorded by the active capture when run on another thread."""
+    session = _current.get()
+    if session is None:
+        return fn
+    return functools.partial(_run_in_session, session, fn)
+
+
+@contextlib.contextmanager
+def _capture(mode, label):
+    if mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+        yield None  # another cProfile capture is running; this call goes unrecorded
+        return
+    try:
+        session = _Session(mode, label)
+        var_token = _current.set(session)
+        thread_token = session.enter_thread()
+        try:
+            yield session
+        finally:
+            session.exit_thread(thread_token)
+            _current.reset(var_token)
+            try:
+                session.stop()
+                _queue_write(session)
+            except Exception as e:  # a failed capture must not fail the profiled call
+                print(f"[Style Grid] Profile capture failed: {e}")
+    finally:
+        if mode == "cprofile":
+            _cprofile_lock.release()
+
+
+def _write_session(session):
+    try:
+        return session.write()
+    except Exception as e:
+        print(f"[Style Grid] Could not save profile {session.name}: {e}")
+        return None
+
+
+def _queue_write(session):
+    """Dump and prune on the I/O pool, off the event loop and the profiled call."""
+    from stylegrid.workers import submit_background  # workers imports this module
+
+    future = submit_background(_write_session, session)
+    with _pending_lock:
+        _pending.add(future)
+    future.add_done_callback(_pending_done)
+
+
+def _pending_done(future):
+    with _pending_lock:
+        _pending.discard(future)
+
+
+def flush():
+    """Wait until every finished capture has been written (or failed to)."""
+    with _pending_lock:
+        pending = list(_pending)
+    for future in pending:
+        future.result()
+
+
+def profile_call(target, label, requested=None):
+    """
+    Context manager around one call of `target`: captures it when `requested`
+    (a header / query value) asks for it or the target is armed, otherwise a no-op.
+    """
+    if not ENABLED:
+        return contextlib.nullcontext()
+    mode = _parse_mode(requested) if requested else None
+    if mode is None:
+        mode = _take_armed(target)
+    if mode is None or _current.get() is not None:
+        return contextlib.nullcontext()
+    return _capture(mode, label)
+
+
+def run_process(fn, *args, **kwargs):
+    """Call `fn` (StyleGridScript.process) under a capture when generations are armed."""
+    with profile_call("process", "process"):
+        return fn(*args, **kwargs)
+
+
+_root_codes.add(run_process.__code__)
+
+
+def instrument_route(endpoint, method, path):
+    """
+    Wrap a FastAPI endpoint so a request can ask to be profiled.
+
+    The wrapper needs the request for the header / query flag; when the endpoint does not
+    take one, a keyword-only `Request` parameter is added to the signature FastAPI sees.
+    """
+    from fastapi import Request  # type: ignore[reportMissingImports]
+
+    label = f"{method} {path}"
+    sig = inspect.signature(endpoint)
+    request_param = next(
+        (p.name for p in sig.parameters.values() if p.annotation is Request), None
+    )
+    injected = request_param is None
+    if injected:
+        request_param = "_sg_profile_request"
+        params = list(sig.parameters.values())
+        extra = inspect.Parameter(request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        if params and params[-1].kind is inspect.Parameter.VAR_KEYWORD:
+            params.insert(len(params) - 1, extra)
+        else:
+            params.append(extra)
+        sig = sig.replace(parameters=params)
+
+    def _requested(kwargs):
+        request = kwargs.pop(request_param) if injected else kwargs.get(request_param)
+        if request is None:
+            return None
+        return request.headers.get(HEADER) or request.query_params.get(QUERY_PARAM)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with profile_call("routes", label, _requested(kwargs)):
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with profile_call("routes", label, _requested(kwargs)):
+                return endpoint(*args, **kwargs)
+    _root_codes.add(wrapper.__code__)
+    wrapper.__signature__ = sig
+    return wrapper
+
+
+def _prune():
+    try:
+        names = sorted(n for n in os.listdir(PROFILES_DIR) if _FILE_RE.match(n))
+    except OSError:
+        return
+    for name in names[:-MAX_PROFILES] if len(names) > MAX_PROFILES else ():
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(PROFILES_DIR, name))
+
+
+def list_profiles():
+    """Saved captures, newest first."""
+    try:
+        names = os.listdir(PROFILES_DIR)
+    except OSError:
+        return []
+    out = []
+    for name in names:
+        m = _FILE_RE.match(name)
+        if not m:
+            continue
+        path = os.path.join(PROFILES_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        out.append({
+            "name": name,
+            "kind": _KIND_BY_EXT[m.group(5)],
+            "label": m.group(3),
+            "duration_ms": int(m.group(4)),
+            "size": st.st_size,
+            "created": round(st.st_mtime, 3),
+        })
+    out.sort(key=lambda p: p["name"], reverse=True)
+    return out
+
+
+def profile_path(name):
+    """Absolute path of capture `name`, or None for unknown / malformed names."""
+    if not _FILE_RE.match(name or ""):
+        return None
+    path = os.path.join(PROFILES_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def profile_summary(name, limit=50):
+    """Top `limit` functions by cumulative time of a cProfile capture, as text."""
+    path = profile_path(name)
+    if path is None or not name.endswith(".prof"):
+        return None
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def clear_profiles():
+    """Delete every saved capture; returns how many were removed."""
+    removed = 0
+    for p in list_profiles():
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(PROFILES_DIR, p["name"]))
+            removed += 1
+    return removed
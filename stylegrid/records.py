@@ -0,0 +1,179 @@
+"""Compact immutable record for one parsed style row."""
+
+import functools
+import hashlib
+import os
+import sys
+
+
+def _category_from_filename(source):
+    if not source or not isinstance(source, str):
+        return ""
+    base = os.path.splitext(source.strip())[0].strip()
+    if not base:
+        return ""
+    return base[0].upper() + base[1:]
+
+
+def derive_category(name, category_explicit, source):
+    """Return (category, display_name) using the same rules the grid has always applied."""
+    if category_explicit:
+        cat = category_explicit
+        display = name.split("_", 1)[1].replace("_", " ") if "_" in name else name
+    elif "_" in name:
+        before, rest = name.split("_", 1)
+        cat = before.upper()
+        display = rest.replace("_", " ")
+    elif "-" in name:
+        before, rest = name.split("-", 1)
+        cat = before
+        display = rest.replace("-", " ")
+    else:
+        cat = _category_from_filename(source)
+        if not cat:
+            cat = "OTHER"
+        display = name.replace("_", " ")
+    return cat, display
+
+
+def normalize_prompt(text):
+    """Comparison form of a prompt: lowercased comma-separated tags, whitespace collapsed."""
+    if not text:
+        return ""
+    text = text.lower()
+    if "  " in text or "\t" in text or "\n" in text or "\r" in text:
+        tags = (" ".join(t.split()) for t in text.split(","))
+    else:
+        # Common case: single spaces only, so stripping each tag is enough.
+        tags = (t.strip() for t in text.split(","))
+    return ",".join(t for t in tags if t)
+
+
+def normalized_content_hash(prompt_norm, negative_norm):
+    """`content_hash` for prompts already passed through `normalize_prompt`."""
+    return hashlib.sha1((prompt_norm + "\x1f" + negative_norm).encode("utf-8")).hexdigest()
+
+
+def content_hash(prompt, negative_prompt):
+    """Hash of the normalized prompt pair; equal for styles that expand to the same text."""
+    return normalized_content_hash(normalize_prompt(prompt), normalize_prompt(negative_prompt))
+
+
+try:
+    from collections import _tuplegetter  # C field accessor used by namedtuple
+except ImportError:  # pragma: no cover - non-CPython fallback
+    def _tuplegetter(index, doc):
+        return property(lambda self: tuple.__getitem__(self, index), doc=doc)
+
+
+class Style(tuple):
+    """
+    One style row: an immutable tuple with named fields (like a namedtuple); computed
+    fields are stored once at construction.
+
+    As a tuple it behaves like one (``len(s) == 10``, iteration and ``s[0]`` are
+    positional). String keys give a read-only mapping view over every field, computed
+    ones included, plus the legacy ``_source`` alias of ``source``: ``s["prompt"]``,
+    ``s.get("category")``, ``s.keys()``, ``dict(s.items())``. `to_dict()` is the JSON
+    boundary.
+    """
+
+    __slots__ = ()
+
+    # Parsed CSV fields, then the derived grid fields, in tuple order.
+    FIELDS = (
+        "name",
+        "prompt",
+        "negative_prompt",
+        "description",
+        "category_explicit",
+        "source",
+        "source_file",
+    )
+    COMPUTED_FIELDS = ("category", "display_name", "has_placeholder")
+    # Mapping keys in `to_dict` order; ``_source`` is an alias of ``source``.
+    KEYS = FIELDS[:6] + ("_source",) + FIELDS[6:] + COMPUTED_FIELDS
+    _INDEX = {
+        **{k: i for i, k in enumerate(FIELDS + COMPUTED_FIELDS)},
+        "_source": 5,
+    }
+
+    name = _tuplegetter(0, "Style name (stripped).")
+    prompt = _tuplegetter(1, "Positive prompt fragment.")
+    negative_prompt = _tuplegetter(2, "Negative prompt fragment.")
+    description = _tuplegetter(3, "Freeform description.")
+    category_explicit = _tuplegetter(4, "Raw category column value.")
+    source = _tuplegetter(5, "CSV basename (interned).")
+    source_file = _tuplegetter(6, "Absolute CSV path (interned).")
+    category = _tuplegetter(7, "Resolved grid category.")
+    display_name = _tuplegetter(8, "Label derived from name.")
+    has_placeholder = _tuplegetter(9, "True if {prompt} appears in prompt or negative prompt.")
+
+    def __new__(cls, name, prompt="", negative_prompt="", description="",
+                category_explicit="", source="", source_file=""):
+        category, display_name = derive_category(name, category_explicit, source)
+        return tuple.__new__(cls, (
+            name,
+            prompt,
+            negative_prompt,
+            description,
+            category_explicit,
+            source,
+            source_file,
+            sys.intern(category),
+            display_name,
+            "{prompt}" in prompt or "{prompt}" in negative_prompt,
+        ))
+
+    def __reduce__(self):
+        # Ship the computed fields too, so unpickling (process-pool loads) skips derive_category.
+        return (_restore_style, (self.astuple(),))
+
+    def astuple(self):
+        """Every field, computed ones included, as a plain tuple (see `style_from_fields`)."""
+        return tuple(self)
+
+    def __repr__(self):
+        return f"Style(name={self.name!r}, source_file={self.source_file!r})"
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, self._INDEX[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    # Read-only mapping view for string keys.
+    def get(self, key, default=None):
+        i = self._INDEX.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def keys(self):
+        return self.KEYS
+
+    def items(self):
+        return [(k, self[k]) for k in self.KEYS]
+
+    def to_dict(self, computed=True):
+        """Plain dict for JSON responses; `computed=False` omits the derived grid fields."""
+        keys = self.KEYS if computed else self.KEYS[:-len(self.COMPUTED_FIELDS)]
+        return {k: self[k] for k in keys}
+
+
+def _restore_style(items):
+    return tuple.__new__(Style, items)
+
+
+# Rebuild a Style from `Style.astuple()` output without re-deriving anything; C-level, so
+# ``list(map(style_from_fields, rows))`` is the fast path for snapshot loads.
+style_from_fields = functools.partial(tuple.__new__, Style)
+
+
+def styles_to_dicts(styles, computed=True):
+    return [s.to_dict(computed) for s in styles]
+
+
+def categories_to_dicts(categories):
+    """`categorize_styles` output converted for JSON responses."""
+    return {cat: styles_to_dicts(styles) for cat, styles in categories.items()}
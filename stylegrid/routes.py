@@ -1,15 +1,13 @@
 """FastAPI routes for Style Grid."""
 
+import asyncio
 import base64
-import csv
 import hashlib
-import io
 import json
 import os
-import re
+import tempfile
 import time
 import zipfile
-from pathlib import Path
 
 from fastapi import HTTPException, Request  # type: ignore[reportMissingImports]
 from fastapi.responses import (  # type: ignore[reportMissingImports]
@@ -17,34 +15,93 @@ from fastapi.responses import (  # type: ignore[reportMissingImports]
     HTMLResponse,
     JSONResponse,
     Response,
+    StreamingResponse,
 )
 
+from stylegrid import events, metrics, profiling, ui_shell
+from stylegrid.backups import (
+    create_snapshot,
+    diff_snapshots,
+    list_snapshots,
+    restore_snapshot,
+    undo_last_edit,
+)
 from stylegrid.cache import (
     check_files_changed,
+    get_cached_categories,
     get_cached_styles,
     invalidate_styles_cache,
     styles_cache_hashes,
 )
-from stylegrid.config import DATA_DIR, EXT_DIR, THUMBNAILS_DIR
+from stylegrid.compose import compose_prompts
+from stylegrid.config import THUMBNAIL_SWEEP_INTERVAL
 from stylegrid.csv_io import (
-    categorize_styles,
+    apply_style_operations,
     delete_style_from_csv,
     load_all_styles,
     save_style_to_csv,
 )
 from stylegrid.data_files import (
-    backup_csv_files,
+    delete_preset,
     increment_usage,
     load_presets,
     load_usage,
-    save_presets,
+    save_category_order,
+    save_preset,
 )
+from stylegrid.duplicates import DEFAULT_THRESHOLD, find_duplicates
+from stylegrid.importer import MAX_IMPORT_BYTES, ImportFailed, import_styles
+from stylegrid.records import categories_to_dicts, styles_to_dicts
 from stylegrid.thumbnails import (
-    _thumbnail_hash_input,
+    MAX_UPLOAD_BYTES,
+    MAX_UPLOAD_ZIP_BYTES,
+    THUMBNAIL_VARIANTS,
+    encode_thumbnail_async,
+    encode_zip_entry_async,
+    find_style,
+    get_generation_record,
     get_thumbnail_path,
+    get_thumbnail_variant_path,
     list_thumbnails,
+    load_generation_profiles,
+    plan_thumbnail_zip_import,
+    remove_thumbnail_files,
+    rename_style_thumbnail,
+    resolve_generation_profile,
+    start_thumbnail_sweeper,
     thumbnail_generation_manager,
+    thumbnail_index,
+    upload_source_file,
 )
+from stylegrid.workers import run_blocking
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _read_body_capped(request, limit):
+    """
+    Stream the request body into a spooled temp file, aborting once `limit` bytes are exceeded.
+
+    Raises _BodyTooLarge; caller owns (and must close) the returned file object.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _BodyTooLarge()
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    total = 0
+    try:
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > limit:
+                raise _BodyTooLarge()
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
 
 
 def detect_conflicts(style_names):
@@ -89,94 +146,139 @@ def detect_conflicts(style_names):
 
 def _register_style_routes(app):
     """Register style list/reload/conflict/export/import/category-order routes."""
+    def _styles_etag():
+        get_cached_styles()
+        return hashlib.md5(json.dumps(styles_cache_hashes(), sort_keys=True).encode()).hexdigest()
+
+    def _styles_payload():
+        categories = categories_to_dicts(get_cached_categories())
+        return {"categories": categories, "usage": load_usage(), "presets": load_presets()}
+
     @app.get("/style_grid/styles")
     async def get_styles(request: Request):
-        styles = get_cached_styles()
-        categories = categorize_styles(styles)
-        etag = hashlib.md5(json.dumps(styles_cache_hashes(), sort_keys=True).encode()).hexdigest()
+        etag = await run_blocking(_styles_etag)
         if_none_match = request.headers.get("If-None-Match", "").strip().strip('"')
         if if_none_match and if_none_match == etag:
             return Response(status_code=304)
-        response = JSONResponse(content={"categories": categories, "usage": load_usage(), "presets": load_presets()})
+        response = JSONResponse(content=await run_blocking(_styles_payload))
         response.headers["ETag"] = etag
         return response
 
-    @app.post("/style_grid/reload")
-    async def reload_styles():
+    def _reload():
+        invalidate_styles_cache(reparse=True)
         check_files_changed()
-        invalidate_styles_cache()
-        styles = get_cached_styles()
-        categories = categorize_styles(styles)
+        categories = categories_to_dicts(get_cached_categories())
         return {"categories": categories, "usage": load_usage()}
 
+    @app.post("/style_grid/reload")
+    async def reload_styles():
+        return await run_blocking(_reload)
+
     @app.get("/style_grid/check_update")
     async def api_check_update():
-        return {"changed": check_files_changed()}
+        return {"changed": await run_blocking(check_files_changed)}
+
+    events.hub.set_watcher(check_files_changed)
+
+    @app.get("/style_grid/events")
+    async def api_events(request: Request):
+        """SSE feed of catalog / thumbnail / preset / usage changes (replaces check_update polling)."""
+        return StreamingResponse(
+            events.event_stream(
+                events.hub,
+                events.parse_last_event_id(request.headers.get("Last-Event-ID")),
+                request.is_disconnected,
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     @app.post("/style_grid/conflicts")
     async def api_conflicts(data: dict):
-        return {"conflicts": detect_conflicts(data.get("styles", []))}
+        return {"conflicts": await run_blocking(detect_conflicts, data.get("styles", []))}
+
+    def _compose(data):
+        prompt = data.get("prompt") or ""
+        negative = data.get("negative_prompt") or ""
+        names = data.get("styles") or []
+        seeds = data.get("seeds")
+        if seeds is None and data.get("seed") is not None:
+            seeds = [data.get("seed")]
+        if not isinstance(prompt, str) or not isinstance(negative, str):
+            return {"error": "prompt and negative_prompt must be strings"}
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            return {"error": "styles must be a list of names"}
+        if seeds is not None and (
+            not isinstance(seeds, list) or not all(isinstance(x, int) and not isinstance(x, bool) for x in seeds)
+        ):
+            return {"error": "seeds must be a list of integers"}
+        if seeds and len(seeds) > 64:
+            return {"error": "at most 64 seeds"}
+        count = len(seeds) if seeds else 1
+        prompts, negatives = compose_prompts(
+            [prompt] * count, [negative] * count, names, get_cached_styles(),
+            str(data.get("source") or ""), seeds,
+        )
+        return {
+            "prompt": prompts[0],
+            "negative_prompt": negatives[0],
+            "prompts": prompts,
+            "negative_prompts": negatives,
+        }
 
-    @app.get("/style_grid/export")
-    async def api_export():
+    @app.post("/style_grid/compose")
+    async def api_compose(data: dict):
+        """Final prompts for a base prompt + silent styles, via the same code path as generation."""
+        return await run_blocking(_compose, data)
+
+    def _duplicates(threshold, near, limit):
+        return find_duplicates(get_cached_styles(), threshold=threshold, near=near, limit=limit)
+
+    @app.get("/style_grid/duplicates")
+    async def api_duplicates(threshold: float = DEFAULT_THRESHOLD, near: bool = True, limit: int = 500):
+        """Exact (content hash) and near (MinHash/LSH, Jaccard >= threshold) duplicate groups."""
+        if not 0 < threshold <= 1:
+            return {"error": "threshold must be in (0, 1]"}
+        return await run_blocking(_duplicates, threshold, near, max(1, limit))
+
+    def _export():
         return {
-            "styles": load_all_styles(),
+            "styles": styles_to_dicts(load_all_styles(), computed=False),
             "presets": load_presets(),
             "usage": load_usage(),
             "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
         }
 
+    @app.get("/style_grid/export")
+    async def api_export():
+        return await run_blocking(_export)
+
     @app.post("/style_grid/import")
-    async def api_import(request: Request):
-        raw = await request.body()
-        if not raw:
-            return {"ok": True}
-        if len(raw) >= 2 and raw[:2] == b"PK":
-            try:
-                with zipfile.ZipFile(io.BytesIO(raw)) as zf:
-                    if "presets.json" in zf.namelist():
-                        data = json.loads(zf.read("presets.json").decode("utf-8"))
-                        if isinstance(data, dict):
-                            save_presets(data)
-            except Exception:
-                pass
-            return {"ok": True}
+    async def api_import(request: Request, filename: str = "", on_conflict: str = "keep"):
+        """Raw ZIP / JSON export / CSV body (streamed, size-capped); returns a per-row report."""
         try:
-            data = json.loads(raw.decode("utf-8"))
-        except Exception:
-            raise HTTPException(status_code=422, detail="Invalid JSON") from None
-        if not isinstance(data, dict):
-            return {"ok": True}
-        if "presets" in data:
-            p = load_presets()
-            p.update(data["presets"])
-            save_presets(p)
-        if "styles" in data and data["styles"]:
-            ext_styles = os.path.join(EXT_DIR, "styles")
-            os.makedirs(ext_styles, exist_ok=True)
-            target = os.path.join(ext_styles, f"imported_{time.strftime('%Y%m%d_%H%M%S')}.csv")
-            with open(target, "w", encoding="utf-8", newline="") as f:
-                w = csv.writer(f)
-                w.writerow(["name", "prompt", "negative_prompt", "description", "category"])
-                for s in data["styles"]:
-                    w.writerow([
-                        s.get("name", ""),
-                        s.get("prompt", ""),
-                        s.get("negative_prompt", ""),
-                        s.get("description", ""),
-                        s.get("category", "") or s.get("category_explicit", ""),
-                    ])
-            invalidate_styles_cache()
-        return {"ok": True}
+            spool = await _read_body_capped(request, MAX_IMPORT_BYTES)
+        except _BodyTooLarge:
+            return {"error": f"Import too large (max {MAX_IMPORT_BYTES // (1024 * 1024)}MB)"}
+        try:
+            spool.seek(0, os.SEEK_END)
+            if not spool.tell():
+                return {"ok": True}
+            spool.seek(0)
+            return await run_blocking(import_styles, spool, filename.strip(), on_conflict.strip())
+        except ImportFailed as e:
+            if e.status:
+                raise HTTPException(status_code=e.status, detail=str(e)) from None
+            return {"error": str(e)}
+        finally:
+            spool.close()
 
     @app.post("/style_grid/category_order/save")
     async def api_save_category_order(data: dict):
         order = data.get("order", [])
         if not isinstance(order, list):
             return {"error": "order must be a list"}
-        order_file = os.path.join(DATA_DIR, "category_order.json")
-        with open(order_file, "w", encoding="utf-8") as f:
-            json.dump(order, f, indent=2, ensure_ascii=False)
+        await run_blocking(save_category_order, order)
         return {"ok": True}
 
 
@@ -184,53 +286,48 @@ def _register_preset_routes(app):
     """Register preset CRUD routes."""
     @app.get("/style_grid/presets")
     async def get_presets():
-        return load_presets()
+        return await run_blocking(load_presets)
 
     @app.post("/style_grid/presets/save")
     async def api_save_preset(data: dict):
-        presets = load_presets()
         name = data.get("name", "").strip()
         styles = data.get("styles", [])
         if not name:
             return {"error": "Name required"}
-        presets[name] = {"styles": styles, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
-        save_presets(presets)
+        presets = await run_blocking(save_preset, name, styles)
         return {"ok": True, "presets": presets}
 
     @app.post("/style_grid/presets/delete")
     async def api_delete_preset(data: dict):
-        presets = load_presets()
-        name = data.get("name", "")
-        if name in presets:
-            del presets[name]
-            save_presets(presets)
+        presets = await run_blocking(delete_preset, data.get("name", ""))
         return {"ok": True, "presets": presets}
 
     @app.get("/style_grid/presets/list")
     async def api_list_presets():
-        return load_presets()
+        return await run_blocking(load_presets)
 
 
 def _register_usage_routes(app):
     """Register usage stats routes."""
     @app.get("/style_grid/usage")
     async def get_usage_route():
-        return load_usage()
+        return await run_blocking(load_usage)
 
     @app.post("/style_grid/usage/increment")
     async def api_increment(data: dict):
-        increment_usage(data.get("styles", []))
+        await run_blocking(increment_usage, data.get("styles", []))
         return {"ok": True}
 
 
 def _register_crud_routes(app):
-    """Register style save/delete and backup routes."""
+    """Register style save/delete/batch and backup (snapshot/list/diff/restore) routes."""
     @app.post("/style_grid/style/save")
     async def api_save_style(data: dict):
         name = data.get("name", "").strip()
         if not name:
             return {"error": "Name required"}
-        save_style_to_csv(
+        await run_blocking(
+            save_style_to_csv,
             name,
             data.get("prompt", ""),
             data.get("negative_prompt", ""),
@@ -245,13 +342,66 @@ def _register_crud_routes(app):
         name = data.get("name", "").strip()
         if not name:
             return {"error": "Name required"}
-        delete_style_from_csv(name, data.get("source"))
+        await run_blocking(delete_style_from_csv, name, data.get("source"))
         return {"ok": True}
 
+    def _rename_thumbnail(csv_path, old_name, new_name):
+        try:
+            if rename_style_thumbnail(csv_path, old_name, new_name):
+                events.publish("thumbnail", name=new_name, status="updated")
+        except OSError as e:  # the rename itself succeeded; the old thumbnail is left for cleanup
+            print(f"[Style Grid] Could not move thumbnail of '{old_name}': {e}")
+
+    @app.post("/style_grid/styles/batch")
+    async def api_batch_styles(data: dict):
+        """Upsert/delete/rename many rows; one CSV rewrite per touched file, one reload."""
+        operations = data.get("operations")
+        if not isinstance(operations, list):
+            return {"error": "operations must be a list"}
+        results = await run_blocking(apply_style_operations, operations, _rename_thumbnail)
+        return {"ok": all("error" not in r for r in results), "results": results}
+
     @app.post("/style_grid/backup")
     async def api_backup():
         try:
-            return {"ok": backup_csv_files()}
+            snapshot = await run_blocking(create_snapshot)
+        except Exception as e:
+            return {"error": str(e)}
+        if snapshot is None:
+            return {"ok": False}
+        return {"ok": True, "snapshot": snapshot["id"], "unchanged": snapshot["unchanged"]}
+
+    @app.get("/style_grid/backups")
+    async def api_list_backups():
+        return {"snapshots": await run_blocking(list_snapshots)}
+
+    @app.get("/style_grid/backups/diff")
+    async def api_diff_backups(snapshot: str = "", to: str = ""):
+        if not snapshot:
+            return {"error": "snapshot required"}
+        try:
+            return await run_blocking(diff_snapshots, snapshot, to or None)
+        except Exception as e:
+            return {"error": str(e)}
+
+    @app.post("/style_grid/undo")
+    async def api_undo(data: dict = None):
+        source = (data or {}).get("source")
+        try:
+            return await run_blocking(undo_last_edit, source)
+        except Exception as e:
+            return {"error": str(e)}
+
+    @app.post("/style_grid/backups/restore")
+    async def api_restore_backup(data: dict):
+        snapshot = data.get("snapshot")
+        if not snapshot:
+            return {"error": "snapshot required"}
+        files = data.get("files")
+        if files is not None and not isinstance(files, list):
+            return {"error": "files must be a list"}
+        try:
+            return await run_blocking(restore_snapshot, snapshot, files)
         except Exception as e:
             return {"error": str(e)}
 
@@ -262,17 +412,19 @@ def _register_thumbnail_routes(app):
 
     @app.get("/style_grid/thumbnails/list")
     async def api_list_thumbnails():
-        return {"has_thumbnail": list(list_thumbnails())}
+        return {"has_thumbnail": list(await run_blocking(list_thumbnails))}
 
-    @app.get("/style_grid/thumbnail")
-    async def api_get_thumbnail(name: str = ""):
+    def _sized(path, size):
+        if size in THUMBNAIL_VARIANTS:
+            variant = get_thumbnail_variant_path(path, size)
+            if os.path.isfile(variant):
+                return variant
+        return path
+
+    def _resolve_thumbnail(name, size):
         path = get_thumbnail_path(name)
         if os.path.isfile(path):
-            return FileResponse(
-                path,
-                media_type="image/webp",
-                headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
-            )
+            return _sized(path, size)
 
         all_styles = get_cached_styles()
         matches = [s for s in all_styles if s.get("name") == name]
@@ -283,13 +435,19 @@ def _register_thumbnail_routes(app):
             if candidate not in seen:
                 seen.add(candidate)
                 if os.path.isfile(candidate):
-                    return FileResponse(
-                        candidate,
-                        media_type="image/webp",
-                        headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
-                    )
+                    return _sized(candidate, size)
+        return None
 
-        return Response(status_code=404)
+    @app.get("/style_grid/thumbnail")
+    async def api_get_thumbnail(name: str = "", size: str = ""):
+        path = await run_blocking(_resolve_thumbnail, name, size)
+        if path is None:
+            return Response(status_code=404)
+        return FileResponse(
+            path,
+            media_type="image/webp",
+            headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
+        )
 
     @app.post("/style_grid/thumbnail/upload")
     async def api_upload_thumbnail(data: dict):
@@ -300,39 +458,120 @@ def _register_thumbnail_routes(app):
         try:
             if "," in image_data:
                 image_data = image_data.split(",", 1)[1]
-            raw = base64.b64decode(image_data)
-            if len(raw) > 2 * 1024 * 1024:
-                return {"error": "Image too large (max 2MB)"}
-            ALLOWED_MAGIC = [
-                b'\xff\xd8\xff',
-                b'\x89PNG\r\n\x1a\n',
-                b'RIFF',
-                b'GIF87a',
-                b'GIF89a',
-            ]
-            is_valid_image = any(raw.startswith(m) for m in ALLOWED_MAGIC)
-            if raw.startswith(b'RIFF') and raw[8:12] != b'WEBP':
-                is_valid_image = False
-            if not is_valid_image:
-                return {"error": "Invalid image format. Allowed: JPEG, PNG, WEBP, GIF"}
-            path = get_thumbnail_path(style_name)
-            with open(path, "wb") as f:
-                f.write(raw)
+            # Base64 is 4 chars per 3 bytes: refuse before spending a decode on it.
+            if len(image_data) * 3 // 4 > MAX_UPLOAD_BYTES:
+                return {"error": f"Image too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"}
+            raw = await run_blocking(base64.b64decode, image_data)
+            if len(raw) > MAX_UPLOAD_BYTES:
+                return {"error": f"Image too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"}
+            source = (data.get("source") or "").strip()
+            style = await run_blocking(find_style, style_name, source)
+            csv_path = upload_source_file(style, source)
+            path = get_thumbnail_path(style_name, csv_path)
+            await encode_thumbnail_async(raw, path, style_name, csv_path, style)
+            events.publish("thumbnail", name=style_name, status="updated")
             return {"ok": True}
         except Exception as e:
             return {"error": str(e)}
 
+    @app.post("/style_grid/thumbnail/upload_file")
+    async def api_upload_thumbnail_file(request: Request, name: str = "", source: str = ""):
+        """Raw image body (streamed, size-capped); re-encoded to WEBP plus size variants."""
+        style_name = name.strip()
+        if not style_name:
+            return {"error": "name required"}
+        try:
+            spool = await _read_body_capped(request, MAX_UPLOAD_BYTES)
+        except _BodyTooLarge:
+            return {"error": f"Image too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"}
+        try:
+            source = source.strip()
+            style = await run_blocking(find_style, style_name, source)
+            csv_path = upload_source_file(style, source)
+            path = get_thumbnail_path(style_name, csv_path)
+            await encode_thumbnail_async(spool, path, style_name, csv_path, style)
+            events.publish("thumbnail", name=style_name, status="updated")
+            return {"ok": True}
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            spool.close()
+
+    @app.post("/style_grid/thumbnails/upload_zip")
+    async def api_upload_thumbnail_zip(request: Request, source: str = ""):
+        """
+        Batch import: ZIP of ``<style name>.<ext>`` or ``<source csv>/<style name>.<ext>`` images.
+        """
+        try:
+            spool = await _read_body_capped(request, MAX_UPLOAD_ZIP_BYTES)
+        except _BodyTooLarge:
+            return {"error": f"Archive too large (max {MAX_UPLOAD_ZIP_BYTES // (1024 * 1024)}MB)"}
+        try:
+            try:
+                zf = zipfile.ZipFile(spool)
+            except zipfile.BadZipFile:
+                return {"error": "Invalid ZIP archive"}
+            with zf:
+                jobs, skipped = await run_blocking(plan_thumbnail_zip_import, zf, source.strip())
+
+                async def _encode(info, style_name, path, csv_path, style):
+                    try:
+                        await encode_zip_entry_async(zf, info, path, style_name, csv_path, style)
+                        return style_name, None
+                    except Exception as e:
+                        return style_name, {"entry": info.filename, "error": str(e)}
+
+                results = await asyncio.gather(*(_encode(*job) for job in jobs))
+            imported = []
+            for style_name, err in results:
+                if err:
+                    skipped.append(err)
+                else:
+                    imported.append(style_name)
+            if imported:
+                events.publish("thumbnail", names=imported, status="updated")
+            return {"ok": True, "imported": imported, "skipped": skipped}
+        finally:
+            spool.close()
+
     @app.get("/style_grid/thumbnail/gen_status")
     async def api_gen_status(name: str = ""):
         style_name = name
         return mgr.get_status(style_name)
 
+    @app.post("/style_grid/thumbnail/gen_status")
+    async def api_gen_status_batch(data: dict):
+        """Long-poll many styles: returns once any of them moved past the caller's `since` version."""
+        names = data.get("names")
+        since = data.get("since") or {}
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            return {"error": "names must be a list of style names"}
+        if len(names) > 1000:
+            return {"error": "at most 1000 names"}
+        if not isinstance(since, dict) or not all(
+            isinstance(v, int) and not isinstance(v, bool) for v in since.values()
+        ):
+            return {"error": "since must map style names to versions"}
+        try:
+            timeout = float(data.get("timeout", 0) or 0)
+        except (TypeError, ValueError):
+            return {"error": "timeout must be a number of seconds"}
+        statuses = await mgr.wait_for_changes(names, since, timeout)
+        return {"version": mgr.version, "statuses": statuses}
+
     @app.post("/style_grid/thumbnail/generate")
     async def api_generate_thumbnail(data: dict):
         style_name = data.get("name", "").strip()
         requested_source = data.get("source", "").strip()
         if not style_name:
             return {"error": "name required"}
+        profile = data.get("profile") or None
+        if profile is not None and not isinstance(profile, str):
+            return {"error": "profile must be a profile name"}
+        try:
+            profile, _settings = await run_blocking(resolve_generation_profile, profile)
+        except ValueError as e:
+            return {"error": str(e)}
 
         try:
             from modules.shared import state as forge_state  # type: ignore[reportMissingImports]
@@ -344,68 +583,179 @@ def _register_thumbnail_routes(app):
         if not mgr.try_begin(style_name):
             return {"error": "already generating"}
 
-        mgr.spawn_generate(style_name, requested_source)
-        return {"ok": True, "status": "running"}
+        mgr.spawn_generate(style_name, requested_source, profile, bool(data.get("force")))
+        return {"ok": True, "status": "running", "profile": profile}
+
+    @app.get("/style_grid/thumbnail/profiles")
+    async def api_thumbnail_profiles():
+        """Generation profiles (built-ins merged with config/thumbnail_profiles.json)."""
+        profiles, default = await run_blocking(load_generation_profiles)
+        return {"default": default, "profiles": profiles}
+
+    @app.get("/style_grid/thumbnail/record")
+    async def api_thumbnail_record(name: str = "", source: str = ""):
+        """Inputs that rendered a style's generated preview (none for uploads)."""
+        def _record():
+            style = find_style(name, source or None)
+            if style is None:
+                return {"error": "style not found"}
+            path = get_thumbnail_path(name, style.get("source_file") or "")
+            return {"record": get_generation_record(path)}
+
+        return await run_blocking(_record)
+
+    def _delete_thumbnail(name, source):
+        """Remove the file an upload with the same `source` writes (or GET serves, without one)."""
+        if source:
+            csv_path = upload_source_file(find_style(name, source), source)
+            path = get_thumbnail_path(name, csv_path)
+        else:
+            path = _resolve_thumbnail(name, "") or get_thumbnail_path(name)
+        # Also drops the index entry of `path` (thumbnail_index().forget).
+        return remove_thumbnail_files(path)
 
     @app.delete("/style_grid/thumbnail")
-    async def api_delete_thumbnail(name: str = ""):
-        path = get_thumbnail_path(name)
-        if os.path.isfile(path):
-            os.remove(path)
-        return {"ok": True}
+    async def api_delete_thumbnail(name: str = "", source: str = ""):
+        removed = await run_blocking(_delete_thumbnail, name, source.strip())
+        if removed:
+            events.publish("thumbnail", name=name, status="removed")
+        return {"ok": True, "removed": removed}
+
+    def _cleanup_thumbnails(full):
+        report = thumbnail_index().sweep(full=full)
+        removed = 0
+        for fname in report["orphans"]:
+            try:
+                remove_thumbnail_files(os.path.join(thumbnail_index().directory, fname))
+                removed += 1
+            except Exception:
+                pass
+        return {"removed": removed, "stale": len(report["stale"])}
 
     @app.post("/style_grid/thumbnails/cleanup")
-    async def api_cleanup_thumbnails():
-        """Remove thumbnails for styles that no longer exist in any CSV."""
-        if not os.path.isdir(THUMBNAILS_DIR):
-            return {"removed": 0}
-        valid_hashes = set()
-        for s in get_cached_styles():
-            h = hashlib.md5(
-                _thumbnail_hash_input(s["name"], s.get("source_file") or "").encode("utf-8")
-            ).hexdigest()
-            valid_hashes.add(h)
-        removed = 0
-        for fname in os.listdir(THUMBNAILS_DIR):
-            if not fname.endswith(".webp"):
-                continue
-            h = os.path.splitext(fname)[0]
-            if h not in valid_hashes:
-                try:
-                    os.remove(os.path.join(THUMBNAILS_DIR, fname))
-                    removed += 1
-                except Exception:
-                    pass
-        return {"removed": removed}
-
-
-def _get_ui_html() -> str:
-    """
-    Load built UI index.html and rewrite every relative asset URL (src/href="./...")
-    to the Gradio file URL with a fresh ?v= cache buster on each call.
-    """
-    html_path = Path(__file__).parent.parent / "ui" / "dist" / "index.html"
-    html = html_path.read_text(encoding="utf-8")
-    v = str(int(time.time()))
-    base = "/file=extensions/sd-webui-style-organizer/ui/dist"
-    pattern = re.compile(
-        r'(?P<attr>\b(?:src|href))=(?P<q>["\'])(?P<path>\./[^"\']+)(?P=q)',
-        re.IGNORECASE,
-    )
-    def _sub(m: re.Match) -> str:
-        rel = m.group("path")[2:]
-        q = m.group("q")
-        return f'{m.group("attr")}={q}{base}/{rel}?v={v}{q}'
-
-    return pattern.sub(_sub, html)
+    async def api_cleanup_thumbnails(full: bool = False):
+        """Remove thumbnails for styles that no longer exist in any CSV (`full` relists the directory)."""
+        return await run_blocking(_cleanup_thumbnails, full)
+
+    @app.get("/style_grid/thumbnails/stale")
+    async def api_stale_thumbnails():
+        """Thumbnails whose style's prompt changed since the image was made, plus the orphan count."""
+        report = await run_blocking(thumbnail_index().sweep)
+        return {"stale": report["stale"], "orphans": len(report["orphans"])}
+
+    start_thumbnail_sweeper(THUMBNAIL_SWEEP_INTERVAL)
 
 
 def _register_ui_routes(app):
-    """Serve V2 React iframe HTML with cache-busted asset URLs."""
+    """Serve the V2 React shell HTML and its content-hashed build assets (`stylegrid.ui_shell`)."""
 
     @app.get("/style_grid/ui")
-    async def serve_ui():
-        return HTMLResponse(content=_get_ui_html())
+    async def serve_ui(request: Request):
+        build = await run_blocking(ui_shell.current_build)
+        if request.headers.get("If-None-Match", "").strip().strip('"') == build.etag:
+            return Response(status_code=304, headers={"ETag": f'"{build.etag}"'})
+        return HTMLResponse(
+            content=build.html,
+            headers={"ETag": f'"{build.etag}"', "Cache-Control": "no-cache"},
+        )
+
+    @app.get(ui_shell.ASSET_ROUTE + "/{digest}/{path:path}")
+    async def serve_ui_asset(digest: str, path: str):
+        asset = await run_blocking(ui_shell.get_asset, digest, path)
+        if asset is None:
+            return Response(status_code=404)
+        data, media_type, immutable = asset
+        cache_control = ui_shell.IMMUTABLE_CACHE_CONTROL if immutable else "no-cache"
+        return Response(content=data, media_type=media_type, headers={"Cache-Control": cache_control})
+
+
+def _register_metrics_routes(app):
+    """In-process timings and counters (`stylegrid.metrics`)."""
+
+    @app.get("/style_grid/metrics")
+    async def api_metrics(request: Request, format: str = ""):
+        fmt = format.strip().lower()
+        if not fmt and "text/plain" in request.headers.get("accept", ""):
+            fmt = "prometheus"
+        if fmt in ("prometheus", "text"):
+            return Response(
+                content=metrics.render_prometheus(),
+                media_type="text/plain; version=0.0.4; charset=utf-8",
+            )
+        return metrics.snapshot()
+
+
+def _register_profile_routes(app):
+    """On-demand captures (`stylegrid.profiling`); registered on the bare app, never profiled."""
+
+    @app.get("/style_grid/profiles")
+    async def api_list_profiles():
+        return {"profiles": await run_blocking(profiling.list_profiles), "armed": profiling.armed()}
+
+    @app.post("/style_grid/profiles/arm")
+    async def api_arm_profiles(data: dict):
+        """Profile the next `count` route calls or generations (`target`: routes / process)."""
+        try:
+            return {"armed": profiling.arm(
+                data.get("target") or "routes", data.get("count", 1), data.get("mode") or "cprofile"
+            )}
+        except (TypeError, ValueError) as e:
+            return {"error": str(e)}
+
+    @app.get("/style_grid/profiles/{name}")
+    async def api_get_profile(name: str, format: str = ""):
+        if format.strip().lower() == "text":
+            text = await run_blocking(profiling.profile_summary, name)
+            if text is None:
+                return Response(status_code=404)
+            return Response(content=text, media_type="text/plain; charset=utf-8")
+        path = await run_blocking(profiling.profile_path, name)
+        if path is None:
+            return Response(status_code=404)
+        media_type = "text/plain" if name.endswith(".collapsed") else "application/octet-stream"
+        return FileResponse(path, media_type=media_type, filename=name)
+
+    @app.delete("/style_grid/profiles")
+    async def api_clear_profiles():
+        return {"removed": await run_blocking(profiling.clear_profiles)}
+
+
+class _InstrumentedApp:
+    """
+    Stand-in for the FastAPI app during registration: route decorators wrap each handler
+    with `metrics.instrument_route` and `profiling.instrument_route` (whichever are
+    enabled); everything else is forwarded to the real app.
+    """
+
+    def __init__(self, app):
+        self._app = app
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+    def _route(self, method, path, **kwargs):
+        register = getattr(self._app, method)(path, **kwargs)
+
+        def decorator(endpoint):
+            wrapped = endpoint
+            if metrics.ENABLED:
+                wrapped = metrics.instrument_route(wrapped, method.upper(), path)
+            if profiling.ENABLED:
+                # Outermost, so capture overhead stays out of the latency histograms.
+                wrapped = profiling.instrument_route(wrapped, method.upper(), path)
+            register(wrapped)
+            return endpoint
+
+        return decorator
+
+    def get(self, path, **kwargs):
+        return self._route("get", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self._route("post", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self._route("delete", path, **kwargs)
 
 
 def register_api(demo, app):
@@ -415,9 +765,14 @@ def register_api(demo, app):
     Most handlers return HTTP 200 with `{ "error": ... }` payloads on logical failures;
     notable exceptions include `/styles` ETag 304 and `/thumbnail` 404.
     """
+    bare_app = app
+    if metrics.ENABLED or profiling.ENABLED:
+        app = _InstrumentedApp(app)
     _register_style_routes(app)
     _register_preset_routes(app)
     _register_usage_routes(app)
     _register_crud_routes(app)
     _register_thumbnail_routes(app)
     _register_ui_routes(app)
+    _register_metrics_routes(app)
+    _register_profile_routes(bare_app)
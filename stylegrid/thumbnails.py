@@ -1,31 +1,109 @@
 """Thumbnail file paths, listing, and background SD preview generation."""
 
+import asyncio
 import hashlib
+import io
+import json
 import os
+import shutil
+import tempfile
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from stylegrid.cache import get_cached_styles
-from stylegrid.config import THUMBNAILS_DIR, get_styles_dirs
+from stylegrid import events, metrics
+from stylegrid.cache import get_cached_styles, get_styles_by_file, styles_generation
+from stylegrid.config import RACY_NS, THUMBNAIL_PROFILES_FILE, THUMBNAILS_DIR, get_styles_dirs
+from stylegrid.records import content_hash
+from stylegrid.workers import submit_background
 
+# Full-size thumbnails match the SD preview resolution; variants are for dense grid views.
+THUMBNAIL_SIZE = (384, 512)
+THUMBNAIL_VARIANTS = {"sm": (192, 256)}
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_UPLOAD_ZIP_BYTES = 256 * 1024 * 1024
+# Finished (done / error) generation statuses are forgotten after this many seconds.
+GEN_STATUS_TTL = 600
+# Longest a batched status request may wait for a change.
+GEN_STATUS_MAX_WAIT = 30.0
+# How often the sampler's step counter is read while a preview renders.
+GEN_PROGRESS_INTERVAL = 0.25
 
-def _thumbnail_hash_input(style_name, csv_path=""):
-    """Stable string for thumbnail filename hash; empty csv_path keeps legacy name-only hash."""
-    if not csv_path:
-        return style_name
+# Built-in generation profiles; `THUMBNAIL_PROFILES_FILE` may change them or add more.
+# An empty sampler_name keeps the WebUI default; seed -1 is random.
+GENERATION_PROFILES = {
+    "draft": {
+        "steps": 10, "cfg_scale": 6.0, "width": 384, "height": 512, "seed": -1,
+        "sampler_name": "", "placeholder": "1girl, solo",
+    },
+    "quality": {
+        "steps": 20, "cfg_scale": 7.0, "width": 384, "height": 512, "seed": -1,
+        "sampler_name": "", "placeholder": "1girl, solo",
+    },
+}
+DEFAULT_PROFILE = "quality"
+_PROFILE_FIELDS = {
+    "steps": int, "cfg_scale": (int, float), "width": int, "height": int, "seed": int,
+    "sampler_name": str, "placeholder": str,
+}
+# Sidecar index kept next to the images (see `ThumbnailIndex`); bump the version on format changes.
+THUMBNAIL_INDEX_FILE = "index.json"
+THUMBNAIL_INDEX_VERSION = 1
+
+_ALLOWED_MAGIC = (
+    b'\xff\xd8\xff',
+    b'\x89PNG\r\n\x1a\n',
+    b'RIFF',
+    b'GIF87a',
+    b'GIF89a',
+)
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+_encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sg-thumb-encode")
+
+
+# Per catalog generation: absolute styles dirs, CSV path -> relative key, and the
+# {md5: [Style]} table of every cached style's thumbnail file (see `_thumbnail_owners`).
+_hash_memo = {"gen": None, "dirs": None, "rel": {}, "owners": None}
+
+
+def _hash_memo_current():
+    global _hash_memo
+    memo = _hash_memo
+    gen = styles_generation()
+    if memo["gen"] != gen:
+        memo = _hash_memo = {"gen": gen, "dirs": None, "rel": {}, "owners": None}
+    return memo
+
+
+def _relative_csv_key(csv_path):
+    """CSV path relative to the first styles dir containing it (else its basename), memoized."""
+    memo = _hash_memo_current()
+    rel = memo["rel"].get(csv_path)
+    if rel is not None:
+        return rel
+    if memo["dirs"] is None:
+        memo["dirs"] = [os.path.normpath(os.path.abspath(base)) for base in get_styles_dirs()]
     ap = os.path.normpath(os.path.abspath(csv_path))
-    rel = None
-    for base in get_styles_dirs():
-        try:
-            b = os.path.normpath(os.path.abspath(base))
-            r = os.path.relpath(ap, b)
-            if not r.startswith(".."):
-                rel = r.replace("\\", "/")
-                break
+    for base in memo["dirs"]:
+        try:
+            r = os.path.relpath(ap, base)
         except ValueError:
             continue
-    if rel is None:
+        if not r.startswith(".."):
+            rel = r.replace("\\", "/")
+            break
+    else:
         rel = os.path.basename(ap).replace("\\", "/")
-    return f"{style_name}::{rel}"
+    memo["rel"][csv_path] = rel
+    return rel
+
+
+def _thumbnail_hash_input(style_name, csv_path=""):
+    """Stable string for thumbnail filename hash; empty csv_path keeps legacy name-only hash."""
+    if not csv_path:
+        return style_name
+    return f"{style_name}::{_relative_csv_key(csv_path)}"
 
 
 def get_thumbnail_path(style_name, csv_path=""):
@@ -34,148 +112,978 @@ def get_thumbnail_path(style_name, csv_path=""):
     return os.path.join(THUMBNAILS_DIR, safe + ".webp")
 
 
+def _thumbnail_owners():
+    """
+    ``({md5 hex: Style}, {md5 hex: [Style, ...]})``: the per-file thumbnail of every cached
+    style, built once per generation. The second map holds the rare extra rows that
+    share a hash (the same name in same-named CSVs under two styles dirs).
+    """
+    styles = get_cached_styles()
+    memo = _hash_memo_current()
+    owners = memo["owners"]
+    if owners is not None:
+        return owners
+    first = {}
+    extra = {}
+    md5 = hashlib.md5
+    suffixes = {}
+    for s in styles:
+        sf = s.source_file
+        suffix = suffixes.get(sf)
+        if suffix is None:
+            suffix = suffixes[sf] = "::" + _relative_csv_key(sf) if sf else ""
+        digest = md5((s.name + suffix).encode("utf-8")).hexdigest()
+        if digest in first:
+            extra.setdefault(digest, []).append(s)
+        else:
+            first[digest] = s
+    owners = memo["owners"] = (first, extra)
+    return owners
+
+
+def get_thumbnail_variant_path(thumb_path, variant):
+    """Path of a downscaled variant (`THUMBNAIL_VARIANTS` key) stored next to `thumb_path`."""
+    return os.path.join(os.path.dirname(thumb_path), variant, os.path.basename(thumb_path))
+
+
+def remove_thumbnail_files(thumb_path):
+    """Delete a thumbnail and its size variants; returns True if the main file existed."""
+    existed = os.path.isfile(thumb_path)
+    for path in [thumb_path] + [get_thumbnail_variant_path(thumb_path, v) for v in THUMBNAIL_VARIANTS]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    forget_thumbnails([thumb_path])
+    return existed
+
+
+def rename_style_thumbnail(csv_path, old_name, new_name):
+    """Move the per-file thumbnail (and variants) of a renamed style; returns True if one existed."""
+    src = get_thumbnail_path(old_name, csv_path)
+    if not os.path.isfile(src):
+        return False
+    dst = get_thumbnail_path(new_name, csv_path)
+    os.replace(src, dst)
+    for variant in THUMBNAIL_VARIANTS:
+        src_variant = get_thumbnail_variant_path(src, variant)
+        dst_variant = get_thumbnail_variant_path(dst, variant)
+        try:
+            os.replace(src_variant, dst_variant)
+        except FileNotFoundError:
+            try:
+                os.remove(dst_variant)  # no variant for the old name: drop a stale one
+            except FileNotFoundError:
+                pass
+    thumbnail_index().move(src, dst, new_name)
+    return True
+
+
+def is_supported_image(head):
+    """Check leading bytes for JPEG, PNG, WEBP or GIF signatures."""
+    if not any(head.startswith(m) for m in _ALLOWED_MAGIC):
+        return False
+    return not (head.startswith(b'RIFF') and head[8:12] != b'WEBP')
+
+
+def _atomic_save_webp(img, path, quality=85):
+    """Encode `img` to a temp file in the target dir, then rename over `path`."""
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=d, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, "WEBP", quality=quality)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def save_thumbnail_image(img, thumb_path):
+    """Write a PIL image as the WEBP thumbnail plus every size variant."""
+    from PIL import Image  # type: ignore[reportMissingImports]
+
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    main = img.copy()
+    main.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+    _atomic_save_webp(main, thumb_path)
+    for variant, size in THUMBNAIL_VARIANTS.items():
+        small = main.copy()
+        small.thumbnail(size, Image.LANCZOS)
+        _atomic_save_webp(small, get_thumbnail_variant_path(thumb_path, variant), quality=80)
+
+
+def encode_thumbnail(src, thumb_path, style_name=None, csv_path="", style=None):
+    """
+    Decode an uploaded image (bytes or binary file object) and re-encode it to WEBP.
+
+    The file is indexed as an upload of `style_name`, hashed with `csv_path` (see
+    `upload_source_file`); `style` is the cached row, if any.
+    Raises ValueError when the payload is not a JPEG/PNG/WEBP/GIF image.
+    """
+    from PIL import Image, ImageOps  # type: ignore[reportMissingImports]
+
+    fp = io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src
+    head = fp.read(12)
+    fp.seek(0)
+    if not is_supported_image(head):
+        raise ValueError("Invalid image format. Allowed: JPEG, PNG, WEBP, GIF")
+    with metrics.timed("thumbnail_encode_seconds"):
+        try:
+            with Image.open(fp) as im:
+                im.seek(0)
+                img = ImageOps.exif_transpose(im)
+                img.load()
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ValueError(f"Could not decode image: {e}") from None
+        save_thumbnail_image(img, thumb_path)
+    if style_name is None:
+        forget_thumbnails([thumb_path])
+    else:
+        thumbnail_index().record(thumb_path, style_name, csv_path, style)
+
+
+async def _run_encode(fn, *args):
+    loop = asyncio.get_running_loop()
+    metrics.add_gauge("thumbnail_queue_depth", 1, kind="encode")
+    try:
+        await loop.run_in_executor(_encode_pool, fn, *args)
+    finally:
+        metrics.add_gauge("thumbnail_queue_depth", -1, kind="encode")
+
+
+async def encode_thumbnail_async(src, thumb_path, style_name=None, csv_path="", style=None):
+    """Run `encode_thumbnail` on the encode pool so the event loop stays free."""
+    await _run_encode(encode_thumbnail, src, thumb_path, style_name, csv_path, style)
+
+
+async def encode_zip_entry_async(zf, info, thumb_path, style_name=None, csv_path="", style=None):
+    """Decompress and re-encode one ZIP member on the encode pool."""
+    await _run_encode(lambda: encode_thumbnail(zf.read(info), thumb_path, style_name, csv_path, style))
+
+
+def plan_thumbnail_zip_import(zf, default_source=""):
+    """
+    Plan a batch import from an open ZipFile.
+
+    Entries are ``<style name>.<ext>`` or ``<source csv>/<style name>.<ext>``; returns
+    ``(jobs, skipped)`` where jobs are ``(ZipInfo, style_name, thumb_path, csv_path, style)``.
+    """
+    jobs = []
+    skipped = []
+    seen_paths = set()
+    for info in zf.infolist():
+        entry = info.filename.replace("\\", "/")
+        if info.is_dir() or entry.startswith("__MACOSX/") or os.path.basename(entry).startswith("."):
+            continue
+        stem, ext = os.path.splitext(os.path.basename(entry))
+        if ext.lower() not in _IMAGE_EXTENSIONS or not stem.strip():
+            skipped.append({"entry": entry, "error": "not an image"})
+            continue
+        if info.file_size > MAX_UPLOAD_BYTES:
+            skipped.append({"entry": entry, "error": "image too large"})
+            continue
+        folder = os.path.dirname(entry).rsplit("/", 1)[-1]
+        style_name = stem.strip()
+        style = find_style(style_name, folder or default_source)
+        if style is None:
+            skipped.append({"entry": entry, "error": "style not found"})
+            continue
+        csv_path = upload_source_file(style, folder or default_source)
+        thumb_path = get_thumbnail_path(style_name, csv_path)
+        if thumb_path in seen_paths:
+            skipped.append({"entry": entry, "error": "duplicate entry"})
+            continue
+        seen_paths.add(thumb_path)
+        jobs.append((info, style_name, thumb_path, csv_path, style))
+    return jobs, skipped
+
+
+_profiles_lock = threading.Lock()
+_profiles_cache = {"sig": None, "profiles": GENERATION_PROFILES, "default": DEFAULT_PROFILE}
+
+
+def load_generation_profiles():
+    """
+    ``(profiles, default_name)``: built-ins merged with `THUMBNAIL_PROFILES_FILE`.
+
+    The file is ``{"default": name, "profiles": {name: {field: value}}}``; a profile inherits
+    unset fields from the built-in of the same name, else from ``quality``. Fields of the
+    wrong type are ignored. Re-read only when the file changes.
+    """
+    try:
+        st = os.stat(THUMBNAIL_PROFILES_FILE)
+        sig = (THUMBNAIL_PROFILES_FILE, st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    with _profiles_lock:
+        if _profiles_cache["sig"] == sig:
+            return _profiles_cache["profiles"], _profiles_cache["default"]
+    data = {}
+    if sig is not None:
+        try:
+            with open(THUMBNAIL_PROFILES_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[Style Grid] Ignoring {THUMBNAIL_PROFILES_FILE}: {e}")
+    if not isinstance(data, dict):
+        data = {}
+    profiles = {name: dict(settings) for name, settings in GENERATION_PROFILES.items()}
+    overrides = data.get("profiles")
+    for name, fields in (overrides.items() if isinstance(overrides, dict) else ()):
+        if not isinstance(name, str) or not name or not isinstance(fields, dict):
+            continue
+        settings = dict(profiles.get(name) or GENERATION_PROFILES[DEFAULT_PROFILE])
+        for key, kind in _PROFILE_FIELDS.items():
+            value = fields.get(key)
+            if isinstance(value, kind) and not isinstance(value, bool):
+                settings[key] = value
+        profiles[name] = settings
+    default = data.get("default")
+    if default not in profiles:
+        default = DEFAULT_PROFILE
+    with _profiles_lock:
+        _profiles_cache.update(sig=sig, profiles=profiles, default=default)
+    return profiles, default
+
+
+def resolve_generation_profile(name=None):
+    """``(name, settings)`` for profile `name` (default when empty); ValueError if unknown."""
+    profiles, default = load_generation_profiles()
+    name = name or default
+    if name not in profiles:
+        raise ValueError(f"unknown profile {name!r}; available: {', '.join(sorted(profiles))}")
+    return name, dict(profiles[name])
+
+
+def settings_hash(settings):
+    return hashlib.md5(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def generation_inputs_hash(prompt, negative_prompt, model, settings_digest):
+    """Identity of a render: equal hashes produce interchangeable previews."""
+    key = "\x00".join((prompt, negative_prompt, model or "", settings_digest))
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def current_model_id():
+    """Hash (or title) of the loaded checkpoint; empty outside the WebUI."""
+    try:
+        from modules import shared  # type: ignore[reportMissingImports]
+    except Exception:
+        return ""
+    info = getattr(getattr(shared, "sd_model", None), "sd_checkpoint_info", None)
+    for attr in ("sha256", "shorthash", "title"):
+        value = getattr(info, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    value = getattr(getattr(shared, "opts", None), "sd_model_checkpoint", None)
+    return value if isinstance(value, str) else ""
+
+
+class ThumbnailIndex:
+    """
+    Sidecar index of one thumbnail directory (``index.json``), kept in memory.
+
+    Maps each thumbnail file to its style key (name + CSV path used in the file hash, ""
+    for legacy name-only files), the style's prompt `content_hash` when the image was
+    made, the file mtime, the origin (``generated`` / ``uploaded`` / ``found``) and, for
+    renders, the generation record. Uploads, renders and deletes update it; writes are
+    coalesced onto the I/O pool.
+
+    `sweep` flags entries as ``orphan`` (style gone) or ``stale`` (prompt changed since)
+    by re-checking only entries of CSVs whose hash changed since the previous sweep. The
+    directory itself is listed only on the first sweep or when asked (``full``).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, THUMBNAIL_INDEX_FILE)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._files = None
+        self._csv_hashes = {}
+        self._reconciled = False
+        self._by_inputs = None
+        self._by_source = None
+        self._flush_pending = False
+
+    def _load_locked(self):
+        if self._files is not None:
+            return
+        data = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Style Grid] Rebuilding thumbnail index ({e})")
+        if not isinstance(data, dict) or data.get("version") != THUMBNAIL_INDEX_VERSION:
+            data = {}
+        files = data.get("files")
+        self._files = files if isinstance(files, dict) else {}
+        hashes = data.get("csv_hashes")
+        self._csv_hashes = hashes if isinstance(hashes, dict) else {}
+        self._reconciled = bool(data.get("reconciled"))
+
+    def _changed_locked(self):
+        self._by_inputs = None
+        self._by_source = None
+        if not self._flush_pending:
+            self._flush_pending = True
+            submit_background(self.flush)
+
+    def flush(self):
+        """Write the index now (normally scheduled after changes)."""
+        with self._write_lock:
+            with self._lock:
+                self._flush_pending = False
+                if self._files is None:
+                    return
+                data = {
+                    "version": THUMBNAIL_INDEX_VERSION,
+                    "reconciled": self._reconciled,
+                    "csv_hashes": dict(self._csv_hashes),
+                    "files": dict(self._files),
+                }
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def get(self, thumb_path):
+        with self._lock:
+            self._load_locked()
+            entry = self._files.get(os.path.basename(thumb_path))
+            return dict(entry) if entry else None
+
+    def entries(self):
+        """``{file name: entry}`` snapshot."""
+        with self._lock:
+            self._load_locked()
+            return dict(self._files)
+
+    def record(self, thumb_path, style_name, csv_path="", style=None, origin="uploaded", generation=None):
+        """Index a thumbnail just written for `style_name`; `style` (the cached row) gives the prompt hash."""
+        try:
+            mtime = os.stat(thumb_path).st_mtime
+        except OSError:
+            mtime = time.time()
+        entry = {
+            "style": style_name,
+            "source_file": csv_path,
+            "prompt_hash": content_hash(style.get("prompt", ""), style.get("negative_prompt", "")) if style else None,
+            "mtime": round(mtime, 3),
+            "origin": origin,
+            "status": "ok" if style else "orphan",
+        }
+        if generation is not None:
+            entry["generation"] = generation
+        with self._lock:
+            self._load_locked()
+            self._files[os.path.basename(thumb_path)] = entry
+            self._changed_locked()
+
+    def forget(self, thumb_paths):
+        with self._lock:
+            self._load_locked()
+            removed = [self._files.pop(os.path.basename(p), None) for p in thumb_paths]
+            if any(removed):
+                self._changed_locked()
+
+    def move(self, src_path, dst_path, style_name):
+        """Carry the entry of a renamed thumbnail over to its new file name."""
+        with self._lock:
+            self._load_locked()
+            entry = self._files.pop(os.path.basename(src_path), None)
+            if entry is None:
+                return
+            self._files[os.path.basename(dst_path)] = dict(entry, style=style_name)
+            self._changed_locked()
+
+    def find_by_inputs(self, inputs_hash, exclude=None):
+        """Existing thumbnail rendered from the same inputs (any style, any file), or None."""
+        with self._lock:
+            self._load_locked()
+            if self._by_inputs is None:
+                by_inputs = {}
+                for name, entry in self._files.items():
+                    h = (entry.get("generation") or {}).get("inputs_hash")
+                    if h:
+                        by_inputs.setdefault(h, []).append(name)
+                self._by_inputs = by_inputs
+            names = list(self._by_inputs.get(inputs_hash, ()))
+        skip = os.path.basename(exclude) if exclude else None
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name != skip and os.path.isfile(path):
+                return path
+        return None
+
+    def _reconcile_locked(self, owners):
+        """List the directory: drop entries of missing files, index files the index never saw."""
+        try:
+            on_disk = {f for f in os.listdir(self.directory) if f.endswith(".webp")}
+        except OSError:
+            on_disk = set()
+        for name in [n for n in self._files if n not in on_disk]:
+            del self._files[name]
+        unknown = on_disk.difference(self._files)
+        legacy = None
+        for name in unknown:
+            digest = name[:-5]
+            style = owners[0].get(digest)
+            csv_path = style.source_file if style is not None else ""
+            if style is None:
+                if legacy is None:
+                    # Name-only files (old uploads) belong to whichever row `find_style` picks.
+                    by_name = {s.name: s for s in owners[0].values()}
+                    by_name.update((s.name, s) for extra in owners[1].values() for s in extra)
+                    legacy = {hashlib.md5(n.encode("utf-8")).hexdigest(): s for n, s in by_name.items()}
+                style = legacy.get(digest)
+            try:
+                mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+            except OSError:
+                continue
+            # Files from before the index: assume they match the prompt as it is now.
+            self._files[name] = {
+                "style": style.name if style is not None else None,
+                "source_file": csv_path,
+                "prompt_hash": content_hash(style.prompt, style.negative_prompt) if style is not None else None,
+                "mtime": round(mtime, 3),
+                "origin": "found",
+                "status": "ok" if style is not None else "orphan",
+            }
+        self._reconciled = True
+
+    def sweep(self, full=False):
+        """
+        Re-check orphan / stale flags where something changed; returns a report.
+
+        ``{"checked", "orphans": [file, ...], "stale": [{"file", "name", "source_file"}]}``.
+        """
+        by_file = get_styles_by_file()
+        csv_hashes = {path: digest for path, (digest, _styles) in by_file.items()}
+        owners = _thumbnail_owners() if full or not self._reconciled else None
+        with self._lock:
+            self._load_locked()
+            reconcile = full or not self._reconciled
+            if reconcile:
+                self._reconcile_locked(owners or _thumbnail_owners())
+                candidates = list(self._files)
+            else:
+                changed = {
+                    p for p in set(csv_hashes).union(self._csv_hashes)
+                    if csv_hashes.get(p) != self._csv_hashes.get(p)
+                }
+                candidates = []
+                if changed:
+                    if self._by_source is None:
+                        by_source = {}
+                        for name, entry in self._files.items():
+                            by_source.setdefault(entry.get("source_file") or "", []).append(name)
+                        self._by_source = by_source
+                    for path in changed.union([""]):
+                        candidates.extend(self._by_source.get(path, ()))
+            checked, updated = self._check_locked(candidates, by_file)
+            if reconcile or updated or self._csv_hashes != csv_hashes:
+                self._csv_hashes = csv_hashes
+                self._changed_locked()
+            orphans, stale = [], []
+            for name, entry in self._files.items():
+                if entry.get("status") == "orphan":
+                    orphans.append(name)
+                elif entry.get("status") == "stale":
+                    stale.append({"file": name, "name": entry.get("style"), "source_file": entry.get("source_file")})
+        return {"checked": checked, "orphans": orphans, "stale": stale}
+
+    def _check_locked(self, names, by_file):
+        """Recompute the status of `names`; returns (entries checked, entries changed)."""
+        per_file = {}
+        by_name = None
+        checked = updated = 0
+        for name in names:
+            entry = self._files.get(name)
+            if entry is None or not entry.get("style"):
+                continue
+            checked += 1
+            csv_path = entry.get("source_file") or ""
+            if csv_path:
+                lookup = per_file.get(csv_path)
+                if lookup is None:
+                    lookup = per_file[csv_path] = {}
+                    for s in by_file.get(csv_path, (None, ()))[1]:
+                        lookup.setdefault(s["name"], s)
+            else:
+                # Legacy name-only files belong to whichever row `find_style` picks.
+                if by_name is None:
+                    by_name = {s["name"]: s for _digest, styles in by_file.values() for s in styles}
+                lookup = by_name
+            style = lookup.get(entry["style"])
+            if style is None:
+                status = "orphan"
+            elif entry.get("prompt_hash") in (None, content_hash(style.get("prompt", ""), style.get("negative_prompt", ""))):
+                status = "ok"
+            else:
+                status = "stale"
+            if entry.get("status") != status:
+                self._files[name] = dict(entry, status=status)
+                updated += 1
+        return checked, updated
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def thumbnail_index():
+    """`ThumbnailIndex` of the current `THUMBNAILS_DIR`."""
+    with _indexes_lock:
+        index = _indexes.get(THUMBNAILS_DIR)
+        if index is None:
+            index = _indexes[THUMBNAILS_DIR] = ThumbnailIndex(THUMBNAILS_DIR)
+        return index
+
+
+def get_generation_record(thumb_path):
+    """Inputs recorded for a generated thumbnail (prompt, negative, model, settings, hashes) or None."""
+    entry = thumbnail_index().get(thumb_path)
+    return dict(entry["generation"]) if entry and entry.get("generation") else None
+
+
+def forget_thumbnails(thumb_paths):
+    """Drop index entries of thumbnails that were deleted."""
+    thumbnail_index().forget(thumb_paths)
+
+
+_sweeper = {"thread": None}
+
+
+def start_thumbnail_sweeper(interval):
+    """Sweep the thumbnail index every `interval` seconds in a daemon thread (once per process)."""
+    if interval <= 0 or _sweeper["thread"] is not None:
+        return
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            try:
+                thumbnail_index().sweep()
+            except Exception as e:  # keep sweeping; a bad CSV must not stop the thread
+                print(f"[Style Grid] Thumbnail sweep failed: {e}")
+
+    _sweeper["thread"] = threading.Thread(target=_loop, name="sg-thumb-sweep", daemon=True)
+    _sweeper["thread"].start()
+
+
+def _link_or_copy(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def share_thumbnail_files(src_path, dst_path):
+    """
+    Make `dst_path` (and its variants) show the image at `src_path`.
+
+    Hard links where possible: thumbnails are only ever replaced by rename, so writing
+    one style's preview never changes another's.
+    """
+    _link_or_copy(src_path, dst_path)
+    for variant in THUMBNAIL_VARIANTS:
+        src_variant = get_thumbnail_variant_path(src_path, variant)
+        dst_variant = get_thumbnail_variant_path(dst_path, variant)
+        if os.path.isfile(src_variant):
+            _link_or_copy(src_variant, dst_variant)
+        else:
+            try:
+                os.remove(dst_variant)
+            except FileNotFoundError:
+                pass
+
+
+_listing_memo = {"key": None, "names": frozenset()}
+
+
 def list_thumbnails():
-    if not os.path.isdir(THUMBNAILS_DIR):
+    """
+    Names of cached styles whose per-file thumbnail exists.
+
+    The answer is reused while the catalog generation and the thumbnail directory's mtime
+    stay the same (only once that mtime is safely in the past, as in config's listing cache).
+    """
+    first, extra = _thumbnail_owners()
+    try:
+        mtime_ns = os.stat(THUMBNAILS_DIR).st_mtime_ns
+    except OSError:
+        return set()
+    key = (_hash_memo["gen"], THUMBNAILS_DIR, mtime_ns)
+    if _listing_memo["key"] == key:
+        return set(_listing_memo["names"])
+    try:
+        files = os.listdir(THUMBNAILS_DIR)
+    except OSError:
         return set()
-    hashes = {
-        os.path.splitext(f)[0]
-        for f in os.listdir(THUMBNAILS_DIR)
-        if f.endswith(".webp")
-    }
-    result = set()
-    for s in get_cached_styles():
-        h = hashlib.md5(
-            _thumbnail_hash_input(s["name"], s.get("source_file") or "").encode("utf-8")
-        ).hexdigest()
-        if h in hashes:
-            result.add(s["name"])
+    hits = first.keys() & {f[:-5] for f in files if f.endswith(".webp")}
+    result = {first[h].name for h in hits}
+    for h in hits.intersection(extra):
+        result.update(s.name for s in extra[h])
+    if mtime_ns < time.time_ns() - RACY_NS:
+        _listing_memo.update(key=key, names=frozenset(result))
     return result
 
 
+def find_style(style_name, source_hint=None):
+    """Cached style row by name, preferring the row whose source/source_file matches the hint."""
+    all_cached = get_cached_styles()
+    if source_hint and source_hint != "All":
+        for s in all_cached:
+            if s.get("name") == style_name and source_hint in (
+                s.get("source") or "", s.get("source_file") or ""
+            ):
+                return s
+    style_map = {s["name"]: s for s in all_cached}
+    return style_map.get(style_name)
+
+
+def upload_source_file(style, source_hint=None):
+    """
+    CSV path used to hash an uploaded thumbnail.
+
+    Uploads without an explicit source keep the legacy name-only file, which
+    `GET /style_grid/thumbnail` resolves first.
+    """
+    if not style or not source_hint or source_hint == "All":
+        return ""
+    return style.get("source_file") or ""
+
+
 class ThumbnailGenerationManager:
-    """Manages async thumbnail jobs: reserve style, run worker, and expose per-style status."""
+    """
+    Manages async thumbnail jobs: reserve style, run worker, and expose per-style status.
+
+    Every status change gets a new `version`, so clients can wait for "anything newer than
+    what I have" (`wait_for_changes`) across many styles in one request. Finished entries
+    expire after `GEN_STATUS_TTL`; a style without an entry reads as idle.
+    """
 
     def __init__(self):
         self._gen_status = {}
         self._gen_lock = threading.Lock()
+        self._version = 0
+        # (loop, asyncio.Event) of waiting long-poll requests
+        self._waiters = set()
+        self._next_prune = 0.0
+        # inputs hash -> Event of the render producing it, so equal prompts render once
+        self._inflight = {}
+
+    @property
+    def version(self):
+        with self._gen_lock:
+            return self._version
+
+    def _prune_locked(self, now):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + min(GEN_STATUS_TTL, 60)
+        expired = [
+            name for name, entry in self._gen_status.items()
+            if entry["status"] != "running" and now - entry["updated"] > GEN_STATUS_TTL
+        ]
+        for name in expired:
+            del self._gen_status[name]
+
+    def _store_locked(self, style_name, entry):
+        self._version += 1
+        entry["version"] = self._version
+        entry["updated"] = time.time()
+        self._gen_status[style_name] = entry
+        self._prune_locked(entry["updated"])
+        return list(self._waiters)
+
+    def _wake(self, waiters):
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop already closed
+                pass
 
     def get_status(self, style_name):
         """Return current generation status dict for a style (idle/running/done/error)."""
         with self._gen_lock:
-            return self._gen_status.get(style_name, {"status": "idle"})
+            self._prune_locked(time.time())
+            entry = self._gen_status.get(style_name)
+            return dict(entry) if entry else {"status": "idle"}
+
+    def changed_since(self, names, since):
+        """
+        ``{name: status}`` for `names` whose status version differs from ``since[name]``.
+
+        Any mismatch counts, so versions remembered across a WebUI restart still resolve. A
+        name the caller has a version for but that has no entry (restart, or expired after
+        `GEN_STATUS_TTL`) reports ``{"status": "idle"}`` so the caller stops waiting.
+        """
+        out = {}
+        with self._gen_lock:
+            self._prune_locked(time.time())
+            for name in names:
+                entry = self._gen_status.get(name)
+                if entry:
+                    if entry["version"] != since.get(name):
+                        out[name] = dict(entry)
+                elif name in since:
+                    out[name] = {"status": "idle"}
+        return out
+
+    async def wait_for_changes(self, names, since, timeout):
+        """Long-poll: `changed_since` as soon as it is non-empty, or ``{}`` after `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._gen_lock:
+            self._waiters.add(waiter)
+        try:
+            deadline = loop.time() + max(0.0, min(timeout, GEN_STATUS_MAX_WAIT))
+            while True:
+                event.clear()
+                changed = self.changed_since(names, since)
+                remaining = deadline - loop.time()
+                if changed or remaining <= 0:
+                    return changed
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return self.changed_since(names, since)
+        finally:
+            with self._gen_lock:
+                self._waiters.discard(waiter)
 
     def try_begin(self, style_name):
         """Reserve style generation slot; returns False if same style is already running."""
         with self._gen_lock:
-            if self._gen_status.get(style_name, {}).get("status") == "running":
+            current = self._gen_status.get(style_name)
+            if current and current["status"] == "running":
                 return False
-            self._gen_status[style_name] = {"status": "running"}
-            return True
+            waiters = self._store_locked(style_name, {"status": "running", "step": 0, "steps": 0})
+        self._wake(waiters)
+        events.publish("thumbnail", name=style_name, status="running")
+        return True
+
+    def _set_status(self, style_name, status, message=None, **extra):
+        entry = {"status": status, **extra}
+        if message is not None:
+            entry["message"] = message
+        with self._gen_lock:
+            waiters = self._store_locked(style_name, entry)
+        self._wake(waiters)
+        events.publish("thumbnail", name=style_name, **entry)
+
+    def _set_progress(self, style_name, step, steps):
+        """Sampler step of a running job (long-poll wakes; no SSE event per step)."""
+        with self._gen_lock:
+            current = self._gen_status.get(style_name)
+            if not current or current["status"] != "running":
+                return
+            waiters = self._store_locked(style_name, {"status": "running", "step": step, "steps": steps})
+        self._wake(waiters)
 
-    def spawn_generate(self, style_name, source_hint=None):
+    def _watch_progress(self, style_name, stop):
+        try:
+            from modules.shared import state  # type: ignore[reportMissingImports]
+        except Exception:
+            return
+        last = None
+        while not stop.wait(GEN_PROGRESS_INTERVAL):
+            step = getattr(state, "sampling_step", None)
+            steps = getattr(state, "sampling_steps", None)
+            if not isinstance(step, int) or not isinstance(steps, int) or steps <= 0:
+                continue
+            if (step, steps) != last:
+                last = (step, steps)
+                self._set_progress(style_name, min(step, steps), steps)
+
+    def spawn_generate(self, style_name, source_hint=None, profile=None, force=False):
         """Start background thumbnail generation thread for a style already marked running."""
+        metrics.add_gauge("thumbnail_queue_depth", 1, kind="generate")
         t = threading.Thread(
-            target=self._run_generation, args=(style_name, source_hint), daemon=True
+            target=self._run_generation, args=(style_name, source_hint, profile, force), daemon=True
         )
         t.start()
 
-    def _run_generation(self, style_name, source_hint=None):
-        thumb_csv_path = ""
-        try:
-            all_cached = get_cached_styles()
-            style = None
-            if source_hint and source_hint != "All":
-                for s in all_cached:
-                    if s.get("name") == style_name and source_hint in (
-                        s.get("source") or "", s.get("source_file") or ""
-                    ):
-                        style = s
-                        break
-            if style is None:
-                style_map = {s["name"]: s for s in all_cached}
-                style = style_map.get(style_name)
+    def _run_generation(self, style_name, source_hint=None, profile=None, force=False):
+        try:
+            with metrics.timed("thumbnail_render_seconds"):
+                self._generate(style_name, source_hint, profile, force)
+        finally:
+            metrics.add_gauge("thumbnail_queue_depth", -1, kind="generate")
+
+    def _reuse(self, img_path, record, style):
+        """
+        Finish without rendering when an image for the same inputs exists; returns how, or None.
+
+        With a random seed (-1) asking again is a re-roll: a style that already has a
+        thumbnail always renders, and only a style without one borrows another's image.
+        """
+        if record["settings"]["seed"] < 0:
+            if os.path.isfile(img_path):
+                return None
+        else:
+            current = get_generation_record(img_path)
+            if current and current.get("inputs_hash") == record["inputs_hash"] and os.path.isfile(img_path):
+                return "unchanged"
+        index = thumbnail_index()
+        source = index.find_by_inputs(record["inputs_hash"], exclude=img_path)
+        if source is None:
+            return None
+        share_thumbnail_files(source, img_path)
+        generation = dict(record, shared_from=os.path.basename(source))
+        index.record(img_path, style["name"], record["source_file"], style, "generated", generation)
+        return "shared"
+
+    def _claim_render(self, inputs_hash):
+        """Event to wait on when the same inputs are rendering elsewhere; None once claimed."""
+        with self._gen_lock:
+            pending = self._inflight.get(inputs_hash)
+            if pending is None:
+                self._inflight[inputs_hash] = threading.Event()
+            return pending
+
+    def _release_render(self, inputs_hash):
+        with self._gen_lock:
+            done = self._inflight.pop(inputs_hash, None)
+        if done is not None:
+            done.set()
+
+    def _generate(self, style_name, source_hint=None, profile=None, force=False):
+        try:
+            style = find_style(style_name, source_hint)
             if not style:
-                with self._gen_lock:
-                    self._gen_status[style_name] = {
-                        "status": "error", "message": "Style not found"
-                    }
+                self._set_status(style_name, "error", "Style not found")
                 return
 
             thumb_csv_path = style.get("source_file") or ""
-
-            old_path = get_thumbnail_path(style_name, thumb_csv_path)
-            if os.path.isfile(old_path):
-                os.remove(old_path)
-
             img_path = get_thumbnail_path(style_name, thumb_csv_path)
-            tmp_path = img_path + ".tmp"
 
+            profile, settings = resolve_generation_profile(profile)
             prompt = style.get("prompt", "")
-            prompt = prompt.replace("{prompt}", "1girl, solo")
+            prompt = prompt.replace("{prompt}", settings["placeholder"])
             negative = style.get("negative_prompt", "")
+            model = current_model_id()
+            digest = settings_hash(settings)
+            record = {
+                "style": style_name,
+                "source_file": thumb_csv_path,
+                "profile": profile,
+                "prompt": prompt,
+                "negative_prompt": negative,
+                "model": model,
+                "settings": settings,
+                "settings_hash": digest,
+                "inputs_hash": generation_inputs_hash(prompt, negative, model, digest),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
 
-            from modules import processing  # type: ignore[reportMissingImports]
-            from modules.processing import (
-                StableDiffusionProcessingTxt2Img,  # type: ignore[reportMissingImports]
-            )
-            from modules.shared import sd_model  # type: ignore[reportMissingImports]
-
-            p = StableDiffusionProcessingTxt2Img(
-                sd_model=sd_model,
-                prompt=prompt,
-                negative_prompt=negative,
-                seed=-1,
-                steps=20,
-                cfg_scale=7,
-                width=384,
-                height=512,
-                batch_size=1,
-                n_iter=1,
-                do_not_save_samples=True,
-                do_not_save_grid=True,
-                override_settings={"samples_filename_pattern": ""},
-            )
-
-            # Empty ScriptRunner — thumbnail generation must not trigger
-            # extension scripts (Regional Prompter, ControlNet, etc.)
-            # We only need p.scripts to not be None so Reforge's
-            # process_images_inner can safely iterate alwayson_scripts.
-            try:
-                from modules.scripts import ScriptRunner
-                p.scripts = ScriptRunner()
-                p.scripts.scripts = []
-                p.scripts.alwayson_scripts = []
-                p.script_args = []
-            except Exception:
-                pass
-
+            # Another style with the same inputs may be rendering right now: wait, then reuse.
+            while True:
+                if not force:
+                    reused = self._reuse(img_path, record, style)
+                    if reused:
+                        self._set_status(style_name, "done", reused=reused, profile=profile)
+                        return
+                pending = self._claim_render(record["inputs_hash"])
+                if pending is None:
+                    break
+                pending.wait()
             try:
-                processed = processing.process_images(p)
+                self._render(style_name, img_path, prompt, negative, settings)
+                thumbnail_index().record(img_path, style_name, thumb_csv_path, style, "generated", record)
             finally:
-                p.close()
+                self._release_render(record["inputs_hash"])
 
-            if not processed.images:
-                raise ValueError("No images returned")
+            self._set_status(style_name, "done", profile=profile)
 
-            processed.images[0].save(tmp_path, "WEBP", quality=85)
-            if os.path.isfile(img_path):
-                os.remove(img_path)
-            os.rename(tmp_path, img_path)
+        except Exception as e:
+            self._set_status(style_name, "error", str(e))
 
-            with self._gen_lock:
-                self._gen_status[style_name] = {"status": "done"}
+    def _render(self, style_name, img_path, prompt, negative, settings):
+        remove_thumbnail_files(img_path)
 
-        except Exception as e:
-            try:
-                tmp_path = get_thumbnail_path(style_name, thumb_csv_path) + ".tmp"
-                if os.path.isfile(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
-            with self._gen_lock:
-                self._gen_status[style_name] = {
-                    "status": "error", "message": str(e)
-                }
+        from modules import processing  # type: ignore[reportMissingImports]
+        from modules.processing import (
+            StableDiffusionProcessingTxt2Img,  # type: ignore[reportMissingImports]
+        )
+        from modules.shared import sd_model  # type: ignore[reportMissingImports]
+
+        extra = {"sampler_name": settings["sampler_name"]} if settings["sampler_name"] else {}
+        p = StableDiffusionProcessingTxt2Img(
+            sd_model=sd_model,
+            prompt=prompt,
+            negative_prompt=negative,
+            seed=settings["seed"],
+            steps=settings["steps"],
+            cfg_scale=settings["cfg_scale"],
+            width=settings["width"],
+            height=settings["height"],
+            batch_size=1,
+            n_iter=1,
+            do_not_save_samples=True,
+            do_not_save_grid=True,
+            override_settings={"samples_filename_pattern": ""},
+            **extra,
+        )
+
+        # Empty ScriptRunner — thumbnail generation must not trigger
+        # extension scripts (Regional Prompter, ControlNet, etc.)
+        # We only need p.scripts to not be None so Reforge's
+        # process_images_inner can safely iterate alwayson_scripts.
+        try:
+            from modules.scripts import ScriptRunner
+            p.scripts = ScriptRunner()
+            p.scripts.scripts = []
+            p.scripts.alwayson_scripts = []
+            p.script_args = []
+        except Exception:
+            pass
+
+        stop_progress = threading.Event()
+        threading.Thread(
+            target=self._watch_progress, args=(style_name, stop_progress), daemon=True
+        ).start()
+        try:
+            processed = processing.process_images(p)
+        finally:
+            stop_progress.set()
+            p.close()
+
+        if not processed.images:
+            raise ValueError("No images returned")
+
+        save_thumbnail_image(processed.images[0], img_path)
 
 
 thumbnail_generation_manager = ThumbnailGenerationManager()
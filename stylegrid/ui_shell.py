@@ -0,0 +1,158 @@
+"""
+The V2 iframe document (``GET /style_grid/ui``) and its build assets.
+
+The built ``ui/dist`` is compiled once per build: every file is read and hashed, CSS
+``url(./…)`` references and the ``src`` / ``href`` attributes of ``index.html`` are
+rewritten to ``/style_grid/ui/assets/<content hash>/<path>``, and the results are kept in
+memory. Those URLs never change content, so they are served with a one-year
+``immutable`` Cache-Control; the HTML itself is revalidated with an ETag. A rebuild, or
+an asset edited in place, is picked up from the ``(size, mtime_ns, inode)`` of every file
+in the build (one ``stat`` each per request, a few files), and only once those mtimes are
+safely in the past.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from stylegrid.config import RACY_NS, UI_DIST_DIR, stat_key
+
+ASSET_ROUTE = "/style_grid/ui/assets"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Windows registries often map .js to text/plain, which browsers refuse for module scripts.
+_MEDIA_TYPES = {
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".woff2": "font/woff2",
+}
+_HTML_REF_RE = re.compile(
+    r'(?P<attr>\b(?:src|href))=(?P<q>["\'])\./(?P<path>[^"\']+)(?P=q)',
+    re.IGNORECASE,
+)
+_CSS_URL_RE = re.compile(r'url\((?P<q>["\']?)\./(?P<path>[^"\')]+)(?P=q)\)')
+
+_lock = threading.Lock()
+_build = None
+
+
+class UIBuild:
+    """One compiled ``ui/dist``: rewritten HTML plus ``{relative path: (digest, bytes, media type)}``."""
+
+    def __init__(self, signature, html, assets):
+        self.signature = signature
+        self.html = html
+        self.etag = hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+        self.assets = assets
+
+
+def asset_url(digest, rel):
+    return f"{ASSET_ROUTE}/{digest}/{rel}"
+
+
+def _media_type(rel):
+    ext = os.path.splitext(rel)[1].lower()
+    return _MEDIA_TYPES.get(ext) or mimetypes.guess_type(rel)[0] or "application/octet-stream"
+
+
+def _signature(dist_dir):
+    """
+    ``((relative path, stat_key), ...)`` of every file in the build, index.html first.
+
+    Raises FileNotFoundError when the UI is not built. Per-file keys, not directory
+    mtimes: rewriting an asset in place does not touch its directory.
+    """
+    index_key = stat_key(os.path.join(dist_dir, "index.html"))
+    if index_key is None:
+        raise FileNotFoundError(os.path.join(dist_dir, "index.html"))
+    files = []
+    for root, dirs, names in os.walk(dist_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, dist_dir).replace("\\", "/")
+            if rel != "index.html":
+                files.append((rel, stat_key(path)))
+    return (("index.html", index_key), *files)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _compile(dist_dir, signature):
+    files = {}
+    for root, _dirs, names in os.walk(dist_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, dist_dir).replace("\\", "/")
+            if rel == "index.html":
+                continue
+            with open(path, "rb") as f:
+                files[rel] = f.read()
+
+    assets = {}
+    # CSS first hashes what it references (fonts, images) so its own hash covers them.
+    for rel in sorted(files, key=lambda r: r.endswith(".css")):
+        data = files[rel]
+        if rel.endswith(".css"):
+            base = os.path.dirname(rel)
+
+            def _sub_css(m, base=base):
+                target = os.path.normpath(os.path.join(base, m.group("path"))).replace("\\", "/")
+                entry = assets.get(target)
+                if entry is None:
+                    return m.group(0)
+                return f"url({m.group('q')}{asset_url(entry[0], target)}{m.group('q')})"
+
+            data = _CSS_URL_RE.sub(_sub_css, data.decode("utf-8")).encode("utf-8")
+        assets[rel] = (_digest(data), data, _media_type(rel))
+
+    with open(os.path.join(dist_dir, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+
+    def _sub_html(m):
+        rel = m.group("path").split("?", 1)[0]
+        entry = assets.get(rel)
+        if entry is None:
+            return m.group(0)
+        return f'{m.group("attr")}={m.group("q")}{asset_url(entry[0], rel)}{m.group("q")}'
+
+    return UIBuild(signature, _HTML_REF_RE.sub(_sub_html, html), assets)
+
+
+def current_build(dist_dir=None):
+    """The compiled build for `dist_dir` (default `UI_DIST_DIR`), recompiled after a rebuild."""
+    global _build
+    dist_dir = dist_dir or UI_DIST_DIR
+    signature = (dist_dir, _signature(dist_dir))
+    build = _build
+    if build is not None and build.signature == signature:
+        return build
+    with _lock:
+        build = _build
+        if build is not None and build.signature == signature:
+            return build
+        build = _compile(dist_dir, signature)
+        newest = max(key[1] for _rel, key in signature[1] if key is not None)
+        # A build still being written could change again within the same mtime tick.
+        if newest < time.time_ns() - RACY_NS:
+            _build = build
+    return build
+
+
+def get_asset(digest, rel):
+    """
+    ``(bytes, media type, immutable)`` for an asset URL, or None for unknown paths.
+
+    A digest from an older build (a tab opened before a rebuild) still gets the current
+    file, just without the immutable caching.
+    """
+    entry = current_build().assets.get(rel)
+    if entry is None:
+        return None
+    current_digest, data, media_type = entry
+    return data, media_type, digest == current_digest
@@ -3,15 +3,23 @@
 import random
 import re
 
+SG_TOKEN_RE = re.compile(r"\{sg:([^}]+)\}")
+
+
+def resolve_sg_wildcards(prompt, styles_by_category, rng=None):
+    """
+    Replace `{sg:CATEGORY}` tokens with a random style prompt from that category map.
+
+    `rng` (a `random.Random`) makes the picks reproducible; defaults to the `random` module.
+    """
+    choice = (rng or random).choice
 
-def resolve_sg_wildcards(prompt, styles_by_category):
-    """Replace `{sg:CATEGORY}` tokens with a random style prompt from that category map."""
     def replacer(m):
         token = m.group(1).strip().lower()
         candidates = styles_by_category.get(token)
         if not candidates:
             return m.group(0)
-        style = random.choice(candidates)
+        style = choice(candidates)
         return style.get("prompt", "") or m.group(0)
 
-    return re.sub(r"\{sg:([^}]+)\}", replacer, prompt)
+    return SG_TOKEN_RE.sub(replacer, prompt)
@@ -0,0 +1,39 @@
+"""Bounded executor for blocking disk work and per-resource locks."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from stylegrid import profiling
+
+# Small on purpose: handlers share the WebUI process, and most jobs are short disk reads.
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sg-io")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the Style Grid I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, profiling.bind(functools.partial(fn, *args, **kwargs)))
+
+
+def submit_background(fn, *args, **kwargs):
+    """Fire-and-forget `fn` on the I/O pool (e.g. persisting a cache); returns the Future."""
+    return _io_pool.submit(fn, *args, **kwargs)
+
+
+def resource_lock(key):
+    """
+    Process-wide re-entrant lock for one resource (a file path or a logical name).
+
+    Each CSV, JSON store and the backup job get their own lock, so a slow backup
+    never blocks preset saves or style reads.
+    """
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.RLock()
+        return lock
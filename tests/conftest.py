@@ -36,3 +36,57 @@ def patch_styles_dirs(monkeypatch, tmp_path):
     from stylegrid import csv_io as sg_csv_io
 
     monkeypatch.setattr(sg_csv_io, "get_styles_dirs", lambda: [str(tmp_path)])
+
+
+@pytest.fixture(autouse=True)
+def isolated_catalog_snapshot(monkeypatch, tmp_path):
+    """Keep the parsed-catalog snapshot out of the repo data/ dir and start each test cold."""
+    from stylegrid import cache as sg_cache
+
+    monkeypatch.setattr(sg_cache, "CATALOG_SNAPSHOT_FILE", str(tmp_path / "catalog.snapshot"))
+    monkeypatch.setattr(sg_cache, "_catalog", None)
+    monkeypatch.setattr(sg_cache, "_file_stats", {})
+    monkeypatch.setattr(sg_cache, "_file_hashes", {})
+    monkeypatch.setattr(sg_cache, "_change_announced", False)
+    sg_cache._styles_cache.update({"data": None, "hashes": {}, "categories": None})
+
+
+@pytest.fixture(autouse=True)
+def isolated_backup_store(monkeypatch, tmp_path):
+    """Pre-edit copies and backup objects/manifests go under tmp_path, not data/backups."""
+    from stylegrid import backups as sg_backups
+    from stylegrid import csv_io as sg_csv_io
+
+    root = tmp_path / "backups"
+    monkeypatch.setattr(sg_csv_io, "PRE_EDIT_DIR", str(root / "pending"))
+    monkeypatch.setattr(sg_backups, "PRE_EDIT_DIR", str(root / "pending"))
+    monkeypatch.setattr(sg_backups, "OBJECTS_DIR", str(root / "objects"))
+    monkeypatch.setattr(sg_backups, "MANIFESTS_DIR", str(root / "manifests"))
+    monkeypatch.setattr(sg_backups, "_digest_memo", {})
+    return root
+
+
+@pytest.fixture(autouse=True)
+def isolated_profiles(monkeypatch, tmp_path):
+    """Profiling on (it is opt-in), captures under tmp_path, nothing armed between tests."""
+    from stylegrid import profiling as sg_profiling
+
+    monkeypatch.setattr(sg_profiling, "ENABLED", True)
+    monkeypatch.setattr(sg_profiling, "PROFILES_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(sg_profiling, "_armed", {t: [0, "cprofile"] for t in sg_profiling.TARGETS})
+    yield tmp_path / "profiles"
+    sg_profiling.flush()
+
+
+@pytest.fixture(autouse=True)
+def isolated_thumbnails(monkeypatch, tmp_path):
+    """Thumbnails and their sidecar index live under tmp_path; hash memos start empty."""
+    from stylegrid import thumbnails as sg_thumbs
+
+    d = tmp_path / "thumbnails"
+    d.mkdir(exist_ok=True)
+    monkeypatch.setattr(sg_thumbs, "THUMBNAILS_DIR", str(d))
+    monkeypatch.setattr(sg_thumbs, "_indexes", {})
+    monkeypatch.setattr(sg_thumbs, "_hash_memo", {"gen": None, "dirs": None, "rel": {}, "owners": None})
+    monkeypatch.setattr(sg_thumbs, "_listing_memo", {"key": None, "names": frozenset()})
+    return d
@@ -0,0 +1,137 @@
+"""Tests for stylegrid.backups (content-addressed snapshots, diff, restore, retention)."""
+import json
+import os
+import time
+
+import pytest
+
+from stylegrid import backups
+
+HEADER = "name,prompt,negative_prompt,description,category\n"
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    lib = tmp_path / "styles"
+    lib.mkdir()
+    a, b = lib / "a.csv", lib / "b.csv"
+    a.write_text(HEADER + "One,p1,,,\nTwo,p2,,,\n", encoding="utf-8")
+    b.write_text(HEADER + "Other,p,,,\n", encoding="utf-8")
+    monkeypatch.setattr(backups, "OBJECTS_DIR", str(tmp_path / "bk" / "objects"))
+    monkeypatch.setattr(backups, "MANIFESTS_DIR", str(tmp_path / "bk" / "manifests"))
+    monkeypatch.setattr(backups, "PRESETS_FILE", str(tmp_path / "presets.json"))
+    monkeypatch.setattr(backups, "get_all_styles_file_paths", lambda: [str(a), str(b)])
+    monkeypatch.setattr(backups, "invalidate_styles_cache", lambda: None)
+    monkeypatch.setattr(backups, "request_prompt_styles_reload", lambda: None)
+    monkeypatch.setattr(backups, "_digest_memo", {})
+    return a, b, tmp_path / "bk"
+
+
+def _objects(root):
+    return sorted(f for _, _, fs in os.walk(root / "objects") for f in fs)
+
+
+def test_unchanged_library_writes_nothing(store):
+    a, b, root = store
+    first = backups.create_snapshot()
+    assert first["unchanged"] is False and first["files"] == 2
+    second = backups.create_snapshot()
+    assert second["unchanged"] is True and second["id"] == first["id"]
+    assert len(os.listdir(root / "manifests")) == 1
+
+    a.write_text(HEADER + "One,p1 changed,,,\nThree,p3,,,\n", encoding="utf-8")
+    third = backups.create_snapshot()
+    assert third["unchanged"] is False
+    assert len(_objects(root)) == 3  # a v1, a v2, b stored once
+    assert [s["id"] for s in backups.list_snapshots()] == [third["id"], first["id"]]
+
+
+def test_diff_and_restore(store):
+    a, b, root = store
+    original = a.read_bytes()
+    snap = backups.create_snapshot()["id"]
+    a.write_text(HEADER + "One,p1 changed,,,\nThree,p3,,,\n", encoding="utf-8")
+
+    diff = backups.diff_snapshots(snap)
+    by_name = {f["name"]: f for f in diff["files"]}
+    assert by_name["b.csv"]["status"] == "unchanged"
+    assert by_name["a.csv"]["status"] == "modified"
+    assert by_name["a.csv"]["styles"] == {"added": ["Three"], "removed": ["Two"], "changed": ["One"]}
+
+    result = backups.restore_snapshot(snap, ["a.csv"])
+    assert result["restored"] == [str(a)]
+    assert a.read_bytes() == original
+    assert backups.load_manifest(result["backup"])["kind"] == "pre-restore"
+    assert backups.restore_snapshot("../../etc/passwd") == {"error": "Snapshot not found"}
+
+
+def test_retention_buckets_and_object_gc(store, monkeypatch):
+    a, b, root = store
+    monkeypatch.setattr(backups, "RETENTION", {"last": 2, "hourly": 0, "daily": 3, "weekly": 0})
+    backups.create_snapshot()
+    manifests = root / "manifests"
+    (only,) = os.listdir(manifests)
+    base = json.loads((manifests / only).read_text())
+    day = 86400
+    now = time.mktime((2023, 11, 14, 12, 0, 0, 0, 0, -1))
+    ids = []
+    for i, age in enumerate([0, 3600, 2 * 3600, day, day + 60, 2 * day, 5 * day]):
+        m = dict(base, id=f"20200101_0000{i:02d}_000000", created_ts=now - age)
+        m["files"] = [dict(base["files"][0], sha256=f"{i:064x}")]
+        (manifests / (m["id"] + ".json")).write_text(json.dumps(m))
+        obj = root / "objects" / m["files"][0]["sha256"][:2]
+        obj.mkdir(parents=True, exist_ok=True)
+        (obj / m["files"][0]["sha256"]).write_bytes(b"x")
+        ids.append(m["id"])
+    os.remove(manifests / only)
+    backups.prune_snapshots(now=now)
+    kept = sorted(n[:-5] for n in os.listdir(manifests))
+    # newest two, plus the newest of each of the three most recent days
+    assert kept == sorted([ids[0], ids[1], ids[3], ids[5]])
+    assert len(_objects(root)) == 4
+
+
+@pytest.fixture
+def edits(tmp_csv, patch_styles_dirs, monkeypatch):
+    from stylegrid import csv_io
+
+    for mod in (csv_io, backups):
+        monkeypatch.setattr(mod, "invalidate_styles_cache", lambda: None)
+        monkeypatch.setattr(mod, "request_prompt_styles_reload", lambda: None)
+    return csv_io
+
+
+def test_pre_edit_snapshots_undo_step_by_step(edits, tmp_csv, isolated_backup_store):
+    v0 = tmp_csv.read_bytes()
+    edits.save_style_to_csv("Test Style A", "v1", "", source_file="styles.csv")
+    v1 = tmp_csv.read_bytes()
+    edits.save_style_to_csv("Test Style A", "v2", "", source_file="styles.csv")
+    backups.compact_pre_edit_snapshots()
+    assert not list((isolated_backup_store / "pending").iterdir())
+    kinds = [s["kind"] for s in backups.list_snapshots()]
+    assert kinds == ["pre-edit", "pre-edit"]
+
+    assert backups.undo_last_edit()["restored"] == [str(tmp_csv)]
+    assert tmp_csv.read_bytes() == v1
+    assert backups.undo_last_edit("styles.csv")["restored"] == [str(tmp_csv)]
+    assert tmp_csv.read_bytes() == v0
+    assert backups.undo_last_edit() == {"error": "Nothing to undo"}
+    # Each undo left a partial pre-restore snapshot of what it replaced.
+    assert [s["kind"] for s in backups.list_snapshots()] == ["pre-restore", "pre-restore"]
+
+
+def test_batch_is_one_undo_step(edits, tmp_path, monkeypatch):
+    other = tmp_path / "other.csv"
+    other.write_text(HEADER + "O,po,,,\n", encoding="utf-8")
+    before = {p: p.read_bytes() for p in (tmp_path / "styles.csv", other)}
+    results = edits.apply_style_operations([
+        {"op": "upsert", "name": "Test Style A", "prompt": "x", "source": "styles.csv"},
+        {"op": "delete", "name": "O", "source": "other.csv"},
+        {"op": "upsert", "name": "New", "prompt": "y", "source": "styles.csv"},
+    ])
+    assert all(r == {"ok": True} for r in results)
+    backups.compact_pre_edit_snapshots()
+    (snap,) = backups.list_snapshots()
+    assert snap["files"] == 2 and snap["partial"] is True
+    backups.undo_last_edit()
+    assert {p: p.read_bytes() for p in before} == before
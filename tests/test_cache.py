@@ -0,0 +1,100 @@
+"""Tests for stylegrid.cache: incremental rebuilds and the on-disk catalog snapshot."""
+import os
+
+import pytest
+
+from stylegrid import cache
+
+
+@pytest.fixture
+def two_packs(monkeypatch, tmp_path):
+    d = tmp_path / "styles"
+    d.mkdir()
+    header = "name,prompt,negative_prompt,description,category\n"
+    (d / "a.csv").write_text(header + "A_one,pa,,,\nA_two,pa2,,,\n", encoding="utf-8")
+    (d / "b.csv").write_text(header + "B_one,pb,,,\n", encoding="utf-8")
+    monkeypatch.setattr(cache, "get_styles_dirs", lambda: [str(d)])
+    return d
+
+
+def _restart(monkeypatch):
+    """Forget in-memory state as a fresh WebUI process would."""
+    monkeypatch.setattr(cache, "_catalog", None)
+    monkeypatch.setattr(cache, "_file_stats", {})
+    monkeypatch.setattr(cache, "_file_hashes", {})
+    cache._styles_cache.update({"data": None, "hashes": {}, "categories": None})
+
+
+def _count_parses(monkeypatch):
+    parsed = []
+    real = cache.load_styles_files
+
+    def spy(paths, **kw):
+        parsed.extend(os.path.basename(p) for p in paths)
+        return real(paths, **kw)
+
+    monkeypatch.setattr(cache, "load_styles_files", spy)
+    return parsed
+
+
+def test_snapshot_serves_cold_start_and_reparses_only_changed(monkeypatch, two_packs):
+    first = cache.get_cached_styles()
+    etag_hashes = dict(cache.styles_cache_hashes())
+    cache._write_snapshot(dict(cache._catalog), cache._catalog_gen + 1)
+    assert os.path.isfile(cache.CATALOG_SNAPSHOT_FILE)
+
+    _restart(monkeypatch)
+    parsed = _count_parses(monkeypatch)
+    real_hash = cache._hash_file
+    monkeypatch.setattr(cache, "_hash_file", lambda p: pytest.fail("unchanged file re-hashed"))
+    again = cache.get_cached_styles()
+    assert parsed == []
+    assert again == first
+    assert cache.styles_cache_hashes() == etag_hashes
+    assert [s.category for s in again] == [s.category for s in first]
+
+    _restart(monkeypatch)
+    monkeypatch.setattr(cache, "_hash_file", real_hash)
+    del parsed[:]
+    (two_packs / "b.csv").write_text("name,prompt\nB_one,changed\n", encoding="utf-8")
+    styles = cache.get_cached_styles()
+    assert parsed == ["b.csv"]
+    assert {s.name: s.prompt for s in styles}["B_one"] == "changed"
+
+
+def test_corrupt_or_old_snapshot_is_ignored(monkeypatch, two_packs):
+    with open(cache.CATALOG_SNAPSHOT_FILE, "wb") as f:
+        f.write(cache.SNAPSHOT_MAGIC + bytes([cache.SNAPSHOT_VERSION - 1, 0]) + b"garbage")
+    assert len(cache.get_cached_styles()) == 3
+
+
+def test_reload_reparse_and_categories_memo(monkeypatch, two_packs):
+    cats = cache.get_cached_categories()
+    assert cache.get_cached_categories() is cats
+    assert sorted(cats) == ["A", "B"]
+    parsed = _count_parses(monkeypatch)
+    cache.invalidate_styles_cache()
+    cache.get_cached_styles()
+    assert parsed == []
+    cache.invalidate_styles_cache(reparse=True)
+    cache.get_cached_styles()
+    assert sorted(parsed) == ["a.csv", "b.csv"]
+    assert cache.get_cached_categories() is not cats
+
+
+def test_write_then_rescan_publishes_catalog_once(monkeypatch, two_packs):
+    published = []
+    monkeypatch.setattr(cache.events, "publish", lambda topic, **data: published.append(topic))
+    cache.get_cached_styles()
+    published.clear()
+
+    header = "name,prompt,negative_prompt,description,category\n"
+    (two_packs / "a.csv").write_text(header + "A_one,edited,,,\n", encoding="utf-8")
+    cache.invalidate_styles_cache()  # in-process save
+    assert [s.prompt for s in cache.get_cached_styles() if s.name == "A_one"] == ["edited"]
+    assert cache.check_files_changed() is False
+    assert published == ["catalog"]
+
+    (two_packs / "b.csv").write_text(header + "B_one,external,,,\n", encoding="utf-8")
+    assert cache.check_files_changed() is True  # edit made outside the API
+    assert published == ["catalog", "catalog"]
@@ -0,0 +1,53 @@
+"""Tests for stylegrid.compose (generation prompt composition and the compose LRU)."""
+from stylegrid import compose
+from stylegrid.records import Style
+
+
+def _style(name, prompt, negative="", category="", source="a.csv"):
+    return Style(name, prompt, negative, "", category, source, "/x/" + source)
+
+
+CATALOG = [
+    _style("Wrap", "masterpiece, {prompt}, detailed", "{prompt}, lowres"),
+    _style("Tags", "Detailed, sharp", "blurry"),
+    _style("Red", "red hair", category="hair"),
+    _style("Blue", "blue hair", category="hair"),
+    _style("Green", "green hair", category="hair", source="b.csv"),
+]
+
+
+def test_dedup_prompt_keeps_first_and_break():
+    assert compose.dedup_prompt("a, (A:1.2), b, BREAK, b, BREAK") == "a, b, BREAK, BREAK"
+
+
+def test_apply_styles_wraps_then_merges_tags():
+    prompts, negatives = compose.compose_prompts(["cat, cat"], ["ugly"], ["Wrap", "Tags", "Missing"], CATALOG)
+    assert prompts == ["masterpiece, cat, detailed, sharp"]
+    assert negatives == ["ugly, lowres, blurry"]
+
+
+def test_seeded_wildcards_are_reproducible_and_scoped():
+    seeds = list(range(20))
+    first, _ = compose.compose_prompts(["{sg:HAIR}"] * 20, [""] * 20, [], CATALOG, seeds=seeds)
+    compose._state["results"].clear()
+    again, _ = compose.compose_prompts(["{sg:HAIR}"] * 20, [""] * 20, [], CATALOG, seeds=seeds)
+    assert first == again
+    assert set(first) <= {"red hair", "blue hair", "green hair"} and len(set(first)) > 1
+    scoped, _ = compose.compose_prompts(["{sg:hair}"], [""], [], CATALOG, "/x/b.csv", [1])
+    assert scoped == ["green hair"]
+
+
+def test_lru_reuses_results_until_catalog_changes(monkeypatch):
+    calls = []
+    real = compose.apply_styles
+    monkeypatch.setattr(compose, "apply_styles", lambda *a: calls.append(1) or real(*a))
+    monkeypatch.setattr(compose, "COMPOSE_CACHE_SIZE", 2)
+    for _ in range(3):
+        compose.compose_prompts(["x"], [""], ["Tags"], CATALOG)
+    assert len(calls) == 1
+    compose.compose_prompts(["y"], [""], ["Tags"], CATALOG)
+    compose.compose_prompts(["z"], [""], ["Tags"], CATALOG)
+    compose.compose_prompts(["x"], [""], ["Tags"], CATALOG)  # evicted
+    assert len(calls) == 4
+    compose.compose_prompts(["x"], [""], ["Tags"], list(CATALOG))  # rebuilt catalog
+    assert len(calls) == 5
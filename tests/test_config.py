@@ -0,0 +1,119 @@
+"""Tests for stylegrid.config style file discovery (order, basename lookup, listing cache, sources.json)."""
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from stylegrid import config
+
+
+def _csv(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("name,prompt\nX,y\n", encoding="utf-8")
+    return str(path)
+
+
+def _age(*dirs):
+    old = 1_000_000_000
+    for d in dirs:
+        os.utime(d, (old, old))
+
+
+def test_listing_cache_revalidates_on_dir_mtime(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "SOURCES_FILE", str(tmp_path / "none.json"))
+    a = _csv(tmp_path / "b.csv")
+    _age(tmp_path)
+    assert config.get_all_styles_file_paths([str(tmp_path)]) == [a]
+
+    calls = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(config.os, "scandir", lambda d: calls.append(d) or real_scandir(d))
+    assert config.get_all_styles_file_paths([str(tmp_path)]) == [a]
+    assert calls == []
+
+    new = _csv(tmp_path / "a.csv")
+    assert config.get_all_styles_file_paths([str(tmp_path)]) == [new, a]
+    assert config.find_styles_file("a.csv", [str(tmp_path)]) == new
+    assert config.find_styles_file("missing.csv", [str(tmp_path)]) is None
+
+
+def test_sources_json_recursive_dirs_ignore_patterns_and_files(monkeypatch, tmp_path):
+    root = tmp_path / "packs"
+    top = _csv(root / "top.csv")
+    nested = _csv(root / "anime" / "nested.csv")
+    _csv(root / "anime" / "nested_old.csv")
+    _csv(root / "archive" / "skipped.csv")
+    _csv(root / ".git" / "hidden.csv")
+    loose = _csv(tmp_path / "elsewhere" / "loose.csv")
+    sources = tmp_path / "sources.json"
+    sources.write_text(json.dumps([
+        {"path": str(root), "recursive": True, "ignore": ["*_old.csv", "archive"]},
+        loose,
+    ]), encoding="utf-8")
+    monkeypatch.setattr(config, "SOURCES_FILE", str(sources))
+
+    assert str(root) in config.get_styles_dirs()
+    paths = config.get_all_styles_file_paths([str(root)])
+    assert paths == [top, nested, loose]
+    assert config.find_styles_file("nested.csv", [str(root)]) == nested
+
+    sources.write_text(json.dumps([str(root)]), encoding="utf-8")
+    os.utime(sources, ns=(1, 1))
+    assert config.get_all_styles_file_paths([str(root)]) == [top]
+
+
+def _webui_layout(monkeypatch, tmp_path):
+    """Extension, WebUI style-file dirs and a separate WebUI root, with `shared` pointing at them."""
+    monkeypatch.setattr(config, "SOURCES_FILE", str(tmp_path / "none.json"))
+    monkeypatch.setattr(config, "EXT_DIR", str(tmp_path / "ext"))
+    root = tmp_path / "root"
+    root.mkdir()
+    monkeypatch.chdir(root)
+    shared_files = [tmp_path / "webui" / "styles.csv", tmp_path / "other" / "extra_styles"]
+    for f in shared_files:
+        _csv(f)
+    prompt_styles = SimpleNamespace(all_styles_files=[Path(f) for f in shared_files])
+    monkeypatch.setattr(config, "shared", SimpleNamespace(prompt_styles=prompt_styles))
+    return root
+
+
+def test_discovery_order_styles_then_webui_dirs_then_samples_and_root(monkeypatch, tmp_path):
+    root = _webui_layout(monkeypatch, tmp_path)
+    ext_styles = _csv(tmp_path / "ext" / "styles" / "b.csv")
+    neighbour = _csv(tmp_path / "webui" / "neighbour.csv")
+    other = _csv(tmp_path / "other" / "z.csv")
+    sample = _csv(tmp_path / "ext" / "samples" / "s.csv")
+    in_root = _csv(root / "root.csv")
+
+    assert config.get_styles_dirs() == [
+        str(tmp_path / "ext" / "styles"),
+        str(tmp_path / "webui"),
+        str(tmp_path / "other"),
+        str(tmp_path / "ext" / "samples"),
+        str(root),
+    ]
+    # Every CSV beside a WebUI style file is listed; WebUI files the scan missed come last.
+    assert config.get_all_styles_file_paths() == [
+        ext_styles,
+        neighbour,
+        str(tmp_path / "webui" / "styles.csv"),
+        other,
+        sample,
+        in_root,
+        str(tmp_path / "other" / "extra_styles"),
+    ]
+
+
+def test_basename_resolves_to_the_first_discovered_file(monkeypatch, tmp_path):
+    _webui_layout(monkeypatch, tmp_path)
+    ours = _csv(tmp_path / "ext" / "styles" / "styles.csv")
+    _csv(tmp_path / "ext" / "samples" / "samples_only.csv")
+
+    assert config.find_styles_file("styles.csv") == ours
+    assert config.find_styles_file("samples_only.csv") == str(
+        tmp_path / "ext" / "samples" / "samples_only.csv"
+    )
+    assert config.find_styles_file("extra_styles") == str(tmp_path / "other" / "extra_styles")
+
+    os.remove(ours)
+    assert config.find_styles_file("styles.csv") == str(tmp_path / "webui" / "styles.csv")
@@ -4,6 +4,7 @@ Tests for stylegrid.csv_io parse/save/delete behavior.
 Duplicate names (save): save_style_to_csv updates the first matching row by name and stops;
 remaining duplicate rows are left unchanged (see test_save_updates_first_duplicate_only).
 """
+import os
 from pathlib import Path
 
 import pytest
@@ -26,8 +27,8 @@ def test_parse_returns_expected_fields(tmp_csv):
         "source_file",
     }
     assert by_name["Test Style A"]["source"] == by_name["Test Style A"]["_source"] == "styles.csv"
-    # CSV column "category" is stored as category_explicit; "category" is added by categorize_styles().
-    assert "category" not in by_name["Test Style A"]
+    # CSV column "category" is stored as category_explicit; "category" is the resolved grid category.
+    assert by_name["Test Style A"]["category"] == by_name["Test Style A"].category
     assert by_name["Test Style A"]["category_explicit"] == "BASE"
     assert by_name["Test Style B"]["category_explicit"] == "BODY"
     assert by_name["Style With Spaces"]["category_explicit"] == ""
@@ -69,6 +70,31 @@ def test_load_all_keeps_same_basename_in_different_dirs(tmp_path, monkeypatch):
     assert all(s.get("_source") == "styles.csv" for s in styles)
 
 
+@pytest.mark.parametrize("threads,processes", [(4, 0), (2, 2)])
+def test_parallel_load_matches_serial_order(monkeypatch, tmp_path, threads, processes):
+    dirs = []
+    for i in range(3):
+        d = tmp_path / f"d{i}"
+        d.mkdir()
+        for j in range(3):
+            rows = "".join(f"S{k},p{i}{j}{k},,,\n" for k in range(20))
+            (d / f"pack{j}.csv").write_text("name,prompt,negative_prompt,description,category\n" + rows + "S0,dup,,,\n", encoding="utf-8")
+        dirs.append(str(d))
+    monkeypatch.setattr(csv_io, "get_styles_dirs", lambda: dirs)
+    serial = csv_io.load_all_styles(threads=0, processes=0)
+    parallel = csv_io.load_all_styles(threads=threads, processes=processes)
+    assert len(serial) == 9 * 20
+    assert parallel == serial
+    assert [(s.source_file, s.category) for s in parallel] == [(s.source_file, s.category) for s in serial]
+    if processes:
+        from stylegrid import loader
+
+        pool = loader._process_pool
+        assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+        csv_io.load_all_styles(threads=threads, processes=processes)
+        assert loader._process_pool is pool  # one long-lived pool, not one per load
+
+
 def test_parse_row_count_matches_data_rows(tmp_path):
     p = tmp_path / "x.csv"
     p.write_text(
@@ -198,3 +224,161 @@ def test_save_updates_first_duplicate_only(tmp_path, patch_styles_dirs, monkeypa
     assert len(dups) == 2
     assert dups[0]["prompt"] == "first_only"
     assert dups[1]["prompt"] == "old2"
+
+
+def test_batch_applies_ops_with_one_rewrite_per_file(tmp_csv, patch_styles_dirs, monkeypatch):
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: None)
+    reloads = []
+    monkeypatch.setattr(csv_io.shared.prompt_styles, "reload", lambda: reloads.append(1))
+    writes = []
+    real_write = csv_io.write_styles_csv
+    monkeypatch.setattr(
+        csv_io, "write_styles_csv", lambda *a: (writes.append(a[0]), real_write(*a))
+    )
+    results = csv_io.apply_style_operations([
+        {"op": "upsert", "name": "New One", "prompt": "n1", "source": "styles.csv"},
+        {"op": "delete", "name": "Test Style B", "source": "styles.csv"},
+        {"op": "rename", "name": "Test Style A", "new_name": "Renamed A", "source": "styles.csv"},
+        {"op": "rename", "name": "Missing", "new_name": "X", "source": "styles.csv"},
+        {"op": "bogus", "name": "Y"},
+    ])
+    assert results[:3] == [{"ok": True}] * 3
+    assert "error" in results[3] and "error" in results[4]
+    assert len(writes) == 1
+    csv_io.flush_prompt_styles_reload()
+    assert len(reloads) == 1
+    by_name = {s["name"]: s for s in csv_io.parse_styles_csv(str(tmp_csv))}
+    assert set(by_name) == {"New One", "Renamed A", "Style With Spaces"}
+    # rename keeps the untouched fields of the original row
+    assert by_name["Renamed A"]["prompt"] == "(tag_a:1.2)"
+    assert by_name["Renamed A"]["category_explicit"] == "BASE"
+
+
+def test_batch_rename_refuses_existing_name(tmp_csv, patch_styles_dirs, monkeypatch):
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: None)
+    results = csv_io.apply_style_operations([
+        {"op": "rename", "name": "Test Style A", "new_name": "Test Style B", "source": "styles.csv"},
+    ])
+    assert results == [{"error": "Name already exists"}]
+    names = [s["name"] for s in csv_io.parse_styles_csv(str(tmp_csv))]
+    assert names.count("Test Style B") == 1 and "Test Style A" in names
+
+
+def test_batch_skips_files_where_every_op_failed(tmp_csv, patch_styles_dirs, monkeypatch):
+    invalidated, renamed = [], []
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: invalidated.append(1))
+    before = tmp_csv.read_bytes()
+    results = csv_io.apply_style_operations(
+        [
+            {"op": "rename", "name": "Missing", "new_name": "X", "source": "styles.csv"},
+            {"op": "rename", "name": "Test Style A", "new_name": "", "source": "styles.csv"},
+        ],
+        on_rename=lambda *a: renamed.append(a),
+    )
+    assert all("error" in r for r in results)
+    assert tmp_csv.read_bytes() == before and not invalidated and not renamed
+
+    csv_io.apply_style_operations(
+        [{"op": "rename", "name": "Test Style A", "new_name": "Renamed A", "source": "styles.csv"}],
+        on_rename=lambda *a: renamed.append(a),
+    )
+    assert renamed == [(str(tmp_csv), "Test Style A", "Renamed A")] and invalidated
+
+
+def test_concurrent_saves_keep_every_row(tmp_csv, patch_styles_dirs, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: None)
+    monkeypatch.setattr(csv_io, "LOCKS_DIR", str(tmp_csv.parent / "locks"))
+
+    def worker(n):
+        for j in range(10):
+            csv_io.save_style_to_csv(f"T{n}_{j}", "p", "", "", source_file="styles.csv")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    names = {s["name"] for s in csv_io.parse_styles_csv(str(tmp_csv))}
+    assert {f"T{n}_{j}" for n in range(6) for j in range(10)} <= names
+    assert len(names) == 63
+    assert not [p for p in tmp_csv.parent.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_failed_write_leaves_original_intact(tmp_csv, monkeypatch):
+    before = tmp_csv.read_bytes()
+
+    class Boom(Exception):
+        pass
+
+    def bad_rows():
+        yield ["Partial", "x", "", "", ""]
+        raise Boom()
+
+    with pytest.raises(Boom):
+        csv_io.write_styles_csv(str(tmp_csv), csv_io.FIELDNAMES, bad_rows())
+    assert tmp_csv.read_bytes() == before
+    assert not [p for p in tmp_csv.parent.iterdir() if p.name.endswith(".tmp")]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_atomic_write_modes_follow_umask_or_existing_file(tmp_path):
+    new = tmp_path / "new.csv"
+    csv_io.write_file_bytes(str(new), b"x")
+    assert new.stat().st_mode & 0o777 == csv_io.NEW_FILE_MODE != 0o600
+    os.chmod(new, 0o640)
+    csv_io.write_file_bytes(str(new), b"y")
+    assert new.stat().st_mode & 0o777 == 0o640
+
+
+def test_style_edits_coalesce_into_one_deferred_reload(tmp_csv, patch_styles_dirs, monkeypatch):
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: None)
+    monkeypatch.setattr(csv_io, "RELOAD_DEBOUNCE_SECONDS", 60)
+    reloads = []
+    monkeypatch.setattr(csv_io.shared.prompt_styles, "reload", lambda: reloads.append(1))
+    for i in range(5):
+        csv_io.save_style_to_csv(f"Burst {i}", "p", "", "", source_file="styles.csv")
+    csv_io.delete_style_from_csv("Burst 0", source_file="styles.csv")
+    assert reloads == []
+    assert csv_io.flush_prompt_styles_reload() is True
+    assert reloads == [1]
+    assert csv_io.flush_prompt_styles_reload() is False
+    assert reloads == [1]
+
+
+def test_deferred_reload_fires_after_debounce(tmp_csv, patch_styles_dirs, monkeypatch):
+    import time
+
+    monkeypatch.setattr(csv_io, "invalidate_styles_cache", lambda: None)
+    monkeypatch.setattr(csv_io, "RELOAD_DEBOUNCE_SECONDS", 0.05)
+    reloads = []
+    monkeypatch.setattr(csv_io.shared.prompt_styles, "reload", lambda: reloads.append(1))
+    csv_io.save_style_to_csv("Timed", "p", "", "", source_file="styles.csv")
+    deadline = time.monotonic() + 2
+    while not reloads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reloads == [1]
+
+
+def test_parse_matches_row_semantics_of_line_reader(tmp_path):
+    """Headerless files, blank rows, short rows and quoted newlines parse like the old reader."""
+    p = tmp_path / "odd.csv"
+    p.write_bytes(
+        b"\r\n"
+        b",,,\r\n"
+        b"First,a\r\n"
+        b"name,not a header any more\r\n"
+        b'Multi,"line1\r\nline2",neg\r\n'
+    )
+    styles = csv_io.parse_styles_csv(str(p))
+    assert [s["name"] for s in styles] == ["First", "name", "Multi"]
+    assert styles[0]["negative_prompt"] == "" and styles[0]["category_explicit"] == ""
+    assert styles[2]["prompt"] == "line1\nline2"
+    assert styles[0]["source_file"] is styles[2]["source_file"]
+
+
+def test_make_row_sanitizes_and_keeps_existing_category():
+    row = csv_io.make_row("a", "p", "n", "=cmd", None, ["a", "", "", "", "Old"])
+    assert row == ["a", "p", "n", "'=cmd", "Old"]
+    assert csv_io.make_row("a", "p", "n", "", "@x")[4] == "'@x"
@@ -0,0 +1,37 @@
+"""Tests for stylegrid.data_files JSON stores (presets, usage) under concurrent access."""
+import threading
+
+import pytest
+
+from stylegrid import data_files
+
+
+@pytest.fixture
+def json_stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_files, "PRESETS_FILE", str(tmp_path / "presets.json"))
+    monkeypatch.setattr(data_files, "USAGE_FILE", str(tmp_path / "usage.json"))
+    return tmp_path
+
+
+def test_increment_usage_concurrent_threads_lose_no_updates(json_stores):
+    def worker():
+        for _ in range(25):
+            data_files.increment_usage(["A", "B"])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    usage = data_files.load_usage()
+    assert usage["A"]["count"] == 200
+    assert usage["B"]["count"] == 200
+
+
+def test_save_and_delete_preset_round_trip(json_stores):
+    presets = data_files.save_preset("P1", ["A", "B"])
+    assert presets["P1"]["styles"] == ["A", "B"]
+    data_files.merge_presets({"P2": {"styles": ["C"]}})
+    assert set(data_files.load_presets()) == {"P1", "P2"}
+    assert "P1" not in data_files.delete_preset("P1")
+    assert set(data_files.load_presets()) == {"P2"}
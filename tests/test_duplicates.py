@@ -0,0 +1,51 @@
+"""Tests for stylegrid.duplicates (exact content-hash groups, MinHash/LSH near-duplicates)."""
+import pytest
+
+from stylegrid import duplicates
+from stylegrid.records import Style
+
+BASE = [f"tag{i}" for i in range(20)]
+
+
+def _style(name, tags, negative="lowres", source="a.csv"):
+    return Style(name, ", ".join(tags), negative, "", "", source, "/x/" + source)
+
+
+@pytest.fixture
+def catalog():
+    return [
+        _style("Original", BASE),
+        _style("Reformatted", [t.upper() + "  " for t in BASE], negative=" LOWRES", source="b.csv"),
+        _style("One tag swapped", BASE[:-1] + ["other"], source="b.csv"),
+        _style("Reordered", list(reversed(BASE)), source="c.csv"),
+        _style("Unrelated", [f"x{i}" for i in range(20)]),
+        _style("Empty", []),
+    ]
+
+
+def _names(group):
+    return sorted(s["name"] for s in group["styles"])
+
+
+def test_exact_groups_use_normalized_content(catalog):
+    report = duplicates.find_duplicates(catalog)
+    assert report["exact_total"] == 1
+    assert _names(report["exact"][0]) == ["Original", "Reformatted"]
+
+
+def test_near_groups_cluster_similar_styles(catalog):
+    (group,) = duplicates.near_duplicate_groups(catalog, threshold=0.8)
+    assert _names(group) == ["One tag swapped", "Original", "Reformatted", "Reordered"]
+    sims = {s["name"]: s["similarity"] for s in group["styles"]}
+    assert sims["Reordered"] == 1.0 and 0.8 <= sims["One tag swapped"] < 1.0
+    (strict,) = duplicates.near_duplicate_groups(catalog, threshold=1.0)
+    assert _names(strict) == ["Original", "Reformatted", "Reordered"]
+
+
+def test_python_fallback_matches_numpy(catalog, monkeypatch):
+    if duplicates.np is None:
+        pytest.skip("numpy not installed")
+    expected = duplicates.find_duplicates(catalog)
+    monkeypatch.setattr(duplicates, "np", None)
+    monkeypatch.setattr(duplicates, "_memo", {"styles": None, "analysis": None})
+    assert duplicates.find_duplicates(catalog) == expected
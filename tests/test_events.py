@@ -0,0 +1,77 @@
+"""Tests for stylegrid.events (SSE hub: fan-out, Last-Event-ID replay, watcher lifecycle)."""
+import asyncio
+import threading
+
+import pytest
+
+from stylegrid import events
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    fresh = events.EventHub()
+    monkeypatch.setattr(events, "hub", fresh)
+    return fresh
+
+
+def test_publish_reaches_subscribers_from_any_thread(hub):
+    async def scenario():
+        sub = hub.subscribe()
+        t = threading.Thread(target=events.publish, args=("thumbnail",), kwargs={"name": "A", "status": "done"})
+        t.start()
+        t.join()
+        events.publish("catalog")
+        first = await sub.get(1)
+        second = await sub.get(1)
+        hub.unsubscribe(sub)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == (1, "thumbnail", {"name": "A", "status": "done", "revision": 1})
+    assert second == (2, "catalog", {"revision": 1})
+    assert events.format_event(second) == 'id: 2\nevent: catalog\ndata: {"revision": 1}\n\n'
+    assert hub.subscriber_count() == 0
+
+
+def test_last_event_id_replays_or_resyncs(hub, monkeypatch):
+    for _ in range(3):
+        hub.publish("usage")
+
+    async def drain(last_id):
+        sub = hub.subscribe(last_id)
+        out = []
+        while not sub.queue.empty():
+            out.append(await sub.get(1))
+        hub.unsubscribe(sub)
+        return [(seq, topic) for seq, topic, _data in out]
+
+    assert asyncio.run(drain(1)) == [(2, "usage"), (3, "usage")]
+    assert asyncio.run(drain(3)) == []
+    assert asyncio.run(drain(99)) == [(3, "resync")]  # id from before a restart
+    monkeypatch.setattr(events, "QUEUE_SIZE", 2)
+
+    async def overflow():
+        sub = hub.subscribe()
+        for _ in range(5):
+            hub.publish("usage")
+        await asyncio.sleep(0)
+        return [await sub.get(1) for _ in range(sub.queue.qsize())]
+
+    assert [topic for _seq, topic, _data in asyncio.run(overflow())] == ["resync"]
+
+
+def test_watcher_scans_only_while_someone_listens(hub):
+    scans = []
+    hub.set_watcher(lambda: scans.append(1), interval=0.01)
+
+    async def scenario():
+        sub = hub.subscribe()
+        await asyncio.sleep(0.1)
+        hub.unsubscribe(sub)
+
+    asyncio.run(scenario())
+    during = len(scans)
+    assert during >= 2
+    threading.Event().wait(0.1)
+    assert len(scans) <= during + 1
+
@@ -0,0 +1,97 @@
+"""Tests for stylegrid.importer (format detection, dedup, conflicts, all-or-nothing output)."""
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+
+from stylegrid import importer
+from stylegrid.records import Style
+
+
+@pytest.fixture
+def library(monkeypatch, tmp_path):
+    catalog = [
+        Style("Existing", "masterpiece, best quality", "lowres", "", "", "base.csv", "/x/base.csv"),
+    ]
+    merged = {}
+    monkeypatch.setattr(importer, "EXT_DIR", str(tmp_path))
+    monkeypatch.setattr(importer, "get_cached_styles", lambda: catalog)
+    monkeypatch.setattr(importer, "merge_presets", merged.update)
+    monkeypatch.setattr(importer, "invalidate_styles_cache", lambda: None)
+    return tmp_path / "styles", merged
+
+
+def _rows(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def _run(data, **kwargs):
+    return importer.import_styles(io.BytesIO(data), **kwargs)
+
+
+def test_csv_dedup_and_conflicts(library):
+    out_dir, _ = library
+    body = (
+        "name,prompt,negative_prompt,description,category\n"
+        "Existing,\"Masterpiece,  best quality\",LOWRES,,\n"  # same content after normalization
+        "Existing,other prompt,,,\n"
+        "New,tag,,desc,CAT\n"
+        "New,tag,,desc,CAT\n"
+        ",orphan,,,\n"
+    ).encode("utf-8")
+    report = _run(body, filename="pack.csv")
+    assert report["imported"] == 2
+    assert report["duplicates"] == 2
+    assert report["conflicts_total"] == 1
+    assert report["conflicts"][0]["existing_sources"] == ["base.csv"]
+    assert report["errors"][0]["row"] == 6
+    (name,) = report["files"]
+    assert name.endswith("_pack.csv")
+    assert [r[0] for r in _rows(out_dir / name)] == ["Existing", "New"]
+
+
+def test_conflict_modes(library):
+    out_dir, _ = library
+    body = b"Existing,other prompt\n"
+    assert _run(body, on_conflict="skip")["files"] == []
+    report = _run(body, on_conflict="rename")
+    assert _rows(out_dir / report["files"][0])[0][0] == "Existing (imported)"
+    with pytest.raises(importer.ImportFailed):
+        _run(body, on_conflict="bogus")
+
+
+def test_json_export_and_zip(library):
+    out_dir, merged = library
+    export = {"styles": [{"name": "A", "prompt": "a"}], "presets": {"P": {"styles": ["A"]}}}
+    report = _run(json.dumps(export).encode("utf-8"))
+    assert report["imported"] == 1 and report["presets"] == 1
+    assert merged == {"P": {"styles": ["A"]}}
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("one.csv", "name,prompt\nB,b\n")
+        zf.writestr("sub/two.csv", "C,c\n")
+        zf.writestr("presets.json", json.dumps({"Q": {}}))
+        zf.writestr("__MACOSX/one.csv", "junk")
+    report = _run(buf.getvalue())
+    assert report["imported"] == 2 and report["presets"] == 1
+    assert sorted(f.rsplit("_", 1)[1] for f in report["files"]) == ["one.csv", "two.csv"]
+    assert "Q" in merged
+
+
+def test_failed_import_writes_nothing(library):
+    out_dir, _ = library
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("a.csv", "Fine,ok\n")
+        zf.writestr("b.json", "{not json")
+    with pytest.raises(importer.ImportFailed):
+        _run(buf.getvalue())
+    assert not out_dir.exists() or list(out_dir.iterdir()) == []
+
+    with pytest.raises(importer.ImportFailed) as exc:
+        _run(b"{broken")
+    assert exc.value.status == 422
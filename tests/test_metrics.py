@@ -0,0 +1,48 @@
+"""Tests for stylegrid.metrics (histograms, Prometheus text, disabled mode)."""
+import pytest
+
+from stylegrid import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_counts_and_quantiles():
+    for ms in (1, 2, 3, 4, 200):
+        metrics.observe("cache_rebuild_seconds", ms / 1000)
+    metrics.inc("cache_requests", result="hit")
+    metrics.inc("cache_requests", 2, result="hit")
+    snap = metrics.snapshot()
+    (h,) = snap["histograms"]
+    assert h["count"] == 5 and h["sum"] == pytest.approx(0.21)
+    assert 0.001 < h["p50"] <= 0.005 and 0.1 < h["p99"] <= 0.25
+    assert snap["counters"] == [{"name": "cache_requests", "labels": {"result": "hit"}, "value": 3}]
+
+
+def test_prometheus_text_format():
+    metrics.observe("http_request_duration_seconds", 0.003, method="GET", route="/style_grid/styles")
+    metrics.inc("http_request_errors", kind="exception", method="GET", route='/a"b')
+    metrics.record_file_parse("/x/styles.csv", 0.02, 10)
+    text = metrics.render_prometheus()
+    assert "# TYPE stylegrid_http_request_duration_seconds histogram" in text
+    assert 'stylegrid_http_request_duration_seconds_bucket{method="GET",route="/style_grid/styles",le="0.0025"} 0' in text
+    assert 'stylegrid_http_request_duration_seconds_bucket{method="GET",route="/style_grid/styles",le="+Inf"} 1' in text
+    assert 'stylegrid_http_request_duration_seconds_count{method="GET",route="/style_grid/styles"} 1' in text
+    assert "# TYPE stylegrid_http_request_errors_total counter" in text
+    assert 'route="/a\\"b"' in text
+    assert 'stylegrid_csv_parse_last_seconds{file="/x/styles.csv"} 0.02' in text
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    with metrics.timed("process_seconds"):
+        pass
+    metrics.inc("cache_requests", result="miss")
+    metrics.record_file_parse("/x/a.csv", 0.1, 1)
+    snap = metrics.snapshot()
+    assert snap["histograms"] == [] and snap["counters"] == [] and snap["csv_parse"] == []
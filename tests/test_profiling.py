@@ -0,0 +1,82 @@
+"""Tests for stylegrid.profiling (armed captures, cProfile merge across threads, sampler, retention)."""
+import pstats
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stylegrid import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _handler(pool):
+    # A route handing work to the I/O pool: the worker must land in the same capture.
+    return pool.submit(profiling.bind(lambda: _busy(0.02))).result()
+
+
+def test_armed_process_capture_merges_worker_threads(isolated_profiles):
+    profiling.arm("process", 1)
+    with ThreadPoolExecutor(1) as pool:
+        profiling.run_process(_handler, pool)
+        profiling.run_process(_handler, pool)  # arming was for one call only
+    profiling.flush()
+    (entry,) = profiling.list_profiles()
+    assert entry["kind"] == "cprofile" and entry["label"] == "process"
+    assert profiling.armed()["process"]["remaining"] == 0
+    stats = pstats.Stats(str(isolated_profiles / entry["name"])).stats
+    functions = {func for (_file, _line, func) in stats}
+    assert {"_handler", "_busy"} <= functions
+    assert "_busy" in profiling.profile_summary(entry["name"])
+
+
+def test_sample_capture_writes_collapsed_stacks_below_the_root():
+    with ThreadPoolExecutor(1) as pool:
+        with profiling.profile_call("routes", "GET /style_grid/styles", "sample"):
+            _handler(pool)
+            profiling.bind(_busy)(0.05)
+    profiling.flush()
+    (entry,) = profiling.list_profiles()
+    assert entry["kind"] == "sample" and entry["label"] == "GET_style_grid_styles"
+    with open(profiling.profile_path(entry["name"]), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("_busy (") for line in lines)
+    assert not any("threading.py" in line.split(";")[0] for line in lines)
+
+
+def test_unrequested_calls_and_bad_names_are_ignored(monkeypatch):
+    assert profiling.profile_call("routes", "x", None).__class__.__name__ == "nullcontext"
+    assert profiling.profile_call("routes", "x", "nonsense").__class__.__name__ == "nullcontext"
+    assert profiling.profile_path("../usage.json") is None
+    monkeypatch.setattr(profiling, "MAX_PROFILES", 2)
+    for _ in range(4):
+        with profiling.profile_call("routes", "r", "1"):
+            _busy(0.001)
+    profiling.flush()
+    assert len(profiling.list_profiles()) == 2
+    assert profiling.clear_profiles() == 2 and profiling.list_profiles() == []
+
+
+def test_failed_write_is_logged_not_raised(monkeypatch, capsys):
+    def _broken(_session):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(profiling._Session, "write", _broken)
+    with profiling.profile_call("routes", "r", "1"):
+        _busy(0.001)
+    profiling.flush()
+    assert profiling.list_profiles() == []
+    assert "disk full" in capsys.readouterr().out
+
+
+def test_disabled_profiling_ignores_triggers_and_refuses_arming(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+    assert profiling.profile_call("routes", "x", "1").__class__.__name__ == "nullcontext"
+    with pytest.raises(ValueError, match="STYLE_GRID_PROFILING=1"):
+        profiling.arm("routes", 1)
+    assert profiling.armed()["routes"]["remaining"] == 0
@@ -0,0 +1,63 @@
+"""Tests for stylegrid.records.Style (immutable tuple-backed style record)."""
+import json
+import pickle
+
+import pytest
+
+from stylegrid.csv_io import categorize_styles
+from stylegrid.records import Style, style_from_fields
+
+
+def _style(name="BASE_soft_light", **kw):
+    fields = dict(prompt="soft light, {prompt}", negative_prompt="harsh", description="d",
+                  category_explicit="", source="styles.csv", source_file="/x/styles.csv")
+    fields.update(kw)
+    return Style(name, **fields)
+
+
+def test_mapping_view_covers_every_field():
+    s = _style()
+    assert s["prompt"] == s.prompt == "soft light, {prompt}"
+    assert s["_source"] == s["source"] == "styles.csv"
+    assert s.get("missing", "dflt") == "dflt"
+    assert s["category"] == s.get("category") == "BASE"
+    assert s["display_name"] == "soft light" and s["has_placeholder"] is True
+    assert dict(s) == s.to_dict() and set(dict(s)) == set(Style.KEYS)
+    with pytest.raises(KeyError):
+        s["missing"]
+
+
+def test_tuple_protocol_is_positional():
+    s = _style()
+    assert len(s) == 10 and s[0] == s.name and tuple(s) == s.astuple()
+    assert list(s)[7:] == [s.category, s.display_name, s.has_placeholder]
+    assert json.loads(json.dumps(s.to_dict()))["category"] == "BASE"
+
+
+def test_computed_fields_and_json_boundary():
+    s = _style()
+    assert (s.category, s.display_name, s.has_placeholder) == ("BASE", "soft light", True)
+    d = s.to_dict()
+    assert d["category"] == "BASE" and d["display_name"] == "soft light" and d["has_placeholder"] is True
+    assert "category" not in s.to_dict(computed=False)
+    assert _style("Plain", category_explicit="").category == "Styles"
+    assert _style("Cat_a_b", category_explicit="Mine").display_name == "a b"
+
+
+def test_immutable_and_picklable():
+    s = _style()
+    with pytest.raises(AttributeError):
+        s.prompt = "x"
+    clone = pickle.loads(pickle.dumps(s))
+    assert clone == s and isinstance(clone, Style)
+    assert clone.category == s.category
+    rebuilt = style_from_fields(s.astuple())
+    assert type(s.astuple()) is tuple
+    assert isinstance(rebuilt, Style) and rebuilt == s and rebuilt.display_name == s.display_name
+
+
+def test_categorize_groups_without_mutating():
+    a, b, c = _style("X_b"), _style("X_a"), _style("Y-z")
+    cats = categorize_styles([a, b, c])
+    assert [s.name for s in cats["X"]] == ["X_a", "X_b"]
+    assert [s.name for s in cats["Y"]] == ["Y-z"]
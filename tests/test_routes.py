@@ -8,8 +8,12 @@ alone is not enough — csv_io, cache, and thumbnails are patched the same way.
 GET /style_grid/styles returns {"categories": {...}, "usage": {...}}; style
 dicts live under each category key (not a top-level JSON array).
 
-Dependencies: pip install pytest fastapi starlette httpx
+Dependencies: pip install pytest fastapi starlette httpx (pillow for thumbnail uploads)
 """
+import io
+import os
+import zipfile
+
 import pytest
 from fastapi import FastAPI
 from starlette.testclient import TestClient
@@ -151,3 +155,353 @@ def test_post_delete_nonexistent_graceful(style_grid_client):
     )
     assert r.status_code == 200
     assert r.json().get("ok") is True
+
+
+@pytest.fixture
+def thumbs_dir(tmp_path, monkeypatch):
+    from stylegrid import thumbnails as sg_thumbs
+
+    d = tmp_path / "thumbnails"
+    d.mkdir(exist_ok=True)
+    monkeypatch.setattr(sg_thumbs, "THUMBNAILS_DIR", str(d))
+    return d
+
+
+def _png_bytes(size=(600, 800)):
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_upload_file_reencodes_to_webp_with_variant(style_grid_client, thumbs_dir):
+    from stylegrid.thumbnails import get_thumbnail_path, get_thumbnail_variant_path, thumbnail_index
+
+    r = style_grid_client.post(
+        "/style_grid/thumbnail/upload_file",
+        params={"name": "Test Style A"},
+        content=_png_bytes(),
+        headers={"Content-Type": "image/png"},
+    )
+    assert r.json() == {"ok": True}
+    path = get_thumbnail_path("Test Style A")
+    with open(path, "rb") as f:
+        head = f.read(12)
+    assert head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+    from PIL import Image
+
+    with Image.open(path) as im:
+        assert im.size == (384, 512)
+    assert get_thumbnail_variant_path(path, "sm").startswith(str(thumbs_dir))
+    with Image.open(get_thumbnail_variant_path(path, "sm")) as im:
+        assert im.size == (192, 256)
+    thumbnail_index().flush()  # wait for the background index write
+    assert not [f for f in thumbs_dir.iterdir() if f.name.endswith(".tmp")]
+
+
+def test_upload_file_rejects_oversized_and_invalid(style_grid_client, thumbs_dir, monkeypatch):
+    from stylegrid import routes as sg_routes
+
+    r = style_grid_client.post(
+        "/style_grid/thumbnail/upload_file", params={"name": "Test Style A"}, content=b"not an image"
+    )
+    assert "error" in r.json()
+    monkeypatch.setattr(sg_routes, "MAX_UPLOAD_BYTES", 16)
+    r = style_grid_client.post(
+        "/style_grid/thumbnail/upload_file", params={"name": "Test Style A"}, content=_png_bytes()
+    )
+    assert "too large" in r.json()["error"]
+    assert not list(thumbs_dir.glob("*.webp"))
+
+
+def test_delete_removes_per_file_thumbnail(style_grid_client, thumbs_dir, tmp_csv):
+    from stylegrid.thumbnails import get_thumbnail_path, thumbnail_index
+
+    params = {"name": "Test Style A", "source": "styles.csv"}
+    r = style_grid_client.post("/style_grid/thumbnail/upload_file", params=params, content=_png_bytes())
+    assert r.json() == {"ok": True}
+    path = get_thumbnail_path("Test Style A", str(tmp_csv))
+    assert os.path.isfile(path) and not os.path.isfile(get_thumbnail_path("Test Style A"))
+    assert thumbnail_index().get(path) is not None
+
+    assert style_grid_client.delete("/style_grid/thumbnail", params=params).json() == {
+        "ok": True, "removed": True,
+    }
+    assert not os.path.isfile(path) and thumbnail_index().get(path) is None
+    assert style_grid_client.get("/style_grid/thumbnail", params={"name": "Test Style A"}).status_code == 404
+    r = style_grid_client.delete("/style_grid/thumbnail", params=params)
+    assert r.json() == {"ok": True, "removed": False}
+
+
+def test_base64_upload_shares_the_upload_cap(style_grid_client, thumbs_dir, monkeypatch):
+    import base64
+
+    from stylegrid import routes as sg_routes
+
+    Image = pytest.importorskip("PIL.Image")
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (1024, 1024), os.urandom(1024 * 1024 * 3)).save(buf, "PNG")
+    assert buf.tell() > 2 * 1024 * 1024  # over the old legacy-only limit
+    body = {"name": "Test Style A", "image": base64.b64encode(buf.getvalue()).decode("ascii")}
+    assert style_grid_client.post("/style_grid/thumbnail/upload", json=body).json() == {"ok": True}
+    monkeypatch.setattr(sg_routes, "MAX_UPLOAD_BYTES", 16)
+    decoded = []
+    monkeypatch.setattr(sg_routes.base64, "b64decode", lambda data: decoded.append(data) or b"")
+    r = style_grid_client.post("/style_grid/thumbnail/upload", json=body)
+    assert "too large" in r.json()["error"]
+    assert decoded == []  # refused from the encoded length alone
+
+
+def test_upload_zip_imports_known_styles(style_grid_client, thumbs_dir):
+    from stylegrid.cache import get_cached_styles
+    from stylegrid.thumbnails import get_thumbnail_path
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("Test Style A.png", _png_bytes((64, 64)))
+        zf.writestr("styles.csv/Test Style B.png", _png_bytes((64, 64)))
+        zf.writestr("Unknown Style.png", _png_bytes((64, 64)))
+    r = style_grid_client.post("/style_grid/thumbnails/upload_zip", content=buf.getvalue())
+    body = r.json()
+    assert sorted(body["imported"]) == ["Test Style A", "Test Style B"]
+    assert [s["entry"] for s in body["skipped"]] == ["Unknown Style.png"]
+    assert os.path.isfile(get_thumbnail_path("Test Style A"))
+    b = next(s for s in get_cached_styles() if s["name"] == "Test Style B")
+    assert os.path.isfile(get_thumbnail_path("Test Style B", b["source_file"]))
+
+
+def test_post_styles_batch_mixed_ops(style_grid_client):
+    r = style_grid_client.post(
+        "/style_grid/styles/batch",
+        json={"operations": [
+            {"op": "upsert", "name": "Batch New", "prompt": "bp", "source": "styles.csv"},
+            {"op": "delete", "name": "Test Style B", "source": "styles.csv"},
+        ]},
+    )
+    body = r.json()
+    assert body["ok"] is True
+    assert body["results"] == [{"ok": True}, {"ok": True}]
+    names = {s["name"] for s in _flatten_styles(style_grid_client.get("/style_grid/styles").json())}
+    assert "Batch New" in names and "Test Style B" not in names
+    assert "error" in style_grid_client.post("/style_grid/styles/batch", json={}).json()
+
+
+def test_batch_rename_moves_thumbnail(style_grid_client, tmp_csv):
+    from stylegrid.thumbnails import get_thumbnail_path, get_thumbnail_variant_path, thumbnail_index
+
+    csv_path = str(tmp_csv)
+    old = get_thumbnail_path("Test Style A", csv_path)
+    os.makedirs(os.path.dirname(get_thumbnail_variant_path(old, "sm")), exist_ok=True)
+    for path in (old, get_thumbnail_variant_path(old, "sm")):
+        with open(path, "wb") as f:
+            f.write(b"webp")
+    thumbnail_index().record(old, "Test Style A", csv_path, origin="uploaded")
+    r = style_grid_client.post("/style_grid/styles/batch", json={"operations": [
+        {"op": "rename", "name": "Test Style A", "new_name": "Renamed A", "source": "styles.csv"},
+    ]})
+    assert r.json()["ok"] is True
+    new = get_thumbnail_path("Renamed A", csv_path)
+    assert os.path.isfile(new) and os.path.isfile(get_thumbnail_variant_path(new, "sm"))
+    assert not os.path.exists(old) and not os.path.exists(get_thumbnail_variant_path(old, "sm"))
+    assert thumbnail_index().get(old) is None and thumbnail_index().get(new)["style"] == "Renamed A"
+
+
+def test_import_raw_csv_reports_rows(style_grid_client, tmp_path, monkeypatch):
+    from stylegrid import importer as sg_importer
+
+    monkeypatch.setattr(sg_importer, "EXT_DIR", str(tmp_path / "ext"))
+    body = b"name,prompt\nTest Style B,tag_b\nTest Style B,changed\nFresh,new\n"
+    r = style_grid_client.post("/style_grid/import?filename=pack.csv&on_conflict=skip", content=body)
+    report = r.json()
+    assert (report["imported"], report["duplicates"], report["conflicts_total"]) == (1, 1, 1)
+    assert os.path.isfile(tmp_path / "ext" / "styles" / report["files"][0])
+    assert style_grid_client.post("/style_grid/import", content=b"").json() == {"ok": True}
+    assert style_grid_client.post("/style_grid/import", content=b"{bad").status_code == 422
+
+
+def test_multi_file_import_is_one_undo_step(style_grid_client, tmp_path, monkeypatch):
+    from stylegrid import importer as sg_importer
+
+    monkeypatch.setattr(sg_importer, "EXT_DIR", str(tmp_path / "ext"))
+    style_grid_client.post(
+        "/style_grid/style/save", json={"name": "Kept", "prompt": "k", "source": "styles.csv"}
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("one.csv", "name,prompt\nFirst,p1\n")
+        zf.writestr("two.csv", "name,prompt\nSecond,p2\n")
+    report = style_grid_client.post("/style_grid/import", content=buf.getvalue()).json()
+    paths = [str(tmp_path / "ext" / "styles" / name) for name in report["files"]]
+    assert len(paths) == 2 and all(os.path.isfile(p) for p in paths)
+
+    undone = style_grid_client.post("/style_grid/undo", json={}).json()
+    assert sorted(undone["restored"]) == sorted(paths)
+    assert not any(os.path.exists(p) for p in paths)
+    # The edit made before the import is still the next step back.
+    assert "Kept" in (tmp_path / "styles.csv").read_text(encoding="utf-8-sig")
+
+
+def test_duplicates_endpoint(style_grid_client):
+    body = style_grid_client.get("/style_grid/duplicates").json()
+    assert body["styles"] == 3 and body["exact_total"] == 0 and body["near"] == []
+    assert "error" in style_grid_client.get("/style_grid/duplicates?threshold=0").json()
+
+
+def test_compose_endpoint(style_grid_client):
+    r = style_grid_client.post(
+        "/style_grid/compose",
+        json={"prompt": "cat, tag_b", "negative_prompt": "", "styles": ["Test Style A", "Test Style B"], "seed": 5},
+    )
+    body = r.json()
+    assert body["prompt"] == "cat, tag_b, (tag_a:1.2)"
+    assert body["negative_prompt"] == "bad_tag_a"
+    assert body["prompts"] == [body["prompt"]]
+    assert "error" in style_grid_client.post("/style_grid/compose", json={"styles": "x"}).json()
+
+
+def test_metrics_endpoint_records_routes(style_grid_client):
+    from stylegrid import metrics
+
+    if not metrics.ENABLED:
+        pytest.skip("STYLE_GRID_METRICS=0")
+    style_grid_client.get("/style_grid/styles")
+    body = style_grid_client.get("/style_grid/metrics").json()
+    routes = {h["labels"].get("route") for h in body["histograms"] if h["name"] == "http_request_duration_seconds"}
+    assert "/style_grid/styles" in routes
+    assert any(c["name"] == "cache_requests" for c in body["counters"])
+    text = style_grid_client.get("/style_grid/metrics?format=prometheus").text
+    assert 'stylegrid_http_request_duration_seconds_count{method="GET",route="/style_grid/styles"}' in text
+
+
+def test_profile_header_and_armed_routes_write_captures(style_grid_client):
+    assert style_grid_client.get("/style_grid/styles").status_code == 200
+    assert style_grid_client.get("/style_grid/profiles").json()["profiles"] == []
+
+    r = style_grid_client.get("/style_grid/styles", headers={"X-StyleGrid-Profile": "1"})
+    assert r.status_code == 200 and _flatten_styles(r.json())
+    armed = style_grid_client.post(
+        "/style_grid/profiles/arm", json={"target": "routes", "count": 1, "mode": "sample"}
+    ).json()["armed"]
+    assert armed["routes"] == {"remaining": 1, "mode": "sample"}
+    style_grid_client.post("/style_grid/conflicts", json={"styles": []})
+    style_grid_client.get("/style_grid/check_update")  # arming covered one call only
+
+    body = style_grid_client.get("/style_grid/profiles").json()
+    assert sorted((p["kind"], p["label"]) for p in body["profiles"]) == [
+        ("cprofile", "GET_style_grid_styles"), ("sample", "POST_style_grid_conflicts"),
+    ]
+    assert body["armed"]["routes"]["remaining"] == 0
+    prof = next(p["name"] for p in body["profiles"] if p["kind"] == "cprofile")
+    summary = style_grid_client.get(f"/style_grid/profiles/{prof}?format=text").text
+    assert "_styles_payload" in summary
+    assert style_grid_client.get(f"/style_grid/profiles/{prof}").content
+    assert style_grid_client.get("/style_grid/profiles/..%2Fusage.json").status_code == 404
+    assert "error" in style_grid_client.post("/style_grid/profiles/arm", json={"target": "nope"}).json()
+    assert style_grid_client.delete("/style_grid/profiles").json() == {"removed": 2}
+
+
+def test_events_route_streams_hello_and_changes(style_grid_client, tmp_csv):
+    import asyncio
+
+    from stylegrid import events
+    from stylegrid.csv_io import save_style_to_csv
+
+    app = style_grid_client.app
+    scope = {
+        "type": "http", "method": "GET", "path": "/style_grid/events", "raw_path": b"/style_grid/events",
+        "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("test", 1), "root_path": "",
+    }
+
+    async def scenario():
+        disconnected = asyncio.Event()
+        requested = []
+        body = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                body.append(message)
+            elif message.get("body"):
+                body.append(message["body"].decode())
+                text = "".join(b for b in body if isinstance(b, str))
+                if "event: hello" in text and "event: catalog" not in text:
+                    await asyncio.to_thread(save_style_to_csv, "Pushed", "p", "", source_file=tmp_csv.name)
+                if "event: catalog" in text:
+                    disconnected.set()
+
+        await asyncio.wait_for(app(scope, receive, send), 10)
+        return body
+
+    start, *chunks = asyncio.run(scenario())
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    text = "".join(chunks)
+    assert text.startswith("retry: ") and '"revisions"' in text
+    assert "event: catalog\ndata: " in text
+    assert events.hub.subscriber_count() == 0
+
+
+def test_gen_status_batch_long_poll(style_grid_client):
+    from stylegrid.thumbnails import thumbnail_generation_manager as mgr
+
+    mgr.try_begin("Batch A")
+    mgr._set_status("Batch A", "done")
+    body = style_grid_client.post(
+        "/style_grid/thumbnail/gen_status", json={"names": ["Batch A", "Batch B"], "timeout": 1}
+    ).json()
+    assert body["statuses"]["Batch A"]["status"] == "done" and "Batch B" not in body["statuses"]
+    seen = {"Batch A": body["statuses"]["Batch A"]["version"]}
+    body = style_grid_client.post(
+        "/style_grid/thumbnail/gen_status", json={"names": ["Batch A"], "since": seen, "timeout": 0.05}
+    ).json()
+    assert body["statuses"] == {} and body["version"] >= seen["Batch A"]
+    assert "error" in style_grid_client.post("/style_grid/thumbnail/gen_status", json={"names": "x"}).json()
+
+
+def test_thumbnail_profiles_and_generate_validation(style_grid_client):
+    body = style_grid_client.get("/style_grid/thumbnail/profiles").json()
+    assert body["default"] in body["profiles"] and {"draft", "quality"} <= set(body["profiles"])
+    r = style_grid_client.post("/style_grid/thumbnail/generate", json={"name": "Style A", "profile": "nope"})
+    assert "unknown profile" in r.json()["error"]
+    assert style_grid_client.get("/style_grid/thumbnail/record", params={"name": "Missing"}).json()["error"]
+    assert style_grid_client.get("/style_grid/thumbnail/record", params={"name": "Test Style A"}).json() == {"record": None}
+
+
+def test_thumbnail_cleanup_removes_orphans_and_reports_stale(style_grid_client, thumbs_dir):
+    from stylegrid.thumbnails import get_thumbnail_path
+
+    orphan = thumbs_dir / ("f" * 32 + ".webp")
+    orphan.write_bytes(b"webp")
+    kept = get_thumbnail_path("Test Style A")
+    with open(kept, "wb") as f:
+        f.write(b"webp")
+    assert style_grid_client.get("/style_grid/thumbnails/stale").json() == {"stale": [], "orphans": 1}
+    assert style_grid_client.post("/style_grid/thumbnails/cleanup").json() == {"removed": 1, "stale": 0}
+    assert not orphan.exists() and os.path.isfile(kept)
+
+
+def test_ui_shell_etag_and_immutable_assets(style_grid_client, tmp_path, monkeypatch):
+    from stylegrid import ui_shell
+
+    dist = tmp_path / "dist"
+    (dist / "assets").mkdir(parents=True)
+    (dist / "index.html").write_text('<script type="module" src="./assets/index.js"></script>', encoding="utf-8")
+    (dist / "assets" / "index.js").write_text("export {}", encoding="utf-8")
+    monkeypatch.setattr(ui_shell, "UI_DIST_DIR", str(dist))
+    monkeypatch.setattr(ui_shell, "_build", None)
+
+    r = style_grid_client.get("/style_grid/ui")
+    assert r.status_code == 200 and r.headers["cache-control"] == "no-cache"
+    assert style_grid_client.get("/style_grid/ui", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    src = r.text.split('src="', 1)[1].split('"', 1)[0]
+    assert src.startswith(ui_shell.ASSET_ROUTE + "/")
+    asset = style_grid_client.get(src)
+    assert asset.text == "export {}" and "immutable" in asset.headers["cache-control"]
+    assert asset.headers["content-type"].startswith("text/javascript")
+    assert style_grid_client.get(ui_shell.ASSET_ROUTE + "/0/assets/missing.js").status_code == 404
@@ -0,0 +1,268 @@
+"""Tests for stylegrid.thumbnails generation: status long-poll, step progress, profiles, result reuse."""
+import asyncio
+import json
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+from stylegrid import thumbnails
+from stylegrid.thumbnails import ThumbnailGenerationManager
+
+
+def test_versions_and_changed_since():
+    mgr = ThumbnailGenerationManager()
+    assert mgr.get_status("A") == {"status": "idle"}
+    assert mgr.try_begin("A") and not mgr.try_begin("A")
+    mgr.try_begin("B")
+    mgr._set_status("A", "done")
+    assert mgr.get_status("A")["status"] == "done" and mgr.version == 3
+    changed = mgr.changed_since(["A", "B", "C"], {"A": 1, "B": 2})
+    assert set(changed) == {"A"} and changed["A"]["version"] == 3
+    assert set(mgr.changed_since(["A", "B"], {})) == {"A", "B"}
+    # A version the server no longer knows (restart / expiry) ends the caller's wait.
+    assert mgr.changed_since(["C", "D"], {"C": 7}) == {"C": {"status": "idle"}}
+
+
+def test_finished_statuses_expire(monkeypatch):
+    mgr = ThumbnailGenerationManager()
+    mgr.try_begin("running")
+    mgr.try_begin("old")
+    mgr._set_status("old", "error", "boom")
+    monkeypatch.setattr(thumbnails, "GEN_STATUS_TTL", 0)
+    mgr._next_prune = 0.0
+    assert mgr.get_status("old") == {"status": "idle"}
+    assert mgr.get_status("running")["status"] == "running"
+
+
+def test_wait_for_changes_wakes_on_other_thread_update():
+    mgr = ThumbnailGenerationManager()
+    mgr.try_begin("A")
+    since = {"A": mgr.version}
+
+    async def scenario():
+        assert await mgr.wait_for_changes(["A"], since, 0.05) == {}
+        timer = threading.Timer(0.05, mgr._set_progress, args=("A", 5, 20))
+        timer.start()
+        t0 = asyncio.get_running_loop().time()
+        changed = await mgr.wait_for_changes(["A"], since, 5)
+        return changed, asyncio.get_running_loop().time() - t0
+
+    changed, waited = asyncio.run(scenario())
+    assert changed["A"]["step"] == 5 and changed["A"]["steps"] == 20
+    assert waited < 2
+    assert not mgr._waiters
+
+
+def test_progress_is_read_from_the_sampler_state(monkeypatch):
+    state = types.SimpleNamespace(sampling_step=0, sampling_steps=0)
+    monkeypatch.setitem(sys.modules, "modules.shared", types.SimpleNamespace(state=state))
+    monkeypatch.setattr(thumbnails, "GEN_PROGRESS_INTERVAL", 0.01)
+    mgr = ThumbnailGenerationManager()
+    mgr.try_begin("A")
+    stop = threading.Event()
+    watcher = threading.Thread(target=mgr._watch_progress, args=("A", stop))
+    watcher.start()
+    state.sampling_steps, state.sampling_step = 8, 3
+    for _ in range(200):
+        if mgr.get_status("A").get("step") == 3:
+            break
+        threading.Event().wait(0.01)
+    stop.set()
+    watcher.join()
+    assert mgr.get_status("A")["steps"] == 8 and mgr.get_status("A")["step"] == 3
+    mgr._set_status("A", "done")
+    mgr._set_progress("A", 8, 8)  # late step reads never resurrect a finished job
+    assert mgr.get_status("A")["status"] == "done"
+
+
+@pytest.fixture
+def profiles_file(monkeypatch, tmp_path):
+    path = tmp_path / "thumbnail_profiles.json"
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_PROFILES_FILE", str(path))
+    monkeypatch.setattr(thumbnails, "_profiles_cache", {
+        "sig": None, "profiles": thumbnails.GENERATION_PROFILES, "default": thumbnails.DEFAULT_PROFILE,
+    })
+    return path
+
+
+def test_profiles_merge_config_over_builtins(profiles_file):
+    profiles, default = thumbnails.load_generation_profiles()
+    assert default == "quality" and profiles["quality"]["steps"] == 20 and profiles["draft"]["steps"] < 20
+    profiles_file.write_text(json.dumps({
+        "default": "draft",
+        "profiles": {"draft": {"steps": 6}, "tall": {"height": 768, "cfg_scale": "high", "steps": True}},
+    }), encoding="utf-8")
+    profiles, default = thumbnails.load_generation_profiles()
+    assert default == "draft" and profiles["draft"]["steps"] == 6
+    assert profiles["tall"]["height"] == 768
+    assert profiles["tall"]["cfg_scale"] == 7.0 and profiles["tall"]["steps"] == 20  # bad types ignored
+    assert thumbnails.resolve_generation_profile()[0] == "draft"
+    with pytest.raises(ValueError):
+        thumbnails.resolve_generation_profile("nope")
+
+
+@pytest.fixture
+def generation(monkeypatch, tmp_path, profiles_file):
+    """Manager whose render writes a stub file; styles A (one.csv) and B (two.csv) share a prompt."""
+    monkeypatch.setattr(thumbnails, "get_styles_dirs", lambda: [str(tmp_path)])
+    styles = {
+        name: {"name": name, "prompt": "red hat, {prompt}", "negative_prompt": "blurry",
+               "source_file": str(tmp_path / f"{src}.csv")}
+        for name, src in (("A", "one"), ("B", "two"))
+    }
+    monkeypatch.setattr(thumbnails, "find_style", lambda name, hint=None: styles.get(name))
+    renders = []
+    gate = {"event": None}
+
+    def fake_render(self, style_name, img_path, prompt, negative, settings):
+        if gate["event"] is not None:
+            gate["event"].wait(5)
+        renders.append((style_name, prompt, settings["steps"]))
+        with open(img_path, "wb") as f:
+            f.write(f"{style_name}-{len(renders)}".encode())
+
+    monkeypatch.setattr(ThumbnailGenerationManager, "_render", fake_render)
+    mgr = ThumbnailGenerationManager()
+
+    def generate(name, **kwargs):
+        mgr.try_begin(name)
+        mgr._generate(name, None, **kwargs)
+        return mgr.get_status(name)
+
+    return types.SimpleNamespace(
+        mgr=mgr, generate=generate, renders=renders, gate=gate,
+        path=lambda name: thumbnails.get_thumbnail_path(name, styles[name]["source_file"]),
+    )
+
+
+def test_generation_reuses_identical_inputs(generation, profiles_file):
+    g = generation
+    profiles_file.write_text(json.dumps({"profiles": {"quality": {"seed": 1234}}}), encoding="utf-8")
+    status = g.generate("A")
+    assert status["status"] == "done" and "reused" not in status
+    record = thumbnails.get_generation_record(g.path("A"))
+    assert record["prompt"] == "red hat, 1girl, solo" and record["negative_prompt"] == "blurry"
+    assert record["profile"] == "quality" and record["settings_hash"] and record["inputs_hash"]
+
+    assert g.generate("A")["reused"] == "unchanged"
+    status = g.generate("B")  # other file, same prompt: shares A's image
+    assert status["reused"] == "shared" and len(g.renders) == 1
+    with open(g.path("B"), "rb") as f:
+        assert f.read() == b"A-1"
+    assert thumbnails.get_generation_record(g.path("B"))["shared_from"] == os.path.basename(g.path("A"))
+
+    assert "reused" not in g.generate("A", force=True) and len(g.renders) == 2
+    assert "reused" not in g.generate("A", profile="draft") and g.renders[-1][2] == 10
+    # draft keeps seed -1: asking again re-rolls instead of reporting "unchanged".
+    assert "reused" not in g.generate("A", profile="draft") and len(g.renders) == 4
+
+    thumbnails.remove_thumbnail_files(g.path("A"))
+    assert thumbnails.get_generation_record(g.path("A")) is None
+    assert g.generate("A")["reused"] == "shared"  # B's link to the quality render outlives A's file
+
+
+def test_concurrent_equal_prompts_render_once(generation):
+    g = generation
+    g.gate["event"] = threading.Event()
+    first = threading.Thread(target=g.generate, args=("A",))
+    first.start()
+    for _ in range(200):
+        if g.mgr._inflight:
+            break
+        threading.Event().wait(0.01)
+    second = threading.Thread(target=g.generate, args=("B",))
+    second.start()
+    g.gate["event"].set()
+    first.join()
+    second.join()
+    assert len(g.renders) == 1
+    assert g.mgr.get_status("B")["reused"] == "shared" and not g.mgr._inflight
+
+
+@pytest.fixture
+def packs(monkeypatch, tmp_path):
+    from stylegrid import cache
+
+    d = tmp_path / "styles"
+    d.mkdir()
+    header = "name,prompt,negative_prompt,description,category\n"
+    (d / "a.csv").write_text(header + "A_one,pa,,,\nA_two,pa2,,,\n", encoding="utf-8")
+    (d / "b.csv").write_text(header + "B_one,pb,,,\n", encoding="utf-8")
+    monkeypatch.setattr(cache, "get_styles_dirs", lambda: [str(d)])
+    monkeypatch.setattr(thumbnails, "get_styles_dirs", lambda: [str(d)])
+    return d
+
+
+def _touch_thumb(name, csv_path=""):
+    path = thumbnails.get_thumbnail_path(name, csv_path)
+    with open(path, "wb") as f:
+        f.write(b"webp")
+    return path
+
+
+def test_index_sweep_rechecks_only_changed_csvs(packs, monkeypatch):
+    a_csv, b_csv = str(packs / "a.csv"), str(packs / "b.csv")
+    found = _touch_thumb("A_one", a_csv)  # made before the index existed
+    junk = os.path.join(thumbnails.THUMBNAILS_DIR, "0" * 32 + ".webp")
+    open(junk, "wb").close()
+    index = thumbnails.thumbnail_index()
+    report = index.sweep()
+    assert report["orphans"] == [os.path.basename(junk)] and report["stale"] == []
+    assert index.get(found)["origin"] == "found" and index.get(found)["status"] == "ok"
+
+    b_style = thumbnails.find_style("B_one")
+    uploaded = _touch_thumb("B_one", b_csv)
+    index.record(uploaded, "B_one", b_csv, b_style)
+    monkeypatch.setattr(thumbnails, "_thumbnail_hash_input", lambda *a: pytest.fail("full rescan"))
+    assert index.sweep()["checked"] == 0
+
+    header = "name,prompt,negative_prompt,description,category\n"
+    (packs / "a.csv").write_text(header + "A_one,pa changed,,,\nA_two,pa2,,,\n", encoding="utf-8")
+    report = index.sweep()
+    assert report["checked"] == 1
+    assert report["stale"] == [{"file": os.path.basename(found), "name": "A_one", "source_file": a_csv}]
+
+    (packs / "b.csv").write_text(header, encoding="utf-8")
+    report = index.sweep()
+    assert report["checked"] == 1 and sorted(report["orphans"]) == sorted(
+        [os.path.basename(junk), os.path.basename(uploaded)]
+    )
+
+    index.flush()
+    reloaded = thumbnails.ThumbnailIndex(thumbnails.THUMBNAILS_DIR)
+    assert reloaded.entries() == index.entries()
+    assert reloaded.sweep()["checked"] == 0  # CSV hashes and reconcile state persisted
+
+    thumbnails.remove_thumbnail_files(uploaded)
+    assert index.get(uploaded) is None
+
+
+def test_hash_inputs_memoized_per_catalog_generation(packs, monkeypatch, tmp_path):
+    from stylegrid import cache
+
+    a_csv = str(packs / "a.csv")
+    header = "name,prompt,negative_prompt,description,category\n"
+    other = tmp_path / "more"
+    other.mkdir()
+    (other / "a.csv").write_text(header + "A_one,again,,,\nOnly,x,,,\n", encoding="utf-8")
+    calls = []
+    dirs = [str(packs), str(other)]
+    monkeypatch.setattr(cache, "get_styles_dirs", lambda: dirs)
+    monkeypatch.setattr(thumbnails, "get_styles_dirs", lambda: calls.append(1) or dirs)
+    assert thumbnails.list_thumbnails() == set()
+    _touch_thumb("A_two", a_csv)
+    _touch_thumb("Only", str(other / "a.csv"))
+    assert thumbnails.list_thumbnails() == {"A_two", "Only"}
+    first, extra = thumbnails._thumbnail_owners()
+    # Both packs are "a.csv" relative to their dir, so their A_one rows share one file.
+    assert len(first) == 4 and [s.source_file for v in extra.values() for s in v] == [str(other / "a.csv")]
+    assert thumbnails._thumbnail_hash_input("A_one", a_csv) == "A_one::a.csv"
+    assert len(calls) == 1  # dirs resolved once for the whole generation
+
+    (packs / "b.csv").write_text(header + "B_new,pb,,,\n", encoding="utf-8")
+    _touch_thumb("B_new", str(packs / "b.csv"))
+    assert thumbnails.list_thumbnails() == {"A_two", "Only", "B_new"}
+    assert len(calls) == 2
@@ -0,0 +1,84 @@
+"""Compiled V2 shell: content-hashed asset URLs, CSS rewriting, rebuild detection."""
+import os
+import time
+
+import pytest
+
+from stylegrid import ui_shell
+
+INDEX = (
+    '<link rel="icon" href="./favicon.svg" />'
+    '<script type="module" src="./assets/index.js"></script>'
+    '<link rel="stylesheet" href="./assets/index.css">'
+)
+
+
+@pytest.fixture
+def dist(tmp_path, monkeypatch):
+    d = tmp_path / "dist"
+    (d / "assets").mkdir(parents=True)
+    (d / "index.html").write_text(INDEX, encoding="utf-8")
+    (d / "favicon.svg").write_text("<svg/>", encoding="utf-8")
+    (d / "assets" / "index.js").write_text("console.log(1)", encoding="utf-8")
+    (d / "assets" / "index.css").write_text("@font-face{src:url(./font.woff2)}", encoding="utf-8")
+    (d / "assets" / "font.woff2").write_bytes(b"wOF2")
+    monkeypatch.setattr(ui_shell, "UI_DIST_DIR", str(d))
+    monkeypatch.setattr(ui_shell, "_build", None)
+    _age(d)
+    return d
+
+
+def _age(d, seconds=60):
+    old = time.time() - seconds
+    for path in d.rglob("*"):
+        os.utime(path, (old, old))
+
+
+def _url(build, rel):
+    return ui_shell.asset_url(build.assets[rel][0], rel)
+
+
+def test_html_and_css_reference_content_hashed_urls(dist):
+    build = ui_shell.current_build()
+    for rel in ("favicon.svg", "assets/index.js", "assets/index.css"):
+        assert _url(build, rel) in build.html
+    css = build.assets["assets/index.css"][1].decode()
+    assert f"url({_url(build, 'assets/font.woff2')})" in css
+    assert build.assets["assets/index.js"][2].startswith("text/javascript")
+    assert ui_shell.current_build() is build  # cached while no file of the build changed
+
+    data, media_type, immutable = ui_shell.get_asset(build.assets["assets/font.woff2"][0], "assets/font.woff2")
+    assert data == b"wOF2" and media_type == "font/woff2" and immutable
+    assert ui_shell.get_asset("0" * 16, "assets/font.woff2")[2] is False
+    assert ui_shell.get_asset("0" * 16, "../index.html") is None
+
+
+def test_rebuild_changes_only_the_hashes_of_changed_files(dist):
+    before = ui_shell.current_build()
+    (dist / "assets" / "font.woff2").write_bytes(b"wOF2 v2")
+    (dist / "index.html").write_text(INDEX + "\n", encoding="utf-8")
+    _age(dist, 30)
+    after = ui_shell.current_build()
+    assert after is not before and after.etag != before.etag
+    assert after.assets["assets/index.js"][0] == before.assets["assets/index.js"][0]
+    # The font changed, so the stylesheet that points at it gets a new URL too.
+    for rel in ("assets/font.woff2", "assets/index.css"):
+        assert after.assets[rel][0] != before.assets[rel][0]
+
+
+def test_asset_edited_in_place_gets_a_new_hash(dist):
+    before = ui_shell.current_build()
+    dir_mtime = os.stat(dist / "assets").st_mtime_ns
+    with open(dist / "assets" / "index.js", "r+b") as f:  # same inode, same size
+        f.write(b"console.log(2)")
+    os.utime(dist / "assets" / "index.js", (time.time() - 30, time.time() - 30))
+    assert os.stat(dist / "assets").st_mtime_ns == dir_mtime
+    after = ui_shell.current_build()
+    assert after.assets["assets/index.js"][0] != before.assets["assets/index.js"][0]
+    assert after.etag != before.etag
+
+
+def test_fresh_build_is_not_cached(dist):
+    os.utime(dist / "index.html")
+    first = ui_shell.current_build()
+    assert ui_shell.current_build() is not first and ui_shell._build is None